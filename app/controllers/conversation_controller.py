@@ -1,35 +1,36 @@
 from datetime import datetime
-from typing import List
-from sqlalchemy.orm import Session
+from typing import List, Optional, Tuple
+from sqlalchemy import and_, delete, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.models import Conversation, Message
 from app.schemas.conversation import ConversationCreate, ConversationUpdate
 from app.schemas.message import MessageCreate
 
 
 class ConversationController:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
-    def create_conversation(self, user_id: int, data: ConversationCreate):
+    async def create_conversation(self, user_id: int, data: ConversationCreate):
         conversation = Conversation(
             user_id=user_id,
             title=data.title or f"Conversation {datetime.utcnow()}",
             lesson_id=data.lesson_id
         )
         self.db.add(conversation)
-        self.db.commit()
-        self.db.refresh(conversation)
+        await self.db.commit()
+        await self.db.refresh(conversation)
         return conversation
 
-    def get_conversation(self, conversation_id: int):
-        return self.db.query(Conversation).filter(Conversation.id == conversation_id).first()
+    async def get_conversation(self, conversation_id: int):
+        return await self.db.scalar(select(Conversation).where(Conversation.id == conversation_id))
 
-    def get_user_conversations(self, user_id: int) -> List[Conversation]:
-        return self.db.query(Conversation).filter(Conversation.user_id == user_id).order_by(
-            Conversation.updated_at.desc()).all()
+    async def get_user_conversations(self, user_id: int) -> List[Conversation]:
+        return (await self.db.scalars(select(Conversation).where(Conversation.user_id == user_id).order_by(
+            Conversation.updated_at.desc()))).all()
 
-    def update_conversation(self, conversation_id: int, data: ConversationUpdate):
-        conversation = self.get_conversation(conversation_id)
+    async def update_conversation(self, conversation_id: int, data: ConversationUpdate):
+        conversation = await self.get_conversation(conversation_id)
         if not conversation:
             return None
 
@@ -39,20 +40,25 @@ class ConversationController:
             conversation.lesson_id = data.lesson_id
 
         conversation.updated_at = datetime.utcnow()
-        self.db.commit()
-        self.db.refresh(conversation)
+        await self.db.commit()
+        await self.db.refresh(conversation)
         return conversation
 
-    def delete_conversation(self, conversation_id: int):
-        conversation = self.get_conversation(conversation_id)
+    async def delete_conversation(self, conversation_id: int):
+        conversation = await self.get_conversation(conversation_id)
         if not conversation:
             return False
 
-        self.db.delete(conversation)
-        self.db.commit()
+        # Xóa tin nhắn bằng một câu lệnh thay vì nạp từng tin nhắn vào session
+        await self.db.execute(
+            delete(Message).where(Message.conversation_id == conversation_id),
+            execution_options={"synchronize_session": False}
+        )
+        await self.db.delete(conversation)
+        await self.db.commit()
         return True
 
-    def add_message(self, data: MessageCreate):
+    async def add_message(self, data: MessageCreate):
         message = Message(
             conversation_id=data.conversation_id,
             role=data.role,
@@ -61,13 +67,64 @@ class ConversationController:
         self.db.add(message)
 
         # Update conversation timestamp
-        conversation = self.get_conversation(data.conversation_id)
+        conversation = await self.get_conversation(data.conversation_id)
         conversation.updated_at = datetime.utcnow()
 
-        self.db.commit()
-        self.db.refresh(message)
+        await self.db.commit()
+        await self.db.refresh(message)
         return message
 
-    def get_messages(self, conversation_id: int) -> List[Message]:
-        return self.db.query(Message).filter(Message.conversation_id == conversation_id).order_by(
-            Message.created_at).all()
\ No newline at end of file
+    async def get_messages(self, conversation_id: int, before: Optional[int] = None, after: Optional[int] = None,
+                           limit: int = 50) -> Tuple[List[Message], Optional[int], Optional[int]]:
+        """
+        Lấy một trang tin nhắn theo thứ tự thời gian, phân trang theo khóa (created_at, id)
+        dựa trên index ix_messages_conversation_created_id.
+
+        Args:
+            conversation_id: ID cuộc hội thoại
+            before: Lấy các tin nhắn cũ hơn tin nhắn có ID này
+            after: Lấy các tin nhắn mới hơn tin nhắn có ID này
+            limit: Số tin nhắn tối đa của trang
+
+        Returns:
+            (messages, prev_cursor, next_cursor): prev_cursor dùng làm before để lấy trang cũ hơn,
+            next_cursor dùng làm after để lấy trang mới hơn; None khi không còn tin nhắn theo hướng đó.
+            Không truyền before/after thì trả về trang mới nhất.
+        """
+        cursor_id = before if before is not None else after
+        query = select(Message).where(Message.conversation_id == conversation_id)
+        if cursor_id is not None:
+            cursor_created_at = await self.db.scalar(
+                select(Message.created_at).where(Message.id == cursor_id, Message.conversation_id == conversation_id)
+            )
+            if cursor_created_at is None:
+                return [], None, None
+            if after is not None:
+                query = query.where(or_(
+                    Message.created_at > cursor_created_at,
+                    and_(Message.created_at == cursor_created_at, Message.id > cursor_id)
+                ))
+            else:
+                query = query.where(or_(
+                    Message.created_at < cursor_created_at,
+                    and_(Message.created_at == cursor_created_at, Message.id < cursor_id)
+                ))
+
+        # Lấy thêm một dòng để biết còn trang tiếp theo hay không
+        if after is not None:
+            rows = list((await self.db.scalars(
+                query.order_by(Message.created_at, Message.id).limit(limit + 1)
+            )).all())
+            has_more = len(rows) > limit
+            messages = rows[:limit]
+            prev_cursor = messages[0].id if messages else None
+            next_cursor = messages[-1].id if has_more else None
+        else:
+            rows = list((await self.db.scalars(
+                query.order_by(Message.created_at.desc(), Message.id.desc()).limit(limit + 1)
+            )).all())
+            has_more = len(rows) > limit
+            messages = rows[:limit][::-1]
+            prev_cursor = messages[0].id if has_more else None
+            next_cursor = messages[-1].id if before is not None and messages else None
+        return messages, prev_cursor, next_cursor
@@ -1,22 +1,61 @@
-from typing import List
-from sqlalchemy.orm import Session
-from app.models.models import Lesson
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from pydantic import ValidationError
+from sqlalchemy import delete, func, insert, literal_column, select, text
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from app.models.models import Lesson, LessonSection
 from app.schemas.lesson import LessonCreate, LessonUpdate
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from app.utils.lesson_cache import lesson_cache, CachedLesson
+from app.utils.lesson_retrieval import split_sections
+from app.utils.lesson_search import lesson_search_index
+from app.config import settings
+from fastapi import HTTPException, status
+
+
+# Các trường có thể chọn khi liệt kê bài học; content_length được tính trong CSDL
+LESSON_LIST_FIELDS = {
+    "id": Lesson.id,
+    "title": Lesson.title,
+    "content": Lesson.content,
+    "content_length": func.length(Lesson.content).label("content_length"),
+    "created_at": Lesson.created_at,
+    "updated_at": Lesson.updated_at,
+}
+LESSON_LIST_DEFAULT_FIELDS = ["id", "title", "updated_at", "content_length"]
+
+# Câu lệnh INSERT ... ON CONFLICT DO UPDATE theo loại CSDL
+_UPSERT_INSERTS = {"postgresql": postgresql_insert, "sqlite": sqlite_insert}
+
+
+def _html_escape(column):
+    # Tương đương html.escape() trong SQL ("&" phải được thay trước)
+    for char, entity in (("&", "&amp;"), ("<", "&lt;"), (">", "&gt;"), ('"', "&quot;"), ("'", "&#x27;")):
+        column = func.replace(column, char, entity)
+    return column
+
+
+def format_validation_error(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(loc) for loc in item['loc']) or 'row'}: {item['msg']}" for item in error.errors()
+    )
 
 
 class LessonController:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
-    def check_id_is_not_null(self, lesson_id: int):
+    async def check_id_is_not_null(self, lesson_id: int):
         # Kiểm tra xem ID đã tồn tại trong cơ sở dữ liệu chưa
-        existing_lesson = self.db.query(Lesson).filter(Lesson.id == lesson_id).first()
+        existing_lesson = await self.db.scalar(select(Lesson.id).where(Lesson.id == lesson_id))
         return existing_lesson
 
-    def create_lesson(self, data: LessonCreate):
+    async def create_lesson(self, data: LessonCreate):
         if data.id is not None:
-            if self.check_id_is_not_null(data.id):
+            if await self.check_id_is_not_null(data.id):
                 raise HTTPException(
                     status_code=status.HTTP_409_CONFLICT,
                     detail="Lesson with this ID already exists."
@@ -26,19 +65,53 @@ class LessonController:
         else:
             lesson = Lesson(title=data.title, content=data.content)
 
+        self.set_sections(lesson)
         self.db.add(lesson)
-        self.db.commit()
-        self.db.refresh(lesson)
+        await self.db.commit()
+        await self.db.refresh(lesson)
+        lesson_cache.invalidate(lesson.id)
+        lesson_search_index.invalidate()
         return lesson
 
-    def get_lesson(self, lesson_id: int):
-        return self.db.query(Lesson).filter(Lesson.id == lesson_id).first()
+    @staticmethod
+    def set_sections(lesson: Lesson):
+        # Chia nội dung bài học thành các phần ngay khi ghi, dùng cho truy hồi ngữ cảnh khi hỏi đáp
+        lesson.sections = [
+            LessonSection(position=position, content=content)
+            for position, content in enumerate(split_sections(lesson.content, settings.LESSON_SECTION_MAX_CHARS))
+        ]
 
-    def get_all_lessons(self) -> List[Lesson]:
-        return self.db.query(Lesson).order_by(Lesson.id).all()
+    async def get_lesson(self, lesson_id: int, with_sections: bool = False):
+        # AsyncSession không tự nạp quan hệ khi truy cập, các phần bài học phải được nạp cùng lúc
+        query = select(Lesson).where(Lesson.id == lesson_id)
+        if with_sections:
+            query = query.options(selectinload(Lesson.sections))
+        return await self.db.scalar(query)
 
-    def update_lesson(self, lesson_id: int, data: LessonUpdate):
-        lesson = self.get_lesson(lesson_id)
+    async def get_lesson_cached(self, lesson_id: int) -> Optional[CachedLesson]:
+        # Đọc bài học qua cache, chỉ truy vấn CSDL khi chưa có trong cache
+        return await lesson_cache.get_or_load(lesson_id, lambda id: self.get_lesson(id, with_sections=True))
+
+    async def get_all_lessons(self) -> List[Lesson]:
+        return (await self.db.scalars(select(Lesson).order_by(Lesson.id))).all()
+
+    async def list_lessons(self, cursor: Optional[int] = None, limit: int = 50,
+                     fields: Optional[List[str]] = None) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        # Phân trang theo khóa (id > cursor) trên khóa chính, chỉ đọc các cột được chọn
+        fields = fields or LESSON_LIST_DEFAULT_FIELDS
+        if "id" not in fields:
+            fields = ["id", *fields]
+        query = select(*(LESSON_LIST_FIELDS[field] for field in fields))
+        if cursor is not None:
+            query = query.where(Lesson.id > cursor)
+        # Lấy thêm một dòng để biết còn trang sau hay không
+        rows = (await self.db.execute(query.order_by(Lesson.id).limit(limit + 1))).all()
+
+        next_cursor = rows[limit - 1].id if len(rows) > limit else None
+        return [dict(zip(fields, row)) for row in rows[:limit]], next_cursor
+
+    async def update_lesson(self, lesson_id: int, data: LessonUpdate):
+        lesson = await self.get_lesson(lesson_id, with_sections=data.content is not None)
         if not lesson:
             return None
 
@@ -46,23 +119,173 @@ class LessonController:
             lesson.title = data.title
         if data.content is not None:
             lesson.content = data.content
+            self.set_sections(lesson)
 
-        self.db.commit()
-        self.db.refresh(lesson)
+        await self.db.commit()
+        await self.db.refresh(lesson)
+        lesson_cache.invalidate(lesson_id)
+        lesson_search_index.invalidate()
         return lesson
 
-    def delete_lesson(self, lesson_id: int):
-        lesson = self.get_lesson(lesson_id)
+    async def delete_lesson(self, lesson_id: int):
+        lesson = await self.get_lesson(lesson_id)
         if not lesson:
             return False
 
-        self.db.delete(lesson)
-        self.db.commit()
+        await self.db.delete(lesson)
+        await self.db.commit()
+        lesson_cache.invalidate(lesson_id)
+        lesson_search_index.invalidate()
         return True
 
+    async def import_lessons(self, rows: AsyncIterator[Tuple[int, Any, Optional[str]]],
+                             batch_size: int, overwrite: bool = True) -> Dict[str, Any]:
+        # Kiểm tra từng bản ghi bằng LessonCreate, ghi theo lô; lỗi được trả về theo số thứ tự bản ghi.
+        # overwrite=False: bài học có id đã tồn tại được giữ nguyên và tính vào skipped
+        imported = 0
+        skipped = 0
+        errors: List[Dict[str, Any]] = []
+        batch: List[Tuple[int, LessonCreate]] = []
+
+        async def flush():
+            nonlocal imported, skipped
+            error, batch_skipped = await self.upsert_lessons([data for _, data in batch], overwrite)
+            if error is None:
+                imported += len(batch) - batch_skipped
+                skipped += batch_skipped
+            else:
+                errors.extend({"row": row, "id": data.id, "detail": error} for row, data in batch)
+            batch.clear()
+
+        async for row, data, error in rows:
+            if error is None:
+                try:
+                    batch.append((row, LessonCreate.model_validate(data)))
+                except ValidationError as e:
+                    error = format_validation_error(e)
+            if error is not None:
+                errors.append({"row": row, "id": data.get("id") if isinstance(data, dict) else None,
+                               "detail": error})
+            elif len(batch) >= batch_size:
+                await flush()
+        if batch:
+            await flush()
+
+        if imported:
+            lesson_search_index.invalidate()
+        return {"imported": imported, "skipped": skipped, "failed": len(errors), "errors": errors}
+
+    async def upsert_lessons(self, rows: List[LessonCreate], overwrite: bool = True) -> Tuple[Optional[str], int]:
+        # Ghi một lô bài học trong một transaction: bài học có id được upsert bằng một câu lệnh
+        # nhiều dòng (overwrite=False: bỏ qua id đã tồn tại), bài học không có id được thêm mới;
+        # các phần của bài học được ghi lại theo lô. Trả về (lỗi hoặc None, số bài học bị bỏ qua)
+        upsert = _UPSERT_INSERTS.get(self.db.get_bind().dialect.name)
+        now = datetime.utcnow()
+        with_id: Dict[int, Dict[str, Any]] = {}
+        without_id: List[Dict[str, Any]] = []
+        for data in rows:
+            values = {"title": data.title, "content": data.content, "created_at": now, "updated_at": now}
+            if data.id is not None:
+                with_id[data.id] = {"id": data.id, **values}  # Trùng id trong lô: bản ghi sau thắng
+            else:
+                without_id.append(values)
+
+        skipped = 0
+        try:
+            contents: List[Tuple[int, str]] = []
+            if with_id:
+                if not overwrite:
+                    inserted = await self._insert_new_lessons(with_id, upsert)
+                    skipped, with_id = len(with_id) - len(inserted), inserted
+                elif upsert is not None:
+                    statement = upsert(Lesson).values(list(with_id.values()))
+                    statement = statement.on_conflict_do_update(
+                        index_elements=[Lesson.id],
+                        set_={
+                            "title": statement.excluded.title,
+                            "content": statement.excluded.content,
+                            "updated_at": statement.excluded.updated_at,
+                        }
+                    )
+                    await self.db.execute(statement)
+                else:
+                    for values in with_id.values():
+                        await self.db.merge(Lesson(**values))
+                if self.db.get_bind().dialect.name == "postgresql":
+                    # id được chỉ định không làm tăng sequence; đồng bộ lại để bài học thêm mới không bị trùng id
+                    await self.db.execute(text(
+                        "SELECT setval(pg_get_serial_sequence('lessons', 'id'), (SELECT MAX(id) FROM lessons))"
+                    ))
+                await self.db.execute(delete(LessonSection).where(LessonSection.lesson_id.in_(list(with_id))))
+                contents.extend((lesson_id, values["content"]) for lesson_id, values in with_id.items())
+            if without_id:
+                new_ids = (await self.db.execute(
+                    insert(Lesson).returning(Lesson.id, sort_by_parameter_order=True), without_id
+                )).scalars().all()
+                contents.extend((lesson_id, values["content"]) for lesson_id, values in zip(new_ids, without_id))
+
+            sections = [
+                {"lesson_id": lesson_id, "position": position, "content": section}
+                for lesson_id, content in contents
+                for position, section in enumerate(split_sections(content, settings.LESSON_SECTION_MAX_CHARS))
+            ]
+            if sections:
+                await self.db.execute(insert(LessonSection), sections)
+
+            await self.db.commit()
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            print(f"Lỗi khi nhập bài học: {e}")
+            return f"Lỗi CSDL: {e.__class__.__name__}", 0
+
+        for lesson_id in with_id:
+            lesson_cache.invalidate(lesson_id)
+        return None, skipped
+
+    async def _insert_new_lessons(self, with_id: Dict[int, Dict[str, Any]], upsert) -> Dict[int, Dict[str, Any]]:
+        # Chỉ thêm các bài học có id chưa tồn tại, bài học đã có không bị ghi đè; trả về các bài học đã thêm
+        if upsert is not None:
+            statement = upsert(Lesson).values(list(with_id.values()))
+            statement = statement.on_conflict_do_nothing(index_elements=[Lesson.id]).returning(Lesson.id)
+            inserted = set((await self.db.execute(statement)).scalars().all())
+        else:
+            existing = set((await self.db.scalars(select(Lesson.id).where(Lesson.id.in_(list(with_id))))).all())
+            inserted = set(with_id) - existing
+            if inserted:
+                await self.db.execute(insert(Lesson), [with_id[lesson_id] for lesson_id in inserted])
+        return {lesson_id: values for lesson_id, values in with_id.items() if lesson_id in inserted}
+
+    async def _load_search_documents(self) -> List[Tuple[int, str, str]]:
+        return [tuple(row) for row in (await self.db.execute(select(Lesson.id, Lesson.title, Lesson.content))).all()]
+
+    async def search_lessons(self, search_term: str, limit: int = 20, offset: int = 0) -> Tuple[int, List[Dict[str, Any]]]:
+        # Postgres: tìm kiếm toàn văn qua cột tsvector có chỉ mục GIN;
+        # CSDL khác (SQLite khi test): chỉ mục ngược trong tiến trình
+        if self.db.get_bind().dialect.name != "postgresql":
+            return await lesson_search_index.search(search_term, limit, offset, self._load_search_documents)
+
+        search_vector = literal_column("lessons.search_vector")
+        ts_query = func.websearch_to_tsquery("simple", search_term)
+        matched = search_vector.op("@@")(ts_query)
+
+        total = await self.db.scalar(select(func.count(Lesson.id)).where(matched))
 
+        rank = func.ts_rank_cd(search_vector, ts_query).label("rank")
+        page = select(Lesson.id, rank).where(matched) \
+            .order_by(rank.desc(), Lesson.id).limit(limit).offset(offset).subquery()
+        # Đoạn trích chỉ được tạo cho các bài học trong trang hiện tại; nội dung được escape HTML
+        # trước ts_headline để <mark> là markup duy nhất (giống make_snippet)
+        snippet = func.ts_headline(
+            "simple", _html_escape(Lesson.content), ts_query,
+            "StartSel=<mark>, StopSel=</mark>, MaxWords=30, MinWords=10, MaxFragments=2"
+        ).label("snippet")
+        rows = (await self.db.execute(
+            select(Lesson.id, Lesson.title, page.c.rank, snippet)
+            .join(page, page.c.id == Lesson.id)
+            .order_by(page.c.rank.desc(), Lesson.id)
+        )).all()
 
-    # def search_lessons(self, search_term: str) -> List[Lesson]:
-    #     return self.db.query(Lesson).filter(
-    #         Lesson.title.ilike(f'%{search_term}%') | Lesson.content.ilike(f'%{search_term}%')
-    #     ).all()
\ No newline at end of file
+        return total, [
+            {"id": row.id, "title": row.title, "rank": row.rank, "snippet": row.snippet}
+            for row in rows
+        ]
@@ -1,11 +1,59 @@
-from openai import OpenAI
+from typing import Optional
+
+import httpx
+from openai import AsyncOpenAI
 from app.config import settings
+from app.utils.metrics import register_metrics
+from app.utils.single_flight import SingleFlight
+
+# Client dùng chung cho toàn bộ tiến trình, được tạo khi cần lần đầu
+_client: Optional[AsyncOpenAI] = None
+
+# Gộp các request giống hệt nhau (cùng prompt, model, max_tokens) đang chờ LLM
+_single_flight = SingleFlight()
+register_metrics("llm_single_flight", _single_flight.stats)
+
+
+def get_llm_client() -> AsyncOpenAI:
+    """
+    Lấy client LLM bất đồng bộ dùng chung (connection pool + keep-alive).
+
+    Returns:
+        AsyncOpenAI client dùng chung cho mọi request.
+    """
+    global _client
+    if _client is None:
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.LLM_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.LLM_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(
+                settings.LLM_READ_TIMEOUT,
+                connect=settings.LLM_CONNECT_TIMEOUT,
+            ),
+        )
+        _client = AsyncOpenAI(
+            base_url=settings.OPENAI_API_URL,
+            api_key=settings.OPENAI_API_KEY,
+            max_retries=settings.LLM_MAX_RETRIES,
+            http_client=http_client,
+        )
+    return _client
 
-def generate_response(prompt: str,
-                      model: str = settings.OPENAI_MODEL,
-                      max_tokens: int = settings.MAX_TOKEN,
-                      api_key: str = settings.OPENAI_API_KEY,
-                      url: str = settings.OPENAI_API_URL):
+
+async def close_llm_client():
+    """Đóng client LLM dùng chung (gọi khi tắt ứng dụng)."""
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+
+
+async def generate_response(prompt: str,
+                            model: str = settings.OPENAI_MODEL,
+                            max_tokens: int = settings.MAX_TOKEN):
     """
     Gọi API OpenAI để tạo phản hồi.
 
@@ -13,23 +61,23 @@ def generate_response(prompt: str,
         prompt: Prompt gửi đến LLM.
         model: Model LLM sử dụng.
         max_tokens: Số lượng token tối đa.
-        api_key: API key.
-        url: URL của API.
 
     Returns:
         Stream phản hồi từ LLM.
     """
-    client = OpenAI(
-        base_url=url,
-        api_key=api_key
-    )
-    stream = client.completions.create(
-        model=model,
-        prompt=prompt,
-        stream=False,
-        max_tokens=max_tokens
-    )
-    return stream
+    client = get_llm_client()
+
+    def create():
+        return client.completions.create(
+            model=model,
+            prompt=prompt,
+            stream=False,
+            max_tokens=max_tokens
+        )
+
+    if not settings.LLM_SINGLE_FLIGHT_ENABLED:
+        return await create()
+    return await _single_flight.do((model, max_tokens, prompt), create)
 
 
 def process_stream(stream) -> str:
@@ -46,4 +94,46 @@ def process_stream(stream) -> str:
     # print(stream)
     response_text = stream.choices[0].text if stream.choices else ""
     # print(response_text)
-    return response_text
\ No newline at end of file
+    return response_text
+
+
+async def stream_response(prompt: str,
+                          model: str = settings.OPENAI_MODEL,
+                          max_tokens: int = settings.MAX_TOKEN):
+    """
+    Gọi API OpenAI ở chế độ stream và trả về từng đoạn văn bản ngay khi nhận được.
+
+    Các request đồng thời có cùng prompt dùng chung một lời gọi tới LLM.
+
+    Args:
+        prompt: Prompt gửi đến LLM.
+        model: Model LLM sử dụng.
+        max_tokens: Số lượng token tối đa.
+
+    Yields:
+        Từng đoạn văn bản (token) do LLM sinh ra.
+    """
+    if not settings.LLM_SINGLE_FLIGHT_ENABLED:
+        tokens = _stream_completion(prompt, model, max_tokens)
+    else:
+        tokens = _single_flight.stream(
+            (model, max_tokens, prompt),
+            lambda: _stream_completion(prompt, model, max_tokens)
+        )
+    async for token in tokens:
+        yield token
+
+
+async def _stream_completion(prompt: str, model: str, max_tokens: int):
+    """Một lời gọi stream tới LLM"""
+    client = get_llm_client()
+    stream = await client.completions.create(
+        model=model,
+        prompt=prompt,
+        stream=True,
+        max_tokens=max_tokens
+    )
+    async for chunk in stream:
+        text = chunk.choices[0].text if chunk.choices else ""
+        if text:
+            yield text
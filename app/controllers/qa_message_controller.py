@@ -1,16 +1,50 @@
 from app.models.chat_model import ChatHistory
+from app.models.session_store import SessionStore, create_session_store
 from app.schemas.responses import MessageRequest, MessageResponse, ChatHistoryResponse
-from app.controllers.llm_service import generate_response, process_stream
-from app.utils.reflection import Reflection
-from app.config import REFLECTION
+from app.controllers.llm_service import generate_response, process_stream, stream_response
+from app.config import REFLECTION, settings
 from app.prompt.tutor_prompt import AITutorPrompt
-from typing import Dict, List, Any
+from app.prompt.theory_prompt import TheoryPrompt
+from app.utils.lesson_cache import CachedLesson
+from app.utils.tokens import count_tokens
+from app.utils.response_cache import ResponseCache
+from app.utils.semantic_cache import SemanticCache
+from app.utils.transcript_writer import TranscriptWriter
+from typing import Dict, List, Any, AsyncIterator, Optional
 
 class ChatSessionManager:
     """Quản lý các phiên trò chuyện"""
 
-    def __init__(self):
-        self.chat_sessions: Dict[str, ChatHistory] = {}  # Lưu trữ chat history cho mỗi session
+    def __init__(self, store: Optional[SessionStore] = None,
+                 welcome_message: str = "💻 Chào mừng bạn đến với AI Gia sư! 🚀",
+                 response_cache: Optional[ResponseCache] = None,
+                 semantic_cache: Optional[SemanticCache] = None,
+                 transcript_writer: Optional[TranscriptWriter] = None,
+                 transcript_namespace: str = "default"):
+        """
+        Args:
+            store: Nơi lưu lịch sử chat của các session. Mặc định tạo theo cấu hình `SESSION_STORE`.
+            welcome_message: Tin nhắn chào mừng khi bắt đầu session mới.
+            response_cache: Cache phản hồi cho các câu hỏi giống hệt nhau (None: không dùng cache).
+            semantic_cache: Cache phản hồi cho câu hỏi mở đầu gần giống trong cùng bài học (None: không dùng).
+            transcript_writer: Hàng đợi ghi lịch sử hỏi đáp vào CSDL (None: không ghi).
+            transcript_namespace: Tiền tố ID session khi ghi vào CSDL (vd: "guide", "qa").
+        """
+        self.store = store if store is not None else create_session_store()
+        self.response_cache = response_cache
+        self.semantic_cache = semantic_cache
+        self.transcript_writer = transcript_writer
+        self.transcript_namespace = transcript_namespace
+        self.welcome_message = welcome_message
+        # Ngân sách token cho lịch sử = context của model - system prompt - token sinh ra
+        # (với prompt bài học, trừ thêm phần nội dung bài học đưa vào prompt)
+        self.history_token_budget = max(
+            0, settings.MODEL_CONTEXT_TOKENS - count_tokens(AITutorPrompt.template) - settings.MAX_TOKEN
+        )
+        self.lesson_history_token_budget = max(
+            0, settings.MODEL_CONTEXT_TOKENS - count_tokens(TheoryPrompt.template) - settings.MAX_TOKEN
+            - settings.LESSON_CONTEXT_MAX_TOKENS
+        )
         self.messages: List[Dict[str, Any]] = []
 
     def add_message(self, role: str, content: str):
@@ -25,35 +59,131 @@ class ChatSessionManager:
         """Lấy n tin nhắn gần nhất"""
         return self.messages[-n:] if n < len(self.messages) else self.messages
 
-    def get_chat_history(self, session_id: str) -> ChatHistory:
+    async def get_chat_history(self, session_id: str) -> ChatHistory:
         """Lấy hoặc tạo mới lịch sử chat cho session"""
-        if session_id not in self.chat_sessions:
-            self.chat_sessions[session_id] = ChatHistory()
+        chat_history = ChatHistory(session_id, self.store)
+        if not await self.store.exists(session_id):
             # Thêm tin nhắn chào mừng
-            self.chat_sessions[session_id].add_message(
-                "Assistant",
-                "💻 Chào mừng bạn đến với AI Gia sư! 🚀"
+            await chat_history.add_message("Assistant", self.welcome_message)
+        return chat_history
+
+    async def add_turn_message(self, chat_history: ChatHistory, role: str, content: str,
+                               lesson: Optional[CachedLesson] = None):
+        """Thêm tin nhắn của lượt hỏi đáp vào lịch sử và đưa vào hàng đợi ghi CSDL"""
+        await chat_history.add_message(role, content)
+        if self.transcript_writer is not None:
+            self.transcript_writer.record(
+                f"{self.transcript_namespace}:{chat_history.session_id}", role, content,
+                lesson.id if lesson is not None else None
+            )
+
+    async def select_history(self, chat_history: ChatHistory,
+                             lesson: Optional[CachedLesson] = None) -> List[Dict[str, Any]]:
+        """Chọn phần lịch sử gần nhất sẽ đưa vào prompt"""
+        history = await chat_history.get_history()
+        if settings.REFLECTION_MODE == "tokens":
+            budget = self.lesson_history_token_budget if lesson is not None else self.history_token_budget
+            return REFLECTION(history, token_budget=budget)
+        return REFLECTION(history, last_items_considered=12)
+
+    def build_prompt(self, latest_history: List[Dict[str, Any]], lesson: Optional[CachedLesson] = None) -> str:
+        """
+        Tạo prompt từ lịch sử chat gần nhất.
+
+        Nếu có bài học, chỉ các phần của bài học liên quan tới câu hỏi hiện tại
+        và các câu hỏi gần nhất được đưa vào prompt.
+        """
+        if lesson is None:
+            return AITutorPrompt(history=latest_history).format()
+        recent_questions = [entry["content"] for entry in latest_history if entry["role"] == "user"][-3:]
+        context = lesson.select_context("\n".join(recent_questions))
+        return TheoryPrompt(context=context, history=latest_history).format()
+
+    def cache_key(self, latest_history: List[Dict[str, Any]], lesson: Optional[CachedLesson]) -> Optional[str]:
+        """Khóa cache phản hồi cho lượt hỏi hiện tại (None nếu không dùng cache)"""
+        if self.response_cache is None:
+            return None
+        if lesson is None:
+            return self.response_cache.make_key(
+                "tutor", None, latest_history, settings.OPENAI_MODEL, settings.MAX_TOKEN
             )
-        return self.chat_sessions[session_id]
+        return self.response_cache.make_key(
+            "theory", lesson.id, latest_history, settings.OPENAI_MODEL, settings.MAX_TOKEN, lesson.revision
+        )
+
+    @staticmethod
+    def is_first_turn(latest_history: List[Dict[str, Any]]) -> bool:
+        """Lượt hỏi hiện tại có phải câu hỏi đầu tiên của session không"""
+        return len(latest_history) <= 2 and sum(1 for entry in latest_history if entry["role"] == "user") == 1
+
+    def get_cached_response(self, key: Optional[str], latest_history: List[Dict[str, Any]],
+                            lesson: Optional[CachedLesson], query: str) -> Optional[str]:
+        """Tìm phản hồi trong cache khớp chính xác, sau đó trong cache câu hỏi mở đầu gần giống"""
+        if key:
+            response_text = self.response_cache.get(key)
+            if response_text is not None:
+                return response_text
+        if self.semantic_cache is not None and lesson is not None and self.is_first_turn(latest_history):
+            return self.semantic_cache.lookup(lesson.id, query, lesson.revision)
+        return None
 
-    def progress_message(self, session_id: str, query: str) -> str:
+    def save_response(self, key: Optional[str], latest_history: List[Dict[str, Any]],
+                      lesson: Optional[CachedLesson], query: str, response_text: str):
+        """Lưu phản hồi vừa sinh vào các cache đang bật"""
+        if key:
+            self.response_cache.set(key, response_text, lesson.id if lesson is not None else None)
+        if self.semantic_cache is not None and lesson is not None and self.is_first_turn(latest_history):
+            self.semantic_cache.add(lesson.id, query, response_text, lesson.revision)
+
+    async def progress_message(self, session_id: str, query: str, lesson: Optional[CachedLesson] = None) -> str:
         """Xử lý tin nhắn và phản hồi từ AI"""
         # Lấy chat history
-        chat_history = self.get_chat_history(session_id)
-        chat_history.add_message("user", query)
+        chat_history = await self.get_chat_history(session_id)
+        await self.add_turn_message(chat_history, "user", query, lesson)
 
         # Tạo prompt
-        history = chat_history.get_history()
-        latest_history = REFLECTION(history, last_items_considered=12)
-        prompt = AITutorPrompt(history=latest_history).format()
+        latest_history = await self.select_history(chat_history, lesson)
+        key = self.cache_key(latest_history, lesson)
+        response_text = self.get_cached_response(key, latest_history, lesson, query)
+
+        if response_text is None:
+            prompt = self.build_prompt(latest_history, lesson)
 
-        # Gọi LLM API
-        stream = generate_response(prompt)
+            # Gọi LLM API
+            stream = await generate_response(prompt)
 
-        # Xử lý phản hồi
-        response_text = process_stream(stream)
+            # Xử lý phản hồi
+            response_text = process_stream(stream)
+            self.save_response(key, latest_history, lesson, query, response_text)
 
         # Cập nhật lịch sử
-        chat_history.add_message("Assistant", response_text)
+        await self.add_turn_message(chat_history, "Assistant", response_text, lesson)
 
         return response_text
+
+    async def stream_message(self, session_id: str, query: str,
+                             lesson: Optional[CachedLesson] = None) -> AsyncIterator[str]:
+        """
+        Xử lý tin nhắn và trả về phản hồi từ AI theo từng token.
+
+        Phản hồi chỉ được lưu vào lịch sử khi LLM sinh xong toàn bộ văn bản.
+        """
+        chat_history = await self.get_chat_history(session_id)
+        await self.add_turn_message(chat_history, "user", query, lesson)
+        latest_history = await self.select_history(chat_history, lesson)
+
+        key = self.cache_key(latest_history, lesson)
+        cached = self.get_cached_response(key, latest_history, lesson, query)
+        if cached is not None:
+            yield cached
+            await self.add_turn_message(chat_history, "Assistant", cached, lesson)
+            return
+
+        chunks: List[str] = []
+        async for token in stream_response(self.build_prompt(latest_history, lesson)):
+            chunks.append(token)
+            yield token
+
+        response_text = "".join(chunks)
+        self.save_response(key, latest_history, lesson, query, response_text)
+        await self.add_turn_message(chat_history, "Assistant", response_text, lesson)
@@ -1,16 +1,18 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.models import User
 from app.schemas.user import UserCreate, UserUpdate
-from app.utils.auth import get_password_hash, verify_password
+from app.utils.auth import get_password_hash_async, verify_password_async
+from app.utils.auth_cache import auth_cache
 
 
 class UserController:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
-    def create_user(self, user: UserCreate):
-        # Mã hóa password với bcrypt thay vì sha256
-        hashed_password = get_password_hash(user.password)
+    async def create_user(self, user: UserCreate):
+        # Mã hóa password với bcrypt thay vì sha256 (chạy ngoài event loop)
+        hashed_password = await get_password_hash_async(user.password)
 
         db_user = User(
             username=user.username,
@@ -18,29 +20,29 @@ class UserController:
             password_hash=hashed_password
         )
         self.db.add(db_user)
-        self.db.commit()
-        self.db.refresh(db_user)
+        await self.db.commit()
+        await self.db.refresh(db_user)
         return db_user
 
-    def get_user_by_id(self, user_id: int):
-        return self.db.query(User).filter(User.id == user_id).first()
+    async def get_user_by_id(self, user_id: int):
+        return await self.db.scalar(select(User).where(User.id == user_id))
 
-    def get_user_by_username(self, username: str):
-        return self.db.query(User).filter(User.username == username).first()
+    async def get_user_by_username(self, username: str):
+        return await self.db.scalar(select(User).where(User.username == username))
 
-    def get_user_by_email(self, email: str):
-        return self.db.query(User).filter(User.email == email).first()
+    async def get_user_by_email(self, email: str):
+        return await self.db.scalar(select(User).where(User.email == email))
 
-    def authenticate(self, username: str, password: str):
-        user = self.get_user_by_username(username)
+    async def authenticate(self, username: str, password: str):
+        user = await self.get_user_by_username(username)
         if not user:
             return None
-        if not verify_password(password, user.password_hash):
+        if not await verify_password_async(password, user.password_hash):
             return None
         return user
 
-    def update_user(self, user_id: int, user_data: UserUpdate):
-        user = self.get_user_by_id(user_id)
+    async def update_user(self, user_id: int, user_data: UserUpdate):
+        user = await self.get_user_by_id(user_id)
         if not user:
             return None
 
@@ -49,17 +51,30 @@ class UserController:
         if user_data.email:
             user.email = user_data.email
         if user_data.password:
-            user.password_hash = get_password_hash(user_data.password)
+            user.password_hash = await get_password_hash_async(user_data.password)
 
-        self.db.commit()
-        self.db.refresh(user)
+        await self.db.commit()
+        await self.db.refresh(user)
+        auth_cache.invalidate_user(user_id)
         return user
 
-    def delete_user(self, user_id: int):
-        user = self.get_user_by_id(user_id)
+    async def deactivate_user(self, user_id: int):
+        user = await self.get_user_by_id(user_id)
+        if not user:
+            return None
+
+        user.is_active = False
+        await self.db.commit()
+        await self.db.refresh(user)
+        auth_cache.invalidate_user(user_id)
+        return user
+
+    async def delete_user(self, user_id: int):
+        user = await self.get_user_by_id(user_id)
         if not user:
             return False
 
-        self.db.delete(user)
-        self.db.commit()
-        return True
\ No newline at end of file
+        await self.db.delete(user)
+        await self.db.commit()
+        auth_cache.invalidate_user(user_id)
+        return True
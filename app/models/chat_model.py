@@ -1,19 +1,34 @@
-from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+
+from app.models.session_store import SessionStore, InMemorySessionStore
+from app.utils.tokens import count_tokens, MESSAGE_OVERHEAD_TOKENS
 
 
 class ChatHistory:
-    def __init__(self):
-        self.messages: List[Dict[str, Any]] = []
+    def __init__(self, session_id: str = "default", store: Optional[SessionStore] = None):
+        self.session_id = session_id
+        self.store = store if store is not None else InMemorySessionStore()
 
-    def add_message(self, role: str, content: str):
-        """Thêm tin nhắn vào lịch sử"""
-        self.messages.append({"role": role, "content": content})
+    async def add_message(self, role: str, content: str):
+        """Thêm tin nhắn vào lịch sử (kèm số token ước tính, chỉ tính một lần)"""
+        await self.store.append_message(self.session_id, {
+            "role": role,
+            "content": content,
+            "tokens": count_tokens(content) + MESSAGE_OVERHEAD_TOKENS
+        })
 
-    def get_history(self) -> List[Dict[str, Any]]:
+    async def get_history(self) -> List[Dict[str, Any]]:
         """Lấy toàn bộ lịch sử chat"""
-        return self.messages
+        return await self.store.get_messages(self.session_id)
+
+    async def get_history_after(self, after: int) -> List[Dict[str, Any]]:
+        """Lấy các tin nhắn mới hơn seq after"""
+        return await self.store.get_messages_after(self.session_id, after)
+
+    async def last_seq(self) -> int:
+        """Seq của tin nhắn cuối cùng"""
+        return await self.store.last_seq(self.session_id)
 
-    def get_last_n_messages(self, n: int) -> List[Dict[str, Any]]:
+    async def get_last_n_messages(self, n: int) -> List[Dict[str, Any]]:
         """Lấy n tin nhắn gần nhất"""
-        return self.messages[-n:] if n < len(self.messages) else self.messages
\ No newline at end of file
+        return await self.store.get_messages(self.session_id, last_n=n)
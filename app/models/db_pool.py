@@ -0,0 +1,64 @@
+import threading
+import time
+from typing import Any, Dict
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+# Lần lấy kết nối chờ lâu hơn ngưỡng này được tính là chậm
+SLOW_CHECKOUT_SECONDS = 0.1
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """
+    Connection pool đo thời gian chờ lấy kết nối, số lần vượt pool_size (overflow) và số lần hết thời gian chờ.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.slow_checkouts = 0
+        self.overflow_events = 0
+        self.timeouts = 0
+
+    def _do_get(self):
+        overflow_before = self._overflow
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        waited = time.perf_counter() - start
+
+        with self._stats_lock:
+            self.checkouts += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+            if waited >= SLOW_CHECKOUT_SECONDS:
+                self.slow_checkouts += 1
+            # _overflow bắt đầu từ -pool_size và tăng mỗi khi tạo kết nối mới: chỉ tính khi
+            # kết nối vừa tạo nằm ngoài pool_size
+            if self._overflow > overflow_before and self._overflow > 0:
+                self.overflow_events += 1
+        return connection
+
+    def stats(self) -> Dict[str, Any]:
+        """Số liệu hoạt động của connection pool"""
+        return {
+            "pool_size": self.size(),
+            "in_use": self.checkedout(),
+            "idle": self.checkedin(),
+            "overflow": max(self.overflow(), 0),
+            "max_overflow": self._max_overflow,
+            "checkouts": self.checkouts,
+            "avg_wait_ms": self.wait_seconds_total * 1000 / self.checkouts if self.checkouts else 0.0,
+            "max_wait_ms": self.wait_seconds_max * 1000,
+            "slow_checkouts": self.slow_checkouts,
+            "overflow_events": self.overflow_events,
+            "timeouts": self.timeouts,
+        }
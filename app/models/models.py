@@ -1,9 +1,13 @@
 # app/models/models.py
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, create_engine
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, Index, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship, sessionmaker, Mapped, mapped_column
+from sqlalchemy.orm import relationship, Mapped, mapped_column
 from datetime import datetime
 from app.config import settings
+from app.models.db_pool import InstrumentedPool
+from app.utils.metrics import register_metrics
 
 Base = declarative_base()
 
@@ -21,10 +25,29 @@ class User(Base):
 
     # Relationships
     qa_session = relationship("Qa_Session", back_populates="user")
+    tokens = relationship("Token", back_populates="user", cascade="all, delete-orphan")
 
     def __repr__(self):
         return f"<User(username='{self.username}', email='{self.email}')>"
 
+class Token(Base):
+    __tablename__ = 'tokens'
+
+    id = Column(Integer, primary_key=True)
+    token_hash = Column(String(64), unique=True, nullable=False)  # SHA-256 của access token, không lưu token gốc
+    token_type = Column(String(20), default="bearer")
+    expires_at = Column(DateTime, nullable=False, index=True)
+    is_revoked = Column(Boolean, default=False)
+    revoked_at = Column(DateTime, nullable=True, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+
+    # Relationships
+    user = relationship("User", back_populates="tokens")
+
+    def __repr__(self):
+        return f"<Token(user_id='{self.user_id}', expires_at='{self.expires_at}', is_revoked='{self.is_revoked}')>"
+
 class Lesson(Base):
     __tablename__ = 'lessons'
 
@@ -36,17 +59,63 @@ class Lesson(Base):
 
     # Relationships
     qa_session = relationship("Qa_Session", back_populates="lesson")
+    sections = relationship("LessonSection", back_populates="lesson", cascade="all, delete-orphan",
+                            order_by="LessonSection.position")
 
     def __repr__(self):
         return f"<Lesson(id='{self.id}', title='{self.title}', content='{self.content}')>"
 
+class LessonSection(Base):
+    __tablename__ = 'lesson_sections'
+
+    id = Column(Integer, primary_key=True)
+    lesson_id = Column(Integer, ForeignKey('lessons.id', ondelete='CASCADE'), nullable=False, index=True)
+    position = Column(Integer, nullable=False)  # Thứ tự của phần trong bài học
+    content = Column(Text, nullable=False)
+
+    # Relationships
+    lesson = relationship("Lesson", back_populates="sections")
+
+    def __repr__(self):
+        return f"<LessonSection(lesson_id='{self.lesson_id}', position='{self.position}')>"
+
+class Conversation(Base):
+    __tablename__ = 'conversations'
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
+    title = Column(String(200))
+    lesson_id = Column(Integer, ForeignKey('lessons.id', ondelete='SET NULL'), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<Conversation(id='{self.id}', user_id='{self.user_id}', title='{self.title}')>"
+
+class Message(Base):
+    __tablename__ = 'messages'
+    # Phân trang theo khóa (created_at, id) trong một hội thoại
+    __table_args__ = (
+        Index('ix_messages_conversation_created_id', 'conversation_id', 'created_at', 'id'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    conversation_id = Column(Integer, ForeignKey('conversations.id', ondelete='CASCADE'), nullable=False)
+    role = Column(String(20), nullable=False)  # 'user', 'assistant' hoặc 'system'
+    content = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<Message(conversation_id='{self.conversation_id}', role='{self.role}', content='{self.content[:20]}...')>"
+
 class Qa_Message(Base):
     __tablename__ = 'qa_messages'
 
     id = Column(Integer, primary_key=True)
-    role = Column(String(20), nullable=False)  # 'user' hoặc 'assistant'
+    role = Column(String(20), nullable=False)  # 'user' hoặc 'Assistant'
     content = Column(Text, nullable=False)
-    session_id = Column(Integer, ForeignKey('qa_sessions.id'), nullable=False)
+    session_id = Column(String(255), ForeignKey('qa_sessions.id', ondelete='CASCADE'), nullable=False, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
 
     # Relationships
     qa_session = relationship("Qa_Session", back_populates="qa_message")
@@ -57,32 +126,72 @@ class Qa_Message(Base):
 
 class Qa_Session(Base):
     __tablename__ = 'qa_sessions'
-    id = Column(String(100), primary_key=True)
-    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
-    lesson_id = Column(Integer, ForeignKey('lessons.id'), nullable=False)
-    histories = Column(Text, ForeignKey('qa_message.content'),nullable=False)
+    id = Column(String(255), primary_key=True)  # "<nhóm session>:<session_id>", vd: "guide:abc123"
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=True)
+    lesson_id = Column(Integer, ForeignKey('lessons.id', ondelete='SET NULL'), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     #Relationships
     user = relationship("User", back_populates="qa_session")
     lesson = relationship("Lesson", back_populates="qa_session")
-    qa_message = relationship("Qa_Message", back_populates="qa_session")
+    qa_message = relationship("Qa_Message", back_populates="qa_session", cascade="all, delete-orphan",
+                              order_by="Qa_Message.id")
+
+
+# Tìm kiếm toàn văn bài học trên Postgres: cột tsvector sinh tự động (tiêu đề có trọng số cao hơn)
+# và chỉ mục GIN. Cột không khai báo trong model để các CSDL khác (SQLite khi test) vẫn tạo được bảng.
+LESSON_SEARCH_DDL = [
+    "ALTER TABLE lessons ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(content, '')), 'B')) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_lessons_search_vector ON lessons USING GIN (search_vector)",
+]
+
+
+# Driver async tương ứng với từng loại CSDL
+ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+
+
+def to_async_url(database_url: str):
+    """Đổi DATABASE_URL (vd: postgresql://..., sqlite:///...) sang driver async (asyncpg, aiosqlite)"""
+    url = make_url(database_url)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    return url.set(drivername=f"{url.get_backend_name()}+{driver}") if driver else url
+
+
+def create_engine_from_settings():
+    url = to_async_url(settings.DATABASE_URL)
+    if url.get_backend_name() == "sqlite":
+        # SQLite (khi test) dùng pool mặc định của SQLAlchemy
+        return create_async_engine(url)
+    return create_async_engine(
+        url,
+        poolclass=InstrumentedPool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+    )
 
 
 # Engine và Session
-engine = create_engine(settings.DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+engine = create_engine_from_settings()
+if isinstance(engine.pool, InstrumentedPool):
+    register_metrics("db_pool", lambda: engine.pool.stats())
+SessionLocal = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
 
 # Database Dependency
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 
 # Khởi tạo database
-def init_db():
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+async def init_db():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        if engine.dialect.name == "postgresql":
+            for statement in LESSON_SEARCH_DDL:
+                await conn.execute(text(statement))
@@ -0,0 +1,318 @@
+import itertools
+import json
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional
+
+import redis.asyncio as redis
+
+from app.config import settings
+
+
+class SessionStore(ABC):
+    """Giao diện lưu trữ lịch sử chat theo session"""
+
+    @abstractmethod
+    async def exists(self, session_id: str) -> bool:
+        """Kiểm tra session đã có lịch sử chưa"""
+
+    @abstractmethod
+    async def append_message(self, session_id: str, message: Dict[str, Any]) -> None:
+        """Thêm một tin nhắn vào cuối lịch sử của session, gán số thứ tự tăng dần vào trường "seq" """
+
+    @abstractmethod
+    async def get_messages(self, session_id: str, last_n: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Lấy lịch sử của session (hoặc n tin nhắn gần nhất nếu có last_n)"""
+
+    @abstractmethod
+    async def get_messages_after(self, session_id: str, after: int) -> List[Dict[str, Any]]:
+        """
+        Lấy các tin nhắn có seq lớn hơn after.
+
+        Nếu after lớn hơn seq cuối cùng (session đã bị xóa/hết hạn và tạo lại), trả về toàn bộ lịch sử.
+        """
+
+    @abstractmethod
+    async def last_seq(self, session_id: str) -> int:
+        """Seq của tin nhắn cuối cùng trong session (0 nếu chưa có tin nhắn)"""
+
+    @abstractmethod
+    async def delete(self, session_id: str) -> None:
+        """Xóa lịch sử của session"""
+
+    async def close(self) -> None:
+        """Giải phóng kết nối (gọi khi tắt ứng dụng)"""
+
+    def stats(self) -> Dict[str, Any]:
+        """Thống kê hoạt động của store"""
+        return {}
+
+
+class _MemorySession:
+    """Lịch sử của một session trong bộ nhớ kèm dung lượng ước tính"""
+    __slots__ = ("messages", "nbytes", "last_access")
+
+    def __init__(self, now: float):
+        self.messages: List[Dict[str, Any]] = []
+        self.nbytes = 0
+        self.last_access = now
+
+
+def _message_size(message: Dict[str, Any]) -> int:
+    """Ước tính số byte bộ nhớ mà một tin nhắn chiếm"""
+    return sys.getsizeof(message) + sum(sys.getsizeof(value) for value in message.values())
+
+
+class InMemorySessionStore(SessionStore):
+    """
+    Lưu lịch sử chat trong bộ nhớ của tiến trình.
+
+    Các session được giữ theo thứ tự LRU và bị loại bỏ khi quá hạn TTL (tính từ lần truy cập cuối),
+    khi vượt quá số session tối đa hoặc khi tổng dung lượng vượt quá ngân sách byte.
+    """
+
+    def __init__(self, max_messages: Optional[int] = None, max_sessions: Optional[int] = None,
+                 max_bytes: Optional[int] = None, ttl_seconds: Optional[int] = None):
+        """
+        Args:
+            max_messages: Số tin nhắn tối đa giữ lại cho mỗi session.
+            max_sessions: Số session tối đa giữ trong bộ nhớ.
+            max_bytes: Tổng dung lượng (byte, ước tính) tối đa của tất cả session.
+            ttl_seconds: Thời gian sống của session kể từ lần truy cập cuối.
+        """
+        self.sessions: "OrderedDict[str, _MemorySession]" = OrderedDict()
+        self.max_messages = max_messages
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.total_bytes = 0
+        self.evictions = {"lru": 0, "ttl": 0, "bytes": 0}
+        self.trimmed_messages = 0
+        # Dùng chung cho mọi session để seq không lặp lại khi session bị loại bỏ rồi tạo lại
+        self._seq = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _remove(self, session_id: str, reason: Optional[str] = None):
+        session = self.sessions.pop(session_id)
+        self.total_bytes -= session.nbytes
+        if reason:
+            self.evictions[reason] += 1
+
+    def _expire(self, now: float):
+        """Loại bỏ các session quá hạn (session cũ nhất luôn nằm ở đầu OrderedDict)"""
+        if not self.ttl_seconds:
+            return
+        while self.sessions:
+            session_id, session = next(iter(self.sessions.items()))
+            if now - session.last_access <= self.ttl_seconds:
+                break
+            self._remove(session_id, "ttl")
+
+    def _touch(self, session_id: str, now: float) -> Optional[_MemorySession]:
+        self._expire(now)
+        session = self.sessions.get(session_id)
+        if session is not None:
+            session.last_access = now
+            self.sessions.move_to_end(session_id)
+        return session
+
+    def _enforce_limits(self, current_session_id: str):
+        """Loại bỏ session ít dùng nhất cho tới khi thỏa giới hạn (không loại session đang ghi)"""
+        while self.max_sessions and len(self.sessions) > self.max_sessions:
+            self._remove(next(iter(self.sessions)), "lru")
+        while self.max_bytes and self.total_bytes > self.max_bytes and len(self.sessions) > 1:
+            oldest = next(iter(self.sessions))
+            if oldest == current_session_id:
+                break
+            self._remove(oldest, "bytes")
+
+    async def exists(self, session_id: str) -> bool:
+        with self._lock:
+            return self._touch(session_id, time.monotonic()) is not None
+
+    async def append_message(self, session_id: str, message: Dict[str, Any]) -> None:
+        with self._lock:
+            now = time.monotonic()
+            session = self._touch(session_id, now)
+            if session is None:
+                session = self.sessions[session_id] = _MemorySession(now)
+
+            message = {**message, "seq": next(self._seq)}
+            size = _message_size(message)
+            session.messages.append(message)
+            session.nbytes += size
+            self.total_bytes += size
+
+            if self.max_messages and len(session.messages) > self.max_messages:
+                overflow = len(session.messages) - self.max_messages
+                freed = sum(_message_size(m) for m in session.messages[:overflow])
+                del session.messages[:overflow]
+                session.nbytes -= freed
+                self.total_bytes -= freed
+                self.trimmed_messages += overflow
+
+            self._enforce_limits(session_id)
+
+    async def get_messages(self, session_id: str, last_n: Optional[int] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            session = self._touch(session_id, time.monotonic())
+            if session is None:
+                return []
+            return session.messages[-last_n:] if last_n else list(session.messages)
+
+    async def get_messages_after(self, session_id: str, after: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            session = self._touch(session_id, time.monotonic())
+            if session is None:
+                return []
+            if not session.messages or after > session.messages[-1]["seq"]:
+                return list(session.messages)
+            # Tin nhắn luôn được sắp theo seq nên tìm nhị phân thay vì duyệt cả lịch sử
+            return session.messages[bisect_right(session.messages, after, key=lambda m: m["seq"]):]
+
+    async def last_seq(self, session_id: str) -> int:
+        with self._lock:
+            session = self._touch(session_id, time.monotonic())
+            if session is None or not session.messages:
+                return 0
+            return session.messages[-1]["seq"]
+
+    async def delete(self, session_id: str) -> None:
+        with self._lock:
+            if session_id in self.sessions:
+                self._remove(session_id)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._expire(time.monotonic())
+            return {
+                "backend": "memory",
+                "sessions": len(self.sessions),
+                "bytes": self.total_bytes,
+                "max_sessions": self.max_sessions,
+                "max_bytes": self.max_bytes,
+                "evictions": dict(self.evictions),
+                "trimmed_messages": self.trimmed_messages,
+            }
+
+
+class RedisSessionStore(SessionStore):
+    """
+    Lưu lịch sử chat trong Redis (client bất đồng bộ): mỗi session là một list JSON, có TTL.
+
+    Seq của tin nhắn lấy từ bộ đếm INCR riêng của session, tăng trong cùng transaction MULTI với
+    RPUSH nên thứ tự trong list luôn trùng thứ tự seq kể cả khi nhiều worker cùng ghi. Seq không
+    lưu trong JSON mà được tính khi đọc: tin nhắn cuối list có seq bằng bộ đếm, các tin nhắn
+    trước giảm dần. Bộ đếm được giữ khi xóa lịch sử để seq không lặp lại.
+    """
+
+    def __init__(self, client: Optional[redis.Redis] = None, namespace: str = "default",
+                 ttl_seconds: Optional[int] = settings.SESSION_TTL_SECONDS,
+                 max_messages: Optional[int] = settings.SESSION_MAX_MESSAGES):
+        """
+        Args:
+            client: Redis client bất đồng bộ (có thể truyền client giả lập khi test). Mặc định tạo từ Settings.
+            namespace: Tiền tố phân biệt các nhóm session (vd: "guide", "qa").
+            ttl_seconds: Thời gian sống của session kể từ tin nhắn cuối.
+            max_messages: Số tin nhắn tối đa giữ lại cho mỗi session.
+        """
+        self.client = client if client is not None else redis.Redis(
+            host=settings.REDIS_HOST,
+            port=settings.REDIS_PORT,
+            db=settings.REDIS_DB,
+            password=settings.REDIS_PASSWORD,
+            decode_responses=True
+        )
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.max_messages = max_messages
+
+    def _key(self, session_id: str) -> str:
+        return f"chat:{self.namespace}:{session_id}"
+
+    def _seq_key(self, session_id: str) -> str:
+        return f"chat:{self.namespace}:{session_id}:seq"
+
+    async def _read_tail(self, session_id: str, count: Optional[int]) -> List[Dict[str, Any]]:
+        """Đọc count tin nhắn cuối (None: toàn bộ) cùng bộ đếm seq trong một transaction và gán seq"""
+        pipe = self.client.pipeline(transaction=True)
+        pipe.get(self._seq_key(session_id))
+        pipe.lrange(self._key(session_id), -count if count else 0, -1)
+        last, items = await pipe.execute()
+        messages = [json.loads(item) for item in items]
+        # Dữ liệu ghi trước khi có bộ đếm: đánh số từ 1
+        last = int(last) if last is not None else len(messages)
+        first = last - len(messages) + 1
+        for offset, message in enumerate(messages):
+            message["seq"] = first + offset
+        return messages
+
+    async def exists(self, session_id: str) -> bool:
+        return bool(await self.client.exists(self._key(session_id)))
+
+    async def append_message(self, session_id: str, message: Dict[str, Any]) -> None:
+        key = self._key(session_id)
+        seq_key = self._seq_key(session_id)
+        pipe = self.client.pipeline(transaction=True)
+        pipe.incr(seq_key)
+        pipe.rpush(key, json.dumps(message, ensure_ascii=False))
+        if self.max_messages:
+            pipe.ltrim(key, -self.max_messages, -1)
+        if self.ttl_seconds:
+            pipe.expire(key, self.ttl_seconds)
+            pipe.expire(seq_key, self.ttl_seconds)
+        await pipe.execute()
+
+    async def get_messages(self, session_id: str, last_n: Optional[int] = None) -> List[Dict[str, Any]]:
+        return await self._read_tail(session_id, last_n)
+
+    async def get_messages_after(self, session_id: str, after: int) -> List[Dict[str, Any]]:
+        last = await self.last_seq(session_id)
+        if after > last:
+            return await self.get_messages(session_id)
+        if after == last:
+            return []
+        # Seq liên tiếp nên chỉ cần đọc (last - after) phần tử cuối; nếu có tin nhắn mới xen giữa
+        # hai lần đọc thì đọc lại với số phần tử lớn hơn
+        count = last - after
+        while True:
+            messages = await self._read_tail(session_id, count)
+            if len(messages) < count or not messages or messages[0]["seq"] <= after + 1:
+                return [message for message in messages if message["seq"] > after]
+            count = messages[-1]["seq"] - after
+
+    async def last_seq(self, session_id: str) -> int:
+        return int(await self.client.get(self._seq_key(session_id)) or 0)
+
+    async def delete(self, session_id: str) -> None:
+        await self.client.delete(self._key(session_id))
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "redis", "namespace": self.namespace}
+
+
+def create_session_store(namespace: str = "default") -> SessionStore:
+    """
+    Tạo session store theo cấu hình `SESSION_STORE`.
+
+    Args:
+        namespace: Tiền tố phân biệt các nhóm session (vd: "guide", "qa").
+
+    Returns:
+        SessionStore tương ứng.
+    """
+    if settings.SESSION_STORE == "redis":
+        return RedisSessionStore(namespace=namespace)
+    return InMemorySessionStore(
+        max_messages=settings.SESSION_MAX_MESSAGES,
+        max_sessions=settings.SESSION_MAX_SESSIONS,
+        max_bytes=settings.SESSION_MAX_BYTES,
+        ttl_seconds=settings.SESSION_TTL_SECONDS
+    )
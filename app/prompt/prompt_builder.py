@@ -0,0 +1,50 @@
+import re
+from typing import List, Dict, Any, Sequence, Tuple, Union
+
+# Chuỗi đánh dấu vị trí các trường động trong template (không xuất hiện trong nội dung thật)
+_MARKER = "\x00__{}__\x00"
+_MARKER_PATTERN = re.compile("\x00__(\\w+)__\x00")
+
+
+class PromptBuilder:
+    """
+    Dựng prompt từ template đã biên dịch sẵn.
+
+    Phần tĩnh của template được định dạng một lần và tách thành các đoạn cố định quanh vị trí
+    các trường động (lịch sử hội thoại, nội dung bài học, ...), mỗi lượt chỉ cần ghép các đoạn
+    với giá trị của trường động bằng một lần join.
+    """
+
+    def __init__(self, template: str, history_field: str = "history", dynamic_fields: Sequence[str] = (),
+                 **static_fields: Any):
+        """
+        Args:
+            template: Template dạng str.format.
+            history_field: Tên trường chứa lịch sử hội thoại trong template.
+            dynamic_fields: Các trường khác thay đổi theo từng lượt (vd: context), truyền khi gọi build.
+            **static_fields: Các trường cố định khác của template.
+        """
+        self.history_field = history_field
+        markers = {field: _MARKER.format(field) for field in (history_field, *dynamic_fields)}
+        rendered = template.format(**markers, **static_fields)
+        # Các phần tử ở vị trí lẻ là tên trường động, vị trí chẵn là đoạn cố định
+        parts = _MARKER_PATTERN.split(rendered)
+        self.segments: List[Tuple[bool, str]] = [
+            (index % 2 == 1, part) for index, part in enumerate(parts) if index % 2 == 1 or part
+        ]
+
+    def build(self, history: Union[List[Dict[str, Any]], str], **fields: str) -> str:
+        """
+        Dựng prompt hoàn chỉnh.
+
+        Args:
+            history: Danh sách tin nhắn {"role", "content"} hoặc lịch sử đã định dạng sẵn dạng chuỗi.
+            **fields: Giá trị các trường động khác (vd: context).
+
+        Returns:
+            Chuỗi prompt hoàn chỉnh.
+        """
+        if not isinstance(history, str):
+            history = "\n".join([f"{entry['role']}: {entry['content']}" for entry in history])
+        fields[self.history_field] = history
+        return "".join([fields[text] if is_field else text for is_field, text in self.segments])
@@ -1,5 +1,10 @@
+from typing import List, Dict, Any, Union
+
+from app.prompt.prompt_builder import PromptBuilder
+
+
 class TheoryPrompt:
-    def __init__(self, context: str, history: str):
+    def __init__(self, context: str, history: Union[str, List[Dict[str, Any]]]):
         """
         Khởi tạo lớp với ngữ cảnh và câu hỏi của sinh viên.
         """
@@ -40,4 +45,9 @@ All responses must be as brief as possible, friendly, and encouraging.
         Định dạng prompt với ngữ cảnh và câu hỏi của sinh viên.
         :return: Chuỗi prompt hoàn chỉnh.
         """
-        return self.template.format(context=self.context, history=self.history)
\ No newline at end of file
+        return _builder.build(self.history, context=self.context)
+
+
+# Template tĩnh được biên dịch một lần khi nạp module; nội dung bài học (thay đổi theo từng
+# câu hỏi) được ghép vào khi dựng prompt
+_builder = PromptBuilder(TheoryPrompt.template, dynamic_fields=("context",))
@@ -1,3 +1,6 @@
+from app.prompt.prompt_builder import PromptBuilder
+
+
 class AITutorPrompt:
     def __init__(self, history: list):
         self.history = history
@@ -66,7 +69,8 @@ AI Tutor: Chính xác! Đừng quên thêm #include <iostream> ở đầu chươ
         Định dạng prompt với lịch sử hội thoại.
         :return: Chuỗi prompt hoàn chỉnh.
         """
-        formatted_history = "\n".join(
-            [f"{entry['role']}: {entry['content']}" for entry in self.history]
-        )
-        return self.template.format(history=formatted_history)
\ No newline at end of file
+        return _builder.build(self.history)
+
+
+# Template tĩnh được biên dịch một lần khi nạp module
+_builder = PromptBuilder(AITutorPrompt.template)
@@ -1,7 +1,7 @@
 # app/routers/auth.py
 from fastapi import APIRouter, Depends, HTTPException, status, Request
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
 from app.models.models import get_db, User
 from app.controllers.user_controller import UserController
@@ -17,7 +17,7 @@ router = APIRouter(
 
 
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-async def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(user: UserCreate, db: AsyncSession = Depends(get_db)):
     """
     Tạo một tài khoản mới.
     - **email**: Nhập vào email của bạn
@@ -28,24 +28,24 @@ async def register(user: UserCreate, db: Session = Depends(get_db)):
     user_controller = UserController(db)
 
     # Kiểm tra xem username hoặc email đã tồn tại chưa
-    if user_controller.get_user_by_username(user.username):
+    if await user_controller.get_user_by_username(user.username):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username already registered"
         )
 
-    if user_controller.get_user_by_email(user.email):
+    if await user_controller.get_user_by_email(user.email):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
 
     # Tạo user mới
-    return user_controller.create_user(user)
+    return await user_controller.create_user(user)
 
 
 @router.post("/login", response_model=Token)
-async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
     """
     Đăng nhập với username và password
 
@@ -57,7 +57,7 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
     """
 
     user_controller = UserController(db)
-    user = user_controller.authenticate(form_data.username, form_data.password)
+    user = await user_controller.authenticate(form_data.username, form_data.password)
 
     if not user:
         raise HTTPException(
@@ -67,7 +67,7 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
         )
 
     access_token_expires = timedelta(minutes=settings.JWT_EXPIRES_MINUTES)
-    token_data = create_access_token(
+    token_data = await create_access_token(
         db=db,
         user_id=user.id,
         expires_delta=access_token_expires
@@ -77,13 +77,13 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
 
 
 @router.post("/logout")
-async def logout(request: Request, db: Session = Depends(get_db),
+async def logout(request: Request, db: AsyncSession = Depends(get_db),
                  current_user: User = Depends(get_current_active_user)):
     # Lấy token từ header
     auth_header = request.headers.get('Authorization')
     if auth_header and auth_header.startswith('Bearer '):
         token = auth_header.split(' ')[1]
-        revoke_token(db, token)
+        await revoke_token(db, token)
         return {"message": "Successfully logged out"}
 
     raise HTTPException(status_code=400, detail="Invalid token")
@@ -105,12 +105,12 @@ async def read_users_me(current_user: User = Depends(get_current_active_user)):
 # @router.put("/me", response_model=UserResponse)
 # async def update_user_me(user_data: UserUpdate,
 #                          current_user: User = Depends(get_current_active_user),
-#                          db: Session = Depends(get_db)):
+#                          db: AsyncSession = Depends(get_db)):
 #     user_controller = UserController(db)
 #
 #     # Kiểm tra xem username mới đã tồn tại chưa (nếu có)
 #     if user_data.username and user_data.username != current_user.username:
-#         existing_user = user_controller.get_user_by_username(user_data.username)
+#         existing_user = await user_controller.get_user_by_username(user_data.username)
 #         if existing_user:
 #             raise HTTPException(
 #                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -119,7 +119,7 @@ async def read_users_me(current_user: User = Depends(get_current_active_user)):
 #
 #     # Kiểm tra xem email mới đã tồn tại chưa (nếu có)
 #     if user_data.email and user_data.email != current_user.email:
-#         existing_email = user_controller.get_user_by_email(user_data.email)
+#         existing_email = await user_controller.get_user_by_email(user_data.email)
 #         if existing_email:
 #             raise HTTPException(
 #                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -127,5 +127,5 @@ async def read_users_me(current_user: User = Depends(get_current_active_user)):
 #             )
 #
 #     # Cập nhật thông tin người dùng
-#     updated_user = user_controller.update_user(current_user.id, user_data)
+#     updated_user = await user_controller.update_user(current_user.id, user_data)
 #     return updated_user
\ No newline at end of file
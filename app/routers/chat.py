@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from typing import Optional
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.models import get_db, User
 from app.controllers.chatbot_controller import ChatbotController
 from app.schemas.message import ChatRequest, ChatResponse
@@ -18,7 +18,7 @@ async def chat(
         chat_request: ChatRequest,
         prompt_template: Optional[str] = Query(None, description="Tên của prompt template muốn sử dụng"),
         current_user: User = Depends(get_current_active_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db)
 ):
     if not chat_request.message:
         raise HTTPException(
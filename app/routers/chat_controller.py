@@ -1,15 +1,19 @@
-from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, Depends, Header, Query, Response, WebSocket, WebSocketDisconnect, status
 from starlette.websockets import WebSocketState
 from datetime import datetime
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 
-from app.controllers.qa_message_controller import progress_message
+from app.controllers.qa_message_controller import ChatSessionManager
+from app.models.session_store import create_session_store
+from app.utils.etag import etag_matches, history_etag
+from app.utils.metrics import register_metrics
+from app.utils.transcript_writer import transcript_writer
 from app.models.chat_model import ChatHistory
 from app.schemas.responses import MessageRequest, MessageResponse, ChatHistoryResponse
 from app.controllers.llm_service import generate_response, process_stream
 from app.utils.reflection import Reflection
 # from app.prompt import AITutorPrompt
-from app.config import REFLECTION
+from app.config import REFLECTION, settings
 from app.prompt.tutor_prompt import AITutorPrompt
 router = APIRouter(
     prefix="/qa",
@@ -18,19 +22,18 @@ router = APIRouter(
 )
 
 # Lưu trữ chat history cho mỗi session
-chat_sessions: Dict[str, ChatHistory] = {}
+chat_session = ChatSessionManager(
+    store=create_session_store("qa"),
+    welcome_message="💻 Học lập trình không khó! 🚀 Mình là gia sư AI, giúp bạn tiếp cận kiến thức lập trình một cách dễ hiểu và luôn sẵn sàng đồng hành cùng bạn trên hành trình khám phá công nghệ. 🤖",
+    transcript_writer=transcript_writer if settings.TRANSCRIPT_PERSIST_ENABLED else None,
+    transcript_namespace="qa"
+)
+register_metrics("qa_sessions", chat_session.store.stats)
 
 
-def get_chat_history(session_id: str) -> ChatHistory:
+async def get_chat_history(session_id: str) -> ChatHistory:
     """Lấy hoặc tạo mới chat history cho session"""
-    if session_id not in chat_sessions:
-        chat_sessions[session_id] = ChatHistory()
-        # Thêm tin nhắn chào mừng
-        chat_sessions[session_id].add_message(
-            "Assistant",
-            "💻 Học lập trình không khó! 🚀 Mình là gia sư AI, giúp bạn tiếp cận kiến thức lập trình một cách dễ hiểu và luôn sẵn sàng đồng hành cùng bạn trên hành trình khám phá công nghệ. 🤖"
-        )
-    return chat_sessions[session_id]
+    return await chat_session.get_chat_history(session_id)
 
 
 @router.post("/{session_id}", response_model=MessageResponse)
@@ -47,7 +50,7 @@ async def handle_message(session_id: str, message: MessageRequest):
     start_time = datetime.now()
     query = message.content
 
-    progress_message(session_id,query)
+    response_text = await chat_session.progress_message(session_id, query)
 
     # Tính thời gian xử lý
     end_time = datetime.now()
@@ -60,15 +63,35 @@ async def handle_message(session_id: str, message: MessageRequest):
     )
 
 @router.get("/{session_id}/history", response_model=ChatHistoryResponse)
-async def get_history(session_id: str):
+async def get_history(
+        session_id: str,
+        response: Response,
+        after: Optional[int] = Query(None, ge=0, description="Chỉ lấy tin nhắn có seq lớn hơn giá trị này (last_seq lần trước)"),
+        if_none_match: Optional[str] = Header(None)
+):
     """
     Lấy chi tiết một cuộc hội thoại theo session_id.
 
     Args:
         - **session_id (int)**: ID cuộc hội thoại
+        - **after (int)**: Chỉ trả về các tin nhắn mới hơn (dùng last_seq của lần gọi trước)
+        - **If-None-Match**: ETag của lần gọi trước; trả về 304 nếu chưa có tin nhắn mới
 
     Returns:
-        ConversationResponse: Chi tiết cuộc hội thoại
+        ChatHistoryResponse: Các tin nhắn (kèm seq) và last_seq
     """
-    chat_history = get_chat_history(session_id)
-    return ChatHistoryResponse(messages=chat_history.get_history())
\ No newline at end of file
+    chat_history = await get_chat_history(session_id)
+    last_seq = await chat_history.last_seq()
+    etag = history_etag(last_seq)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    if after is None:
+        messages = await chat_history.get_history()
+    else:
+        messages = await chat_history.get_history_after(after)
+    if messages:
+        # Có thể vừa có tin nhắn mới sau khi đọc last_seq
+        last_seq = max(last_seq, messages[-1].get("seq", 0))
+    response.headers["ETag"] = history_etag(last_seq)
+    return ChatHistoryResponse(messages=messages, last_seq=last_seq)
\ No newline at end of file
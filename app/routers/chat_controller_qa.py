@@ -1,37 +1,66 @@
-from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, Depends, Header, Query, Response, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
 from starlette.websockets import WebSocketState
+from contextlib import aclosing
 from datetime import datetime
-from typing import Dict, List, Any
+from pydantic import ValidationError
+import json
+import time
+from typing import Dict, List, Any, Optional
 
 from app.controllers.lesson_controller import LessonController
-from app.models.chat_model import ChatHistory
-from sqlalchemy.orm import Session
-from app.models.models import get_db, User
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.models import get_db, SessionLocal
 from app.schemas.theory import MessageRequest, MessageResponse, ChatHistoryResponse
 from app.controllers.qa_message_controller import ChatSessionManager
-from app.routers.lesson import get_lesson
-from app.utils.reflection import Reflection
-from app.config import REFLECTION
-from app.prompt.theory_prompt import TheoryPrompt
+from app.models.session_store import create_session_store
+from app.utils.etag import etag_matches, history_etag
+from app.utils.metrics import register_metrics
+from app.utils.response_cache import ResponseCache
+from app.utils.semantic_cache import SemanticCache
+from app.utils.transcript_writer import transcript_writer
+from app.utils.lesson_cache import CachedLesson, lesson_cache
+from app.config import settings
 router = APIRouter(
     prefix="/guide",
     tags=["guide"],
     responses={401: {"description": "Unauthorized"}},
 )
 
-chat_Session = ChatSessionManager()
+chat_Session = ChatSessionManager(
+    store=create_session_store("guide"),
+    response_cache=ResponseCache(
+        max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES,
+        ttl_seconds=settings.RESPONSE_CACHE_TTL_SECONDS,
+        max_user_turns=settings.RESPONSE_CACHE_MAX_USER_TURNS
+    ) if settings.RESPONSE_CACHE_ENABLED else None,
+    semantic_cache=SemanticCache(
+        threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+        max_entries_per_lesson=settings.SEMANTIC_CACHE_MAX_ENTRIES_PER_LESSON,
+        max_lessons=settings.SEMANTIC_CACHE_MAX_LESSONS,
+        ttl_seconds=settings.SEMANTIC_CACHE_TTL_SECONDS
+    ) if settings.SEMANTIC_CACHE_ENABLED else None,
+    transcript_writer=transcript_writer if settings.TRANSCRIPT_PERSIST_ENABLED else None,
+    transcript_namespace="guide"
+)
+register_metrics("guide_sessions", chat_Session.store.stats)
+if chat_Session.response_cache is not None:
+    register_metrics("guide_response_cache", chat_Session.response_cache.stats)
+    # Bài học được cập nhật thì các phản hồi đã cache theo nội dung cũ không còn đúng
+    lesson_cache.add_invalidation_listener(chat_Session.response_cache.invalidate_lesson)
+if chat_Session.semantic_cache is not None:
+    register_metrics("guide_semantic_cache", chat_Session.semantic_cache.stats)
+    lesson_cache.add_invalidation_listener(chat_Session.semantic_cache.invalidate_lesson)
 
 
-def get_lesson_content_by_id(lesson_id, db):
+async def get_lesson_by_id(lesson_id, db) -> Optional[CachedLesson]:
     try:
-        # Sử dụng trực tiếp LessonController
+        # Sử dụng trực tiếp LessonController (đọc qua cache bài học)
         lesson_controller = LessonController(db)
-        lesson = lesson_controller.get_lesson(lesson_id)
+        lesson = await lesson_controller.get_lesson_cached(lesson_id)
         # print("Lesson", lesson)
         if lesson:
-            # Lưu nội dung vào biến
-            content = lesson.content
-            return content
+            return lesson
         else:
             print("Không tìm thấy bài giảng")
             return None
@@ -43,7 +72,7 @@ def get_lesson_content_by_id(lesson_id, db):
 
 
 @router.post("/{session_id}", response_model=MessageResponse)
-async def handle_message(session_id: str, message: MessageRequest, db: Session = Depends(get_db)):
+async def handle_message(session_id: str, message: MessageRequest, db: AsyncSession = Depends(get_db)):
     """
     Xử lý tin nhắn người dùng và trả về phản hồi từ LLM.
 
@@ -57,8 +86,8 @@ async def handle_message(session_id: str, message: MessageRequest, db: Session =
 
     start_time = datetime.now()
     # Kiểm tra lesson ID trước
-    context = get_lesson_content_by_id(message.lesson_id, db)
-    if context is None:
+    lesson = await get_lesson_by_id(message.lesson_id, db)
+    if lesson is None:
         end_time = datetime.now()
         processing_time = (end_time - start_time).total_seconds()
         return MessageResponse(
@@ -69,7 +98,7 @@ async def handle_message(session_id: str, message: MessageRequest, db: Session =
 
     # Nếu có lesson ID hợp lệ, tiếp tục xử lý
     query = message.content
-    response = chat_Session.progress_message(session_id, query)
+    response = await chat_Session.progress_message(session_id, query, lesson)
     # Tính thời gian xử lý
     end_time = datetime.now()
     processing_time = (end_time - start_time).total_seconds()
@@ -80,8 +109,160 @@ async def handle_message(session_id: str, message: MessageRequest, db: Session =
         timestamp=end_time
     )
 
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    """Định dạng một sự kiện Server-Sent Events"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@router.post("/{session_id}/stream")
+async def handle_message_stream(session_id: str, message: MessageRequest, db: AsyncSession = Depends(get_db)):
+    """
+    Xử lý tin nhắn người dùng và stream phản hồi từ LLM dưới dạng Server-Sent Events.
+
+    Args:
+        - **content**: Nội dung tin nhắn
+        - **lesson_id**: ID của bài học muốn hỏi
+
+    Returns:
+        text/event-stream gồm các sự kiện:
+        - **token**: `{"content": "..."}` cho từng đoạn văn bản
+        - **done**: `{"content", "time_to_first_token", "processing_time", "timestamp"}` khi hoàn tất
+        - **error**: `{"detail": "..."}` khi có lỗi
+    """
+    start_time = time.perf_counter()
+    lesson = await get_lesson_by_id(message.lesson_id, db)
+
+    async def event_stream():
+        if lesson is None:
+            yield format_sse("error", {"detail": "Không có ID bài giảng trong CSDL"})
+            return
+
+        chunks: List[str] = []
+        time_to_first_token = None
+        try:
+            # aclosing: client ngắt kết nối thì stream tới LLM cũng được đóng ngay
+            async with aclosing(chat_Session.stream_message(session_id, message.content, lesson)) as tokens:
+                async for token in tokens:
+                    if time_to_first_token is None:
+                        time_to_first_token = time.perf_counter() - start_time
+                    chunks.append(token)
+                    yield format_sse("token", {"content": token})
+        except Exception as e:
+            print(f"Lỗi khi stream phản hồi: {e}")
+            yield format_sse("error", {"detail": "Không thể tạo phản hồi từ LLM"})
+            return
+
+        yield format_sse("done", {
+            "content": "".join(chunks),
+            "time_to_first_token": time_to_first_token,
+            "processing_time": time.perf_counter() - start_time,
+            "timestamp": datetime.now().isoformat()
+        })
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.websocket("/ws/{session_id}")
+async def chat_websocket(websocket: WebSocket, session_id: str):
+    """
+    Kênh WebSocket cho một phiên gia sư, giữ kết nối và ngữ cảnh bài học qua nhiều lượt hỏi.
+
+    Client gửi: `{"content": "...", "lesson_id": 1}`
+
+    Server gửi:
+        - `{"type": "token", "content": "..."}` cho từng đoạn văn bản
+        - `{"type": "done", "content", "time_to_first_token", "processing_time", "timestamp"}` khi hoàn tất
+        - `{"type": "error", "detail": "..."}` khi có lỗi
+    """
+    await websocket.accept()
+
+    try:
+        while True:
+            try:
+                data = json.loads(await websocket.receive_text())
+            except (json.JSONDecodeError, KeyError):
+                # Frame không phải JSON (hoặc frame nhị phân): báo lỗi, giữ kết nối
+                await websocket.send_json({"type": "error", "detail": "Tin nhắn phải là JSON"})
+                continue
+            start_time = time.perf_counter()
+
+            try:
+                message = MessageRequest(**data)
+            except (ValidationError, TypeError):
+                await websocket.send_json({"type": "error", "detail": "Tin nhắn không hợp lệ"})
+                continue
+
+            # Bài học được đọc qua cache; session CSDL chỉ lấy kết nối khi cache chưa có bài học,
+            # không giữ kết nối suốt phiên WebSocket
+            async with SessionLocal() as db:
+                lesson = await get_lesson_by_id(message.lesson_id, db)
+            if lesson is None:
+                await websocket.send_json({"type": "error", "detail": "Không có ID bài giảng trong CSDL"})
+                continue
+
+            chunks: List[str] = []
+            time_to_first_token = None
+            try:
+                async with aclosing(chat_Session.stream_message(session_id, message.content, lesson)) as tokens:
+                    async for token in tokens:
+                        if time_to_first_token is None:
+                            time_to_first_token = time.perf_counter() - start_time
+                        chunks.append(token)
+                        await websocket.send_json({"type": "token", "content": token})
+            except WebSocketDisconnect:
+                raise
+            except Exception as e:
+                print(f"Lỗi khi stream phản hồi: {e}")
+                await websocket.send_json({"type": "error", "detail": "Không thể tạo phản hồi từ LLM"})
+                continue
+
+            await websocket.send_json({
+                "type": "done",
+                "content": "".join(chunks),
+                "time_to_first_token": time_to_first_token,
+                "processing_time": time.perf_counter() - start_time,
+                "timestamp": datetime.now().isoformat()
+            })
+    except WebSocketDisconnect:
+        pass
+    finally:
+        if websocket.client_state == WebSocketState.CONNECTED:
+            await websocket.close()
+
+
 @router.get("/{session_id}/history", response_model=ChatHistoryResponse)
-async def get_history(session_id: str):
-    """Lấy lịch sử chat"""
-    chat_history = chat_Session.get_chat_history(session_id)
-    return ChatHistoryResponse(messages=chat_history.get_history())
\ No newline at end of file
+async def get_history(
+        session_id: str,
+        response: Response,
+        after: Optional[int] = Query(None, ge=0, description="Chỉ lấy tin nhắn có seq lớn hơn giá trị này (last_seq lần trước)"),
+        if_none_match: Optional[str] = Header(None)
+):
+    """
+    Lấy lịch sử chat.
+
+    Args:
+        - **after (int)**: Chỉ trả về các tin nhắn mới hơn (dùng last_seq của lần gọi trước)
+        - **If-None-Match**: ETag của lần gọi trước; trả về 304 nếu chưa có tin nhắn mới
+
+    Returns:
+        ChatHistoryResponse: Các tin nhắn (kèm seq) và last_seq
+    """
+    chat_history = await chat_Session.get_chat_history(session_id)
+    last_seq = await chat_history.last_seq()
+    etag = history_etag(last_seq)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    if after is None:
+        messages = await chat_history.get_history()
+    else:
+        messages = await chat_history.get_history_after(after)
+    if messages:
+        # Có thể vừa có tin nhắn mới sau khi đọc last_seq
+        last_seq = max(last_seq, messages[-1].get("seq", 0))
+    response.headers["ETag"] = history_etag(last_seq)
+    return ChatHistoryResponse(messages=messages, last_seq=last_seq)
\ No newline at end of file
@@ -1,10 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.models import get_db, User
 from app.controllers.conversation_controller import ConversationController
 from app.schemas.conversation import ConversationCreate, ConversationResponse, ConversationUpdate, ConversationDetail
-from app.schemas.message import MessageResponse
+from app.schemas.message import MessagePage
 from app.utils.auth import get_current_active_user
 
 router = APIRouter(
@@ -17,10 +17,10 @@ router = APIRouter(
 @router.get("", response_model=List[ConversationResponse])
 async def get_conversations(
         current_user: User = Depends(get_current_active_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db)
 ):
     conversation_controller = ConversationController(db)
-    conversations = conversation_controller.get_user_conversations(current_user.id)
+    conversations = await conversation_controller.get_user_conversations(current_user.id)
     return conversations
 
 
@@ -28,10 +28,10 @@ async def get_conversations(
 async def create_conversation(
         conversation: ConversationCreate,
         current_user: User = Depends(get_current_active_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db)
 ):
     conversation_controller = ConversationController(db)
-    new_conversation = conversation_controller.create_conversation(current_user.id, conversation)
+    new_conversation = await conversation_controller.create_conversation(current_user.id, conversation)
     return new_conversation
 
 
@@ -39,10 +39,10 @@ async def create_conversation(
 async def get_conversation(
         conversation_id: int,
         current_user: User = Depends(get_current_active_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db)
 ):
     conversation_controller = ConversationController(db)
-    conversation = conversation_controller.get_conversation(conversation_id)
+    conversation = await conversation_controller.get_conversation(conversation_id)
 
     if not conversation or conversation.user_id != current_user.id:
         raise HTTPException(
@@ -50,8 +50,8 @@ async def get_conversation(
             detail="Conversation not found"
         )
 
-    # Lấy tin nhắn trong cuộc hội thoại
-    messages = conversation_controller.get_messages(conversation_id)
+    # Chỉ lấy trang tin nhắn mới nhất
+    messages, prev_cursor, _ = await conversation_controller.get_messages(conversation_id)
 
     # Tạo đối tượng ConversationDetail
     return {
@@ -61,7 +61,8 @@ async def get_conversation(
         "lesson_id": conversation.lesson_id,
         "created_at": conversation.created_at,
         "updated_at": conversation.updated_at,
-        "messages": messages
+        "messages": messages,
+        "prev_cursor": prev_cursor
     }
 
 
@@ -70,12 +71,12 @@ async def update_conversation(
         conversation_id: int,
         conversation_data: ConversationUpdate,
         current_user: User = Depends(get_current_active_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db)
 ):
     conversation_controller = ConversationController(db)
 
     # Kiểm tra quyền truy cập
-    existing_conversation = conversation_controller.get_conversation(conversation_id)
+    existing_conversation = await conversation_controller.get_conversation(conversation_id)
     if not existing_conversation or existing_conversation.user_id != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -83,7 +84,7 @@ async def update_conversation(
         )
 
     # Cập nhật cuộc hội thoại
-    updated_conversation = conversation_controller.update_conversation(conversation_id, conversation_data)
+    updated_conversation = await conversation_controller.update_conversation(conversation_id, conversation_data)
     return updated_conversation
 
 
@@ -91,12 +92,12 @@ async def update_conversation(
 async def delete_conversation(
         conversation_id: int,
         current_user: User = Depends(get_current_active_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db)
 ):
     conversation_controller = ConversationController(db)
 
     # Kiểm tra quyền truy cập
-    existing_conversation = conversation_controller.get_conversation(conversation_id)
+    existing_conversation = await conversation_controller.get_conversation(conversation_id)
     if not existing_conversation or existing_conversation.user_id != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -104,7 +105,7 @@ async def delete_conversation(
         )
 
     # Xóa cuộc hội thoại
-    success = conversation_controller.delete_conversation(conversation_id)
+    success = await conversation_controller.delete_conversation(conversation_id)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -114,22 +115,33 @@ async def delete_conversation(
     return None
 
 
-@router.get("/{conversation_id}/messages", response_model=List[MessageResponse])
+@router.get("/{conversation_id}/messages", response_model=MessagePage)
 async def get_conversation_messages(
         conversation_id: int,
+        before: Optional[int] = Query(None, description="ID tin nhắn; lấy các tin nhắn cũ hơn (prev_cursor)"),
+        after: Optional[int] = Query(None, description="ID tin nhắn; lấy các tin nhắn mới hơn (next_cursor)"),
+        limit: int = Query(50, ge=1, le=200, description="Số tin nhắn mỗi trang"),
         current_user: User = Depends(get_current_active_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db)
 ):
     conversation_controller = ConversationController(db)
 
     # Kiểm tra quyền truy cập
-    conversation = conversation_controller.get_conversation(conversation_id)
+    conversation = await conversation_controller.get_conversation(conversation_id)
     if not conversation or conversation.user_id != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Conversation not found"
         )
 
-    # Lấy tin nhắn
-    messages = conversation_controller.get_messages(conversation_id)
-    return messages
\ No newline at end of file
+    if before is not None and after is not None:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Chỉ được truyền một trong hai tham số before hoặc after"
+        )
+
+    # Lấy một trang tin nhắn (mặc định: trang mới nhất)
+    messages, prev_cursor, next_cursor = await conversation_controller.get_messages(
+        conversation_id, before=before, after=after, limit=limit
+    )
+    return {"messages": messages, "prev_cursor": prev_cursor, "next_cursor": next_cursor}
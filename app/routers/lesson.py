@@ -1,10 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Query
 from typing import List, Optional
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.models import get_db, User
-from app.controllers.lesson_controller import LessonController
-from app.schemas.lesson import LessonCreate, LessonResponse, LessonUpdate
+from app.controllers.lesson_controller import LessonController, LESSON_LIST_FIELDS
+from app.schemas.lesson import LessonCreate, LessonResponse, LessonUpdate, LessonSearchResponse, LessonListResponse, \
+    LessonImportResponse
 from app.utils.auth import get_current_active_user
+from app.utils.json_stream import iter_json_rows
+from app.config import settings
 
 router = APIRouter(
     prefix="/api/lessons",
@@ -12,27 +15,31 @@ router = APIRouter(
     responses={401: {"description": "Unauthorized"}}
 )
 
-#
-# @router.get("/search_lesson", response_model=List[LessonResponse])
-# async def get_lessons(
-#         search: Optional[str] = Query(None, description="Search term in title or content"),
-#         db: Session = Depends(get_db)
-# ):
-#     lesson_controller = LessonController(db)
-#
-#     if search:
-#         lessons = lesson_controller.search_lessons(search)
-#     else:
-#         lessons = lesson_controller.get_all_lessons()
-#
-#     return lessons
+@router.get("/search_lesson", response_model=LessonSearchResponse)
+async def search_lessons(
+        search: str = Query(..., min_length=1, description="Từ khóa tìm trong tiêu đề hoặc nội dung"),
+        limit: int = Query(20, ge=1, le=100, description="Số kết quả mỗi trang"),
+        offset: int = Query(0, ge=0, description="Vị trí bắt đầu"),
+        db: AsyncSession = Depends(get_db)
+):
+    """
+    Tìm kiếm toàn văn bài học (lesson) theo tiêu đề và nội dung
+
+    **Returns:**
+
+        **LessonSearchResponse**: Tổng số kết quả và danh sách bài học theo độ liên quan,
+        kèm đoạn trích có đánh dấu <mark> quanh từ khớp
+    """
+    lesson_controller = LessonController(db)
+    total, items = await lesson_controller.search_lessons(search, limit, offset)
+    return {"total": total, "limit": limit, "offset": offset, "items": items}
 
 
 @router.post("/create_lesson", response_model=LessonResponse, status_code=status.HTTP_201_CREATED)
 async def create_lesson(
         lesson: LessonCreate,
         current_user: User = Depends(get_current_active_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db)
 ):
     """
     Tạo ra một bài học (lesson) mới
@@ -47,11 +54,41 @@ async def create_lesson(
         **LessonResponse**: Bài học đã được tạo
     """
     lesson_controller = LessonController(db)
-    new_lesson = lesson_controller.create_lesson(lesson)
+    new_lesson = await lesson_controller.create_lesson(lesson)
     return new_lesson
 
+@router.post("/bulk_import", response_model=LessonImportResponse)
+async def bulk_import_lessons(
+        request: Request,
+        on_conflict: str = Query("update", pattern="^(update|skip)$",
+                                 description="Bài học có id đã tồn tại: update (ghi đè) hoặc skip (giữ nguyên)"),
+        current_user: User = Depends(get_current_active_user),
+        db: AsyncSession = Depends(get_db)
+):
+    """
+    Nhập nhiều bài học (lesson) cùng lúc từ nội dung NDJSON (mỗi dòng một bài học) hoặc mảng JSON.
+
+    Dữ liệu được đọc dần theo luồng và ghi theo lô; bài học có id đã tồn tại sẽ được cập nhật,
+    hoặc được giữ nguyên nếu on_conflict=skip.
+
+    **Args:**
+        Mỗi bản ghi gồm:
+        - id (int): Id của bài học (tùy chọn)
+        - title (string): Tên của bài học
+        - content (string): Nội dung bài học
+
+    **Returns:**
+
+        **LessonImportResponse**: Số bài học đã nhập, đã bỏ qua và lỗi của từng bản ghi không hợp lệ
+    """
+    lesson_controller = LessonController(db)
+    rows = iter_json_rows(request.stream(), settings.LESSON_IMPORT_MAX_ROW_CHARS)
+    return await lesson_controller.import_lessons(rows, settings.LESSON_IMPORT_BATCH_SIZE,
+                                                  overwrite=on_conflict == "update")
+
+
 @router.get("/get_all_lessons", response_model=List[LessonResponse])
-async def get_all_lessons(db: Session = Depends(get_db)):
+async def get_all_lessons(db: AsyncSession = Depends(get_db)):
     """
     Lấy ra tất cả các bài học (lesson) có trong cơ sở dữ liệu
 
@@ -60,17 +97,57 @@ async def get_all_lessons(db: Session = Depends(get_db)):
         **List[LessonResponse]**: Danh sách các bài học có trong CSDL
     """
     lesson_controller = LessonController(db)
-    lessons = lesson_controller.get_all_lessons()
+    lessons = await lesson_controller.get_all_lessons()
     if not lessons:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="No lessons in the database."
         )
     return lessons
+
+@router.get("/list", response_model=LessonListResponse, response_model_exclude_unset=True)
+async def list_lessons(
+        cursor: Optional[int] = Query(None, description="ID bài học cuối của trang trước (next_cursor)"),
+        limit: int = Query(50, ge=1, le=200, description="Số bài học mỗi trang"),
+        fields: Optional[str] = Query(
+            None,
+            description="Các trường cần lấy, cách nhau bởi dấu phẩy "
+                        "(mặc định: id,title,updated_at,content_length)"
+        ),
+        db: AsyncSession = Depends(get_db)
+):
+    """
+    Liệt kê bài học theo trang, sắp xếp theo id
+
+    **Args:**
+
+        - cursor (int): Giá trị next_cursor của trang trước, bỏ trống để lấy trang đầu
+        - limit (int): Số bài học mỗi trang
+        - fields (string): Chọn trường trong id, title, content, content_length, created_at, updated_at
+
+    **Returns:**
+
+        **LessonListResponse**: Danh sách bài học của trang và next_cursor (null nếu là trang cuối)
+    """
+    selected = None
+    if fields:
+        selected = list(dict.fromkeys(field.strip() for field in fields.split(",") if field.strip()))
+        unknown = [field for field in selected if field not in LESSON_LIST_FIELDS]
+        if unknown:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"Unknown fields: {', '.join(unknown)}"
+            )
+
+    lesson_controller = LessonController(db)
+    items, next_cursor = await lesson_controller.list_lessons(cursor, limit, selected)
+    return LessonListResponse(items=items, next_cursor=next_cursor)
+
+
 @router.get("/get_lesson/{lesson_id}", response_model=LessonResponse)
 async def get_lesson(
         lesson_id: int,
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db)
 ):
     """
     Lấy bài học (lesson) dựa theo id bài học (lesson_id)
@@ -80,7 +157,7 @@ async def get_lesson(
         **LessonResponse**: Bài học đã được lấy
     """
     lesson_controller = LessonController(db)
-    lesson = lesson_controller.get_lesson(lesson_id)
+    lesson = await lesson_controller.get_lesson(lesson_id)
     # print(lesson)
     if not lesson:
         raise HTTPException(
@@ -96,7 +173,7 @@ async def update_lesson(
         lesson_id: int,
         lesson_data: LessonUpdate,
         current_user: User = Depends(get_current_active_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db)
 ):
     """
     Cập nhật lại nội dung bài học (lesson) dựa theo id bài học (lesson_id)
@@ -113,7 +190,7 @@ async def update_lesson(
     lesson_controller = LessonController(db)
 
     # Kiểm tra bài học tồn tại
-    existing_lesson = lesson_controller.get_lesson(lesson_id)
+    existing_lesson = await lesson_controller.get_lesson(lesson_id)
     if not existing_lesson:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -121,7 +198,7 @@ async def update_lesson(
         )
 
     # Cập nhật bài học
-    updated_lesson = lesson_controller.update_lesson(lesson_id, lesson_data)
+    updated_lesson = await lesson_controller.update_lesson(lesson_id, lesson_data)
     return updated_lesson
 
 
@@ -129,7 +206,7 @@ async def update_lesson(
 async def delete_lesson(
         lesson_id: int,
         current_user: User = Depends(get_current_active_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db)
 ):
     """
     Xóa bài học (lesson) dựa theo id bài học (lesson_id)
@@ -140,7 +217,7 @@ async def delete_lesson(
     lesson_controller = LessonController(db)
 
     # Kiểm tra bài học tồn tại
-    existing_lesson = lesson_controller.get_lesson(lesson_id)
+    existing_lesson = await lesson_controller.get_lesson(lesson_id)
     if not existing_lesson:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -148,7 +225,7 @@ async def delete_lesson(
         )
 
     # Xóa bài học
-    success = lesson_controller.delete_lesson(lesson_id)
+    success = await lesson_controller.delete_lesson(lesson_id)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Depends
+from typing import Dict, Any
+
+from app.models.models import User
+from app.utils.auth import get_current_active_user
+from app.utils.metrics import collect_metrics
+
+router = APIRouter(
+    prefix="/api/metrics",
+    tags=["metrics"],
+    responses={401: {"description": "Unauthorized"}}
+)
+
+
+@router.get("", response_model=Dict[str, Any])
+async def get_metrics(current_user: User = Depends(get_current_active_user)):
+    """
+    Lấy số liệu vận hành hiện tại của các thành phần (session store, cache, ...).
+    Yêu cầu đăng nhập vì số liệu lộ trạng thái nội bộ của hệ thống.
+
+    Returns:
+        Dict số liệu theo tên thành phần
+    """
+    return collect_metrics()
@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from typing import List, Optional
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.models import get_db, User
 from app.controllers.chatbot_controller import ChatbotController
 from app.utils.auth import get_current_active_user
@@ -38,7 +38,7 @@ class PromptTemplateResponse(BaseModel):
 @router.get("", response_model=List[str])
 async def list_prompt_templates(
         current_user: User = Depends(get_current_active_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db)
 ):
     """Lấy danh sách tất cả prompt templates"""
     chatbot_controller = ChatbotController(db)
@@ -50,7 +50,7 @@ async def list_prompt_templates(
 async def get_prompt_template(
         template_name: str,
         current_user: User = Depends(get_current_active_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db)
 ):
     """Lấy chi tiết của một prompt template"""
     chatbot_controller = ChatbotController(db)
@@ -76,7 +76,7 @@ async def get_prompt_template(
 async def create_prompt_template(
         template: PromptTemplateCreate,
         current_user: User = Depends(get_current_active_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db)
 ):
     """Tạo một prompt template mới"""
     chatbot_controller = ChatbotController(db)
@@ -118,7 +118,7 @@ async def update_prompt_template(
         template_name: str,
         template: PromptTemplateUpdate,
         current_user: User = Depends(get_current_active_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db)
 ):
     """Cập nhật một prompt template"""
     chatbot_controller = ChatbotController(db)
@@ -162,7 +162,7 @@ async def update_prompt_template(
 async def delete_prompt_template(
         template_name: str,
         current_user: User = Depends(get_current_active_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db)
 ):
     """Xóa một prompt template"""
     chatbot_controller = ChatbotController(db)
@@ -29,4 +29,6 @@ class ConversationUpdate(BaseModel):
 
 
 class ConversationDetail(ConversationResponse):
-    messages: List[MessageResponse] = []
\ No newline at end of file
+    # Chỉ gồm trang tin nhắn mới nhất; trang cũ hơn lấy qua /messages?before=prev_cursor
+    messages: List[MessageResponse] = []
+    prev_cursor: Optional[int] = None
\ No newline at end of file
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Optional, List
 from datetime import datetime
 
 
@@ -24,4 +24,47 @@ class LessonResponse(LessonBase):
 
 class LessonUpdate(BaseModel):
     title: Optional[str] = Field(None, min_length=3, max_length=200)
-    content: Optional[str] = None
\ No newline at end of file
+    content: Optional[str] = None
+
+
+class LessonSearchResult(BaseModel):
+    id: int
+    title: str
+    rank: float
+    snippet: str = Field(..., description="Đoạn trích đã escape HTML; markup duy nhất là <mark>...</mark> "
+                                          "quanh các từ khớp, client có thể hiển thị trực tiếp dạng HTML")
+
+
+class LessonSearchResponse(BaseModel):
+    total: int
+    limit: int
+    offset: int
+    items: List[LessonSearchResult] = []
+
+
+class LessonListItem(BaseModel):
+    # Chỉ các trường được chọn qua tham số fields= có mặt trong phản hồi
+    id: int
+    title: Optional[str] = None
+    content: Optional[str] = None
+    content_length: Optional[int] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+
+class LessonListResponse(BaseModel):
+    items: List[LessonListItem] = []
+    next_cursor: Optional[int] = None  # None khi đã tới trang cuối
+
+
+class LessonImportError(BaseModel):
+    row: int  # Số thứ tự bản ghi trong dữ liệu tải lên, bắt đầu từ 1
+    id: Optional[int] = None
+    detail: str
+
+
+class LessonImportResponse(BaseModel):
+    imported: int
+    skipped: int = 0  # Bài học có id đã tồn tại, không bị ghi đè (on_conflict=skip)
+    failed: int
+    errors: List[LessonImportError] = []
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 
 class MessageBase(BaseModel):
@@ -21,6 +21,12 @@ class MessageResponse(MessageBase):
         from_attributes = True
 
 
+class MessagePage(BaseModel):
+    messages: List[MessageResponse] = []  # Theo thứ tự thời gian, cũ trước
+    prev_cursor: Optional[int] = None  # Truyền vào before để lấy trang cũ hơn; None khi không còn
+    next_cursor: Optional[int] = None  # Truyền vào after để lấy trang mới hơn; None khi không còn
+
+
 class ChatRequest(BaseModel):
     message: str
     conversation_id: Optional[int] = None
@@ -1,5 +1,5 @@
 from typing import List, Dict, Any, Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, field_serializer
 from datetime import datetime
 
 class MessageRequest(BaseModel):
@@ -12,4 +12,10 @@ class MessageResponse(BaseModel):
     timestamp: datetime = datetime.now()
 
 class ChatHistoryResponse(BaseModel):
-    messages: List[Dict[str, Any]]
\ No newline at end of file
+    messages: List[Dict[str, Any]]
+    last_seq: int = 0  # Seq của tin nhắn cuối, truyền vào after ở lần gọi sau
+
+    @field_serializer("messages")
+    def hide_internal_fields(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # "tokens" chỉ dùng nội bộ khi chọn lịch sử đưa vào prompt
+        return [{key: value for key, value in message.items() if key != "tokens"} for message in messages]
\ No newline at end of file
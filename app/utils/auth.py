@@ -1,12 +1,20 @@
 # app/utils/auth.py
+import asyncio
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Any, Callable, Dict, Optional
 from jose import JWTError, jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.models import User, Token, get_db
 from app.config import settings
+from app.utils.auth_cache import auth_cache, AuthUser
+from app.utils.token_store import hash_token, token_denylist
+from app.utils.metrics import register_metrics
 from passlib.context import CryptContext
 
 # Xác thực với OAuth2
@@ -24,23 +32,77 @@ def get_password_hash(password):
     return pwd_context.hash(password)
 
 
-def create_access_token(db: Session, user_id: int, expires_delta: Optional[timedelta] = None):
+class PasswordHasher:
+    """
+    Chạy bcrypt (~200ms CPU mỗi lần) trong threadpool riêng để không chặn event loop.
+
+    Semaphore giới hạn số lần băm đang chạy bằng số thread: các yêu cầu còn lại chờ trên event loop
+    thay vì xếp hàng trong executor, nên yêu cầu bị hủy (client ngắt kết nối) không chiếm CPU.
+    """
+
+    def __init__(self, max_workers: int):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bcrypt")
+        self.semaphore = asyncio.Semaphore(max_workers)
+        self.max_workers = max_workers
+        self.waiting = 0
+        self.completed = 0
+        self.total_seconds = 0.0
+
+    async def run(self, fn: Callable, *args) -> Any:
+        self.waiting += 1
+        try:
+            await self.semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        try:
+            start = time.perf_counter()
+            result = await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+            self.total_seconds += time.perf_counter() - start
+            self.completed += 1
+            return result
+        finally:
+            self.semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """Số liệu hoạt động của threadpool bcrypt"""
+        return {
+            "max_workers": self.max_workers,
+            "running": self.max_workers - self.semaphore._value,
+            "waiting": self.waiting,
+            "completed": self.completed,
+            "avg_ms": self.total_seconds * 1000 / self.completed if self.completed else 0.0,
+        }
+
+
+password_hasher = PasswordHasher(settings.PASSWORD_HASH_WORKERS)
+register_metrics("password_hashing", password_hasher.stats)
+
+
+async def verify_password_async(plain_password, hashed_password) -> bool:
+    return await password_hasher.run(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password) -> str:
+    return await password_hasher.run(get_password_hash, password)
+
+
+async def create_access_token(db: AsyncSession, user_id: int, expires_delta: Optional[timedelta] = None):
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=settings.JWT_EXPIRES_MINUTES))
 
     # Tạo payload JWT
-    to_encode = {"sub": str(user_id), "exp": expire}
+    # jti giúp hai token cấp trong cùng một giây cho cùng người dùng vẫn khác nhau
+    to_encode = {"sub": str(user_id), "exp": expire, "jti": uuid.uuid4().hex}
     encoded_jwt = jwt.encode(to_encode, settings.JWT_SECRET, algorithm=settings.JWT_ALGORITHM)
 
-    # Lưu token vào database
+    # Lưu mã băm của token vào database
     db_token = Token(
-        access_token=encoded_jwt,
+        token_hash=hash_token(encoded_jwt),
         token_type="bearer",
         expires_at=expire,
         user_id=user_id
     )
     db.add(db_token)
-    db.commit()
-    db.refresh(db_token)
+    await db.commit()
 
     return {
         "access_token": encoded_jwt,
@@ -49,39 +111,50 @@ def create_access_token(db: Session, user_id: int, expires_delta: Optional[timed
     }
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
 
+    token_hash = hash_token(token)
+    # Token đã bị thu hồi hoặc đã xác thực gần đây: không cần giải mã lại hay truy vấn CSDL
+    if token_denylist.contains(token_hash):
+        raise credentials_exception
+    cached_user = auth_cache.get(token_hash)
+    if cached_user is not None:
+        return cached_user
+
     try:
         # Giải mã JWT
         payload = jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
         user_id: str = payload.get("sub")
         if user_id is None:
             raise credentials_exception
+        generation = auth_cache.generation(int(user_id))
 
         # Kiểm tra token trong database
-        db_token = db.query(Token).filter(
-            Token.access_token == token,
+        db_token = await db.scalar(select(Token).where(
+            Token.token_hash == token_hash,
             Token.expires_at > datetime.utcnow(),
             Token.is_revoked == False
-        ).first()
+        ))
 
         if not db_token:
             raise credentials_exception
 
         # Lấy user từ database
-        user = db.query(User).filter(User.id == int(user_id)).first()
+        user = await db.scalar(select(User).where(User.id == int(user_id)))
         if user is None:
             raise credentials_exception
 
     except JWTError:
         raise credentials_exception
 
-    return user
+    current_user = AuthUser.from_user(user)
+    auth_cache.set(token_hash, current_user, db_token.expires_at, generation)
+    return current_user
 
 
 async def get_current_active_user(current_user: User = Depends(get_current_user)):
@@ -90,11 +163,15 @@ async def get_current_active_user(current_user: User = Depends(get_current_user)
     return current_user
 
 
-def revoke_token(db: Session, token: str):
+async def revoke_token(db: AsyncSession, token: str):
     """Thu hồi token"""
-    db_token = db.query(Token).filter(Token.access_token == token).first()
+    token_hash = hash_token(token)
+    db_token = await db.scalar(select(Token).where(Token.token_hash == token_hash))
     if db_token:
         db_token.is_revoked = True
-        db.commit()
+        db_token.revoked_at = datetime.utcnow()
+        await db.commit()
+        auth_cache.invalidate_token(token_hash, db_token.user_id)
+        token_denylist.add(token_hash, db_token.expires_at)
         return True
-    return False
\ No newline at end of file
+    return False
@@ -0,0 +1,105 @@
+import threading
+from datetime import datetime
+from typing import Any, Dict, Optional, Set
+
+from app.config import settings
+from app.utils.cache import TTLCache
+from app.utils.metrics import register_metrics
+
+
+class AuthUser:
+    """Bản sao chỉ đọc của người dùng đã xác thực, không gắn với session CSDL"""
+    __slots__ = ("id", "username", "email", "created_at", "updated_at", "is_active")
+
+    def __init__(self, id: int, username: str, email: str, created_at: Optional[datetime],
+                 updated_at: Optional[datetime], is_active: bool):
+        self.id = id
+        self.username = username
+        self.email = email
+        self.created_at = created_at
+        self.updated_at = updated_at
+        self.is_active = is_active
+
+    @classmethod
+    def from_user(cls, user) -> "AuthUser":
+        return cls(user.id, user.username, user.email, user.created_at, user.updated_at, user.is_active)
+
+
+class AuthCache:
+    """
+    Cache token đã xác thực (mã băm token -> người dùng) trong tiến trình.
+
+    Thời gian sống của mỗi token trong cache không vượt quá TTL và thời điểm hết hạn của token.
+    Mỗi người dùng có một số thế hệ, tăng lên khi token bị thu hồi hoặc người dùng thay đổi;
+    kết quả đọc từ CSDL chỉ được lưu nếu thế hệ không đổi trong lúc đọc.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        """
+        Args:
+            max_entries: Số token tối đa được cache.
+            ttl_seconds: Thời gian sống tối đa của mỗi token trong cache.
+        """
+        self.cache = TTLCache(max_entries, ttl_seconds)
+        self.ttl_seconds = ttl_seconds
+        self._generations: Dict[int, int] = {}
+        self._user_tokens: Dict[int, Set[str]] = {}
+        self._lock = threading.Lock()
+        self.invalidations = 0
+
+    def generation(self, user_id: int) -> int:
+        """Thế hệ hiện tại của người dùng"""
+        return self._generations.get(user_id, 0)
+
+    def get(self, token: str) -> Optional[AuthUser]:
+        """Lấy người dùng của token trong cache"""
+        return self.cache.get(token)
+
+    def set(self, token: str, user: AuthUser, expires_at: datetime, generation: int):
+        """
+        Lưu token đã xác thực.
+
+        Args:
+            token: Mã băm của access token.
+            user: Người dùng của token.
+            expires_at: Thời điểm hết hạn của token (UTC).
+            generation: Thế hệ của người dùng trước khi đọc CSDL.
+        """
+        ttl = min(self.ttl_seconds, (expires_at - datetime.utcnow()).total_seconds())
+        if ttl <= 0:
+            return
+        with self._lock:
+            if self.generation(user.id) != generation:
+                return
+            self.cache.set(token, user, ttl)
+            tokens = self._user_tokens.setdefault(user.id, set())
+            # Dọn các token không còn trong cache để chỉ mục không lớn dần
+            if len(tokens) >= 16:
+                tokens.intersection_update([t for t in tokens if t in self.cache])
+            tokens.add(token)
+
+    def invalidate_token(self, token: str, user_id: Optional[int] = None):
+        """Xóa một token khỏi cache (gọi ngay sau khi thu hồi token trong CSDL)"""
+        with self._lock:
+            user = self.cache.pop(token)
+            user_id = user_id if user_id is not None else (user.id if user is not None else None)
+            if user_id is not None:
+                self._generations[user_id] = self.generation(user_id) + 1
+                self._user_tokens.get(user_id, set()).discard(token)
+            self.invalidations += 1
+
+    def invalidate_user(self, user_id: int):
+        """Xóa mọi token của người dùng khỏi cache (gọi sau khi cập nhật, vô hiệu hóa hoặc xóa người dùng)"""
+        with self._lock:
+            self._generations[user_id] = self.generation(user_id) + 1
+            for token in self._user_tokens.pop(user_id, set()):
+                self.cache.pop(token)
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Số liệu hoạt động của cache"""
+        return {**self.cache.stats(), "invalidations": self.invalidations}
+
+
+auth_cache = AuthCache(settings.AUTH_CACHE_MAX_ENTRIES, settings.AUTH_CACHE_TTL_SECONDS)
+register_metrics("auth_cache", auth_cache.stats)
@@ -0,0 +1,22 @@
+from typing import Optional
+
+
+def history_etag(last_seq: int) -> str:
+    """ETag (weak) của lịch sử chat, đổi mỗi khi có tin nhắn mới"""
+    return f'W/"{last_seq}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Kiểm tra header If-None-Match có khớp ETag hiện tại không (so sánh weak, hỗ trợ danh sách và "*")"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
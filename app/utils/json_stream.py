@@ -0,0 +1,154 @@
+import codecs
+import json
+import re
+from typing import Any, AsyncIterator, Optional, Tuple
+
+_WHITESPACE = " \t\r\n"
+
+# Ranh giới giữa hai phần tử của mảng đối tượng, dùng để đọc tiếp sau một phần tử lỗi
+_RESYNC = re.compile(r"\}\s*([,\]])")
+
+# Literal JSON có thể bị cắt giữa hai chunk (json của Python chấp nhận cả NaN/Infinity)
+_LITERALS = ("true", "false", "null", "NaN", "Infinity", "-Infinity")
+# Phần đuôi của một số bị cắt giữa hai chunk (vd: "1." hoặc "1e-")
+_NUMBER_TAIL = re.compile(r"(\.|[eE][-+]?)")
+
+
+def _parse_line(line: str) -> Tuple[Any, Optional[str]]:
+    try:
+        return json.loads(line), None
+    except json.JSONDecodeError as e:
+        return None, f"JSON không hợp lệ: {e.msg}"
+
+
+def _is_truncated(buffer: str, error: json.JSONDecodeError) -> bool:
+    """Lỗi do phần tử chưa nhận đủ dữ liệu (cắt giữa chuỗi, số hoặc literal), không phải sai cú pháp"""
+    if error.msg.startswith("Unterminated string"):
+        return True
+    tail = buffer[error.pos:]
+    if not tail.strip(_WHITESPACE):
+        return True
+    if error.msg.startswith("Invalid \\uXXXX escape"):
+        return len(tail) < 5
+    return any(literal.startswith(tail) for literal in _LITERALS) or bool(_NUMBER_TAIL.fullmatch(tail))
+
+
+def _too_large(max_row_chars: int) -> str:
+    return f"Bản ghi vượt quá {max_row_chars} ký tự"
+
+
+async def iter_json_rows(chunks: AsyncIterator[bytes],
+                         max_row_chars: int = 2_000_000) -> AsyncIterator[Tuple[int, Any, Optional[str]]]:
+    """
+    Đọc dần các bản ghi từ một luồng NDJSON (mỗi dòng một đối tượng) hoặc một mảng JSON,
+    không cần giữ toàn bộ dữ liệu tải lên trong bộ nhớ.
+
+    Dạng dữ liệu được nhận biết qua ký tự đầu tiên ('[' là mảng JSON). Bản ghi lỗi cú pháp hoặc
+    dài hơn max_row_chars chỉ làm hỏng bản ghi đó: với NDJSON việc đọc tiếp tục từ dòng sau, với
+    mảng JSON từ ranh giới "}," kế tiếp. Bộ đệm không bao giờ giữ quá một bản ghi max_row_chars ký tự.
+
+    Args:
+        chunks: Luồng byte của nội dung tải lên (ví dụ request.stream()).
+        max_row_chars: Số ký tự tối đa của một bản ghi.
+
+    Yields:
+        (số thứ tự bản ghi bắt đầu từ 1, dữ liệu, thông báo lỗi hoặc None)
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    is_array: Optional[bool] = None
+    array_closed = False
+    skipping = False  # Đang bỏ qua phần còn lại của một bản ghi lỗi/quá dài
+    retry_at = 0  # Phần tử chưa đủ dữ liệu chỉ được giải mã lại khi bộ đệm đạt độ dài này
+    row = 0
+
+    async def _stream():
+        async for chunk in chunks:
+            yield utf8.decode(chunk), False
+        yield utf8.decode(b"", final=True), True
+
+    async for text, final in _stream():
+        buffer += text
+        if is_array is None:
+            buffer = buffer.lstrip(_WHITESPACE)
+            if not buffer:
+                continue
+            is_array = buffer[0] == "["
+            if is_array:
+                buffer = buffer[1:]
+
+        if not is_array:
+            lines = buffer.split("\n")
+            buffer = "" if final else lines.pop()
+            for line in lines:
+                if skipping:
+                    # Phần cuối của dòng quá dài đã được báo lỗi
+                    skipping = False
+                    continue
+                if line.strip():
+                    row += 1
+                    if len(line) > max_row_chars:
+                        yield row, None, _too_large(max_row_chars)
+                        continue
+                    data, error = _parse_line(line)
+                    yield row, data, error
+            if len(buffer) > max_row_chars:
+                if not skipping:
+                    row += 1
+                    yield row, None, _too_large(max_row_chars)
+                    skipping = True
+                buffer = ""
+            continue
+
+        if array_closed:
+            continue
+        position = 0
+        while True:
+            if skipping:
+                match = _RESYNC.search(buffer, position)
+                if match is None:
+                    # Giữ lại "}" cuối cùng (có thể là đầu của ranh giới "}," ở chunk sau)
+                    brace = buffer.rfind("}", position)
+                    position = brace if brace != -1 and not buffer[brace + 1:].strip(_WHITESPACE) else len(buffer)
+                    break
+                skipping = False
+                position = match.end() if match.group(1) == "," else match.start(1)
+            while position < len(buffer) and (buffer[position] in _WHITESPACE or buffer[position] == ","):
+                position += 1
+            if position == len(buffer):
+                break
+            if buffer[position] == "]":
+                array_closed = True
+                break
+            if not final and len(buffer) - position < retry_at:
+                # Phần tử trước đó chưa đủ dữ liệu: chờ bộ đệm dài gấp đôi rồi mới giải mã lại
+                break
+            try:
+                data, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError as e:
+                truncated = _is_truncated(buffer, e)
+                if truncated and not final and len(buffer) - position <= max_row_chars:
+                    retry_at = 2 * (len(buffer) - position)
+                    break
+                retry_at = 0
+                row += 1
+                if truncated and final:
+                    yield row, None, f"JSON không hợp lệ: {e.msg}"
+                    return
+                yield row, None, _too_large(max_row_chars) if truncated else f"JSON không hợp lệ: {e.msg}"
+                skipping = True
+                position = e.pos if not truncated else position + 1
+                continue
+            retry_at = 0
+            if end - position > max_row_chars:
+                row += 1
+                yield row, None, _too_large(max_row_chars)
+            else:
+                row += 1
+                yield row, data, None
+            position = end
+        buffer = buffer[position:]
+
+    if is_array and not array_closed:
+        yield row + 1, None, "JSON không hợp lệ: thiếu ']' kết thúc mảng"
@@ -0,0 +1,112 @@
+import threading
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.config import settings
+from app.utils.cache import TTLCache
+from app.utils.lesson_retrieval import BM25Index, select_context, split_sections
+from app.utils.metrics import register_metrics
+
+
+class CachedLesson:
+    """Bản sao chỉ đọc của một bài học kèm các phần và chỉ mục BM25, không gắn với session CSDL"""
+    __slots__ = ("id", "title", "content", "updated_at", "version", "sections", "index")
+
+    def __init__(self, id: int, title: str, content: str, updated_at: Optional[datetime], version: int,
+                 sections: List[str]):
+        self.id = id
+        self.title = title
+        self.content = content
+        self.updated_at = updated_at
+        self.version = version
+        self.sections = sections
+        self.index = BM25Index(sections)
+
+    @property
+    def revision(self) -> Optional[str]:
+        """Mốc cập nhật của bài học, dùng trong khóa cache phản hồi (đổi khi nội dung bài học đổi)"""
+        return self.updated_at.isoformat() if self.updated_at is not None else None
+
+    def select_context(self, query: str) -> str:
+        """Các phần của bài học liên quan tới câu hỏi, trong giới hạn token của prompt"""
+        return select_context(self.sections, self.index, query,
+                              settings.LESSON_CONTEXT_TOP_K, settings.LESSON_CONTEXT_MAX_TOKENS)
+
+
+class LessonCache:
+    """
+    Cache nội dung bài học trong tiến trình.
+
+    Mỗi bài học có một số phiên bản, tăng lên mỗi lần bị vô hiệu hóa. Kết quả đọc từ CSDL
+    chỉ được lưu nếu phiên bản không đổi trong lúc đọc, tránh ghi đè dữ liệu cũ sau khi cập nhật.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: Optional[float]):
+        """
+        Args:
+            max_entries: Số bài học tối đa được cache.
+            ttl_seconds: Thời gian sống của mỗi bài học (giới hạn độ trễ giữa các worker).
+        """
+        self.cache = TTLCache(max_entries, ttl_seconds)
+        self._versions: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[int], None]] = []
+        self.invalidations = 0
+
+    def add_invalidation_listener(self, listener: Callable[[int], None]):
+        """Đăng ký hàm được gọi với ID bài học mỗi khi bài học bị vô hiệu hóa (vd: xóa cache phản hồi)"""
+        self._listeners.append(listener)
+
+    def version(self, lesson_id: int) -> int:
+        """Phiên bản hiện tại của bài học"""
+        return self._versions.get(lesson_id, 0)
+
+    def get(self, lesson_id: int) -> Optional[CachedLesson]:
+        """Lấy bài học trong cache"""
+        return self.cache.get(lesson_id)
+
+    async def get_or_load(self, lesson_id: int, loader: Callable[[int], Awaitable[Any]]) -> Optional[CachedLesson]:
+        """
+        Lấy bài học trong cache, nạp từ CSDL nếu chưa có.
+
+        Args:
+            lesson_id: ID bài học.
+            loader: Hàm async đọc bài học (model Lesson, đã nạp sections) từ CSDL theo ID.
+
+        Returns:
+            CachedLesson hoặc None nếu bài học không tồn tại.
+        """
+        entry = self.cache.get(lesson_id)
+        if entry is not None:
+            return entry
+
+        version = self.version(lesson_id)
+        lesson = await loader(lesson_id)
+        if lesson is None:
+            return None
+
+        # Bài học tạo trước khi có bảng lesson_sections được chia phần ngay khi nạp
+        sections = [section.content for section in lesson.sections] or \
+            split_sections(lesson.content, settings.LESSON_SECTION_MAX_CHARS)
+        entry = CachedLesson(lesson.id, lesson.title, lesson.content, lesson.updated_at, version, sections)
+        with self._lock:
+            if self.version(lesson_id) == version:
+                self.cache.set(lesson_id, entry)
+        return entry
+
+    def invalidate(self, lesson_id: int):
+        """Vô hiệu hóa bài học (gọi ngay sau khi cập nhật hoặc xóa trong CSDL)"""
+        with self._lock:
+            self._versions[lesson_id] = self.version(lesson_id) + 1
+            self.cache.pop(lesson_id)
+            self.invalidations += 1
+        for listener in self._listeners:
+            listener(lesson_id)
+
+    def stats(self) -> Dict[str, Any]:
+        """Số liệu hoạt động của cache"""
+        return {**self.cache.stats(), "invalidations": self.invalidations}
+
+
+lesson_cache = LessonCache(settings.LESSON_CACHE_MAX_ENTRIES, settings.LESSON_CACHE_TTL_SECONDS)
+register_metrics("lesson_cache", lesson_cache.stats)
@@ -0,0 +1,184 @@
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Tuple
+
+from app.utils.text import fold_text
+from app.utils.tokens import count_tokens, truncate_tokens
+
+# Dòng tiêu đề markdown (#, ##, ...) hoặc dạng "1. ", "Phần 2:" ở đầu dòng
+_HEADING = re.compile(r"^\s*(#{1,6}\s|\d+[.)]\s|phần\s+\d+)", re.IGNORECASE)
+
+# Hư từ tiếng Việt phổ biến trong câu hỏi (dạng không dấu), không mang nội dung để truy hồi
+_STOPWORDS = {
+    "la", "gi", "cua", "va", "co", "duoc", "de", "trong", "cho", "voi", "mot", "cac", "nhung",
+    "nay", "khi", "thi", "nhu", "nao", "lam", "sao", "the", "em", "toi", "minh", "ban", "a", "oi",
+    "vay", "khong", "hay", "ra", "vao", "tu", "den", "o",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Tách từ đã chuẩn hóa (không dấu, chữ thường, bỏ hư từ) để đánh chỉ mục"""
+    return [term for term in fold_text(text).split() if term not in _STOPWORDS]
+
+
+def _split_line(line: str, max_chars: int) -> List[str]:
+    """Cắt một dòng dài hơn max_chars thành các đoạn, ưu tiên cắt tại khoảng trắng"""
+    pieces: List[str] = []
+    while len(line) > max_chars:
+        cut = line.rfind(" ", 0, max_chars + 1)
+        if cut <= max_chars // 2:
+            cut = max_chars
+        pieces.append(line[:cut].rstrip())
+        line = line[cut:].lstrip()
+    if line:
+        pieces.append(line)
+    return pieces
+
+
+def split_sections(content: str, max_chars: int = 1200) -> List[str]:
+    """
+    Chia nội dung bài học thành các phần theo tiêu đề và đoạn văn.
+
+    Các đoạn ngắn liền nhau được gộp lại, đoạn dài được cắt theo dòng (dòng quá dài được cắt
+    tiếp theo khoảng trắng) để mỗi phần không vượt quá max_chars. Tiêu đề đứng riêng được gộp
+    với đoạn ngay sau nó.
+
+    Args:
+        content: Nội dung bài học.
+        max_chars: Số ký tự tối đa của một phần.
+
+    Returns:
+        Danh sách các phần theo thứ tự trong bài học.
+    """
+    # Tách thành các khối: mỗi tiêu đề bắt đầu một khối mới, dòng trống kết thúc một đoạn
+    blocks: List[List[str]] = []
+    current: List[str] = []
+    for line in content.splitlines():
+        if _HEADING.match(line) or not line.strip():
+            if current:
+                blocks.append(current)
+            current = [line] if line.strip() else []
+        else:
+            current.append(line)
+    if current:
+        blocks.append(current)
+
+    # Khối chỉ có tiêu đề không mang nội dung để truy hồi: gộp vào khối ngay sau
+    merged: List[List[str]] = []
+    headings: List[str] = []
+    for block in blocks:
+        if len(block) == 1 and _HEADING.match(block[0]):
+            headings.append(block[0])
+            continue
+        merged.append(headings + block)
+        headings = []
+    if headings:
+        merged.append(headings)
+
+    sections: List[str] = []
+    buffer: List[str] = []
+    size = 0
+    for block in merged:
+        text = "\n".join(block)
+        # Tiêu đề luôn bắt đầu phần mới; các đoạn khác được gộp tới khi đầy
+        if buffer and (_HEADING.match(block[0]) or size + len(text) > max_chars):
+            sections.append("\n".join(buffer))
+            buffer, size = [], 0
+        # Đoạn quá dài được cắt theo dòng, dòng quá dài được cắt tiếp
+        pieces = [text] if len(text) <= max_chars else \
+            [piece for line in block for piece in _split_line(line, max_chars)]
+        for piece in pieces:
+            if buffer and size + len(piece) > max_chars:
+                sections.append("\n".join(buffer))
+                buffer, size = [], 0
+            buffer.append(piece)
+            size += len(piece) + 1
+    if buffer:
+        sections.append("\n".join(buffer))
+    return [section.strip() for section in sections if section.strip()]
+
+
+class BM25Index:
+    """Chỉ mục ngược BM25 trên các phần của một bài học"""
+
+    def __init__(self, documents: List[str], k1: float = 1.5, b: float = 0.75):
+        """
+        Args:
+            documents: Danh sách văn bản (các phần của bài học).
+            k1: Tham số bão hòa tần suất từ.
+            b: Tham số chuẩn hóa độ dài văn bản.
+        """
+        self.k1 = k1
+        self.b = b
+        self.doc_lengths: List[int] = []
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        for doc_id, document in enumerate(documents):
+            terms = Counter(tokenize(document))
+            self.doc_lengths.append(sum(terms.values()))
+            for term, tf in terms.items():
+                self.postings.setdefault(term, []).append((doc_id, tf))
+
+        n = len(documents)
+        self.avg_length = sum(self.doc_lengths) / n if n else 0.0
+        self.idf = {
+            term: math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self.postings.items()
+        }
+
+    def search(self, query: str, top_k: int) -> List[Tuple[int, float]]:
+        """
+        Tìm các phần liên quan nhất tới câu truy vấn.
+
+        Args:
+            query: Câu truy vấn.
+            top_k: Số kết quả tối đa.
+
+        Returns:
+            Danh sách (chỉ số phần, điểm) theo điểm giảm dần, chỉ gồm các phần có điểm > 0.
+        """
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for doc_id, tf in self.postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / (self.avg_length or 1))
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+
+
+def select_context(sections: List[str], index: BM25Index, query: str, top_k: int, max_tokens: int) -> str:
+    """
+    Chọn các phần bài học liên quan tới câu hỏi để đưa vào prompt.
+
+    Lấy tối đa top_k phần có điểm BM25 cao nhất trong giới hạn max_tokens, giữ nguyên thứ tự
+    trong bài học. Nếu không phần nào khớp, dùng các phần đầu bài học. Phần đầu tiên được chọn
+    bị cắt bớt nếu riêng nó đã vượt quá max_tokens.
+
+    Args:
+        sections: Các phần của bài học.
+        index: Chỉ mục BM25 của các phần.
+        query: Câu hỏi hiện tại và các câu hỏi gần nhất của học viên.
+        top_k: Số phần tối đa.
+        max_tokens: Số token tối đa của ngữ cảnh.
+
+    Returns:
+        Nội dung các phần được chọn, cách nhau bởi dòng trống.
+    """
+    ranked = [doc_id for doc_id, _ in index.search(query, top_k)] or list(range(min(top_k, len(sections))))
+
+    selected: Dict[int, str] = {}
+    used = 0
+    for doc_id in ranked:
+        text = sections[doc_id]
+        # Dòng trống ngăn cách với phần trước cũng được tính vào giới hạn
+        tokens = count_tokens(text) + (1 if selected else 0)
+        if used + tokens > max_tokens:
+            if selected:
+                continue
+            text = truncate_tokens(text, max_tokens)
+            tokens = count_tokens(text)
+        selected[doc_id] = text
+        used += tokens
+    return "\n\n".join(selected[doc_id] for doc_id in sorted(selected))
@@ -0,0 +1,111 @@
+import asyncio
+import html
+import re
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.utils.lesson_retrieval import BM25Index, tokenize
+from app.utils.text import fold_text
+
+_WORD = re.compile(r"\w+")
+
+
+def make_snippet(content: str, terms: Set[str], max_words: int = 30) -> str:
+    """
+    Trích một đoạn ngắn quanh từ khớp đầu tiên, đánh dấu các từ khớp bằng <mark>.
+
+    Nội dung bài học được escape HTML, nên <mark> là markup duy nhất trong đoạn trích.
+
+    Args:
+        content: Nội dung bài học.
+        terms: Các từ truy vấn đã chuẩn hóa (không dấu, chữ thường).
+        max_words: Số từ tối đa của đoạn trích.
+
+    Returns:
+        Đoạn trích đã escape HTML, có đánh dấu.
+    """
+    words = list(_WORD.finditer(content))
+    if not words:
+        return ""
+    matches = [i for i, word in enumerate(words) if fold_text(word.group()) in terms]
+    first = matches[0] if matches else 0
+    start = max(0, first - max_words // 3)
+    end = min(len(words), start + max_words)
+
+    parts: List[str] = []
+    position = words[start].start()
+    for word in words[start:end]:
+        parts.append(html.escape(content[position:word.start()]))
+        if fold_text(word.group()) in terms:
+            parts.append(f"<mark>{html.escape(word.group())}</mark>")
+        else:
+            parts.append(html.escape(word.group()))
+        position = word.end()
+
+    snippet = " ".join("".join(parts).split())
+    if start > 0:
+        snippet = "..." + snippet
+    if end < len(words):
+        snippet += "..."
+    return snippet
+
+
+class LessonSearchIndex:
+    """
+    Chỉ mục ngược BM25 trên toàn bộ bài học trong tiến trình, dùng khi CSDL không hỗ trợ
+    tìm kiếm toàn văn (SQLite khi test). Được dựng lại ở lần tìm kiếm đầu tiên sau khi bài học thay đổi.
+    """
+
+    def __init__(self):
+        self._lock = asyncio.Lock()
+        self._dirty = True
+        self._index: Optional[BM25Index] = None
+        self._lessons: List[Tuple[int, str, str]] = []
+
+    def invalidate(self):
+        """Đánh dấu chỉ mục cần dựng lại (gọi sau khi tạo, sửa hoặc xóa bài học)"""
+        self._dirty = True
+
+    async def _ensure_built(self, loader: Callable[[], Awaitable[Iterable[Tuple[int, str, str]]]]):
+        async with self._lock:
+            if not self._dirty:
+                return
+            # Đánh dấu trước khi đọc: thay đổi xảy ra trong lúc đọc sẽ làm chỉ mục được dựng lại lần sau
+            self._dirty = False
+            try:
+                self._lessons = list(await loader())
+            except BaseException:
+                self._dirty = True
+                raise
+            # Tiêu đề được lặp lại để có trọng số cao hơn nội dung
+            self._index = BM25Index([f"{title}\n{title}\n{content}" for _, title, content in self._lessons])
+
+    async def search(self, query: str, limit: int, offset: int,
+                     loader: Callable[[], Awaitable[Iterable[Tuple[int, str, str]]]]) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        Tìm bài học theo câu truy vấn.
+
+        Args:
+            query: Câu truy vấn.
+            limit: Số kết quả mỗi trang.
+            offset: Vị trí bắt đầu.
+            loader: Hàm đọc (id, title, content) của mọi bài học khi cần dựng lại chỉ mục.
+
+        Returns:
+            (tổng số kết quả, danh sách kết quả của trang hiện tại)
+        """
+        await self._ensure_built(loader)
+        ranked = self._index.search(query, len(self._lessons))
+        terms = set(tokenize(query))
+        items = []
+        for doc_id, score in ranked[offset:offset + limit]:
+            lesson_id, title, content = self._lessons[doc_id]
+            items.append({
+                "id": lesson_id,
+                "title": title,
+                "rank": score,
+                "snippet": make_snippet(content, terms),
+            })
+        return len(ranked), items
+
+
+lesson_search_index = LessonSearchIndex()
@@ -0,0 +1,20 @@
+from typing import Any, Callable, Dict
+
+# Các hàm thu thập số liệu đã đăng ký, theo tên thành phần
+_collectors: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+
+def register_metrics(name: str, collector: Callable[[], Dict[str, Any]]):
+    """
+    Đăng ký một hàm thu thập số liệu cho endpoint /api/metrics.
+
+    Args:
+        name: Tên thành phần (vd: "guide_sessions").
+        collector: Hàm trả về dict số liệu hiện tại của thành phần.
+    """
+    _collectors[name] = collector
+
+
+def collect_metrics() -> Dict[str, Dict[str, Any]]:
+    """Thu thập số liệu của tất cả thành phần đã đăng ký"""
+    return {name: collector() for name, collector in _collectors.items()}
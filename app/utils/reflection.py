@@ -1,4 +1,6 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+
+from app.utils.tokens import message_tokens
 
 
 class Reflection:
@@ -6,15 +8,42 @@ class Reflection:
     Trích xuất n tin nhắn gần nhất từ lịch sử chat.
     """
 
-    def __call__(self, chat_history: List[Dict[str, Any]], last_items_considered: int = 12) -> List[Dict[str, Any]]:
+    def __call__(self, chat_history: List[Dict[str, Any]], last_items_considered: int = 12,
+                 token_budget: Optional[int] = None) -> List[Dict[str, Any]]:
         """
         Trích xuất tin nhắn gần nhất từ lịch sử chat.
 
         Args:
             chat_history: Danh sách tin nhắn chat.
             last_items_considered: Số lượng tin nhắn gần nhất cần giữ lại.
+            token_budget: Nếu có, bỏ qua last_items_considered và giữ các tin nhắn gần nhất
+                          sao cho tổng số token không vượt quá ngân sách (luôn giữ tin nhắn cuối).
 
         Returns:
             Lịch sử chat được cắt ngắn chỉ chứa tin nhắn gần nhất.
         """
-        return chat_history[-last_items_considered:] if last_items_considered < len(chat_history) else chat_history
\ No newline at end of file
+        if token_budget is not None:
+            return self.fit_token_budget(chat_history, token_budget)
+        return chat_history[-last_items_considered:] if last_items_considered < len(chat_history) else chat_history
+
+    @staticmethod
+    def fit_token_budget(chat_history: List[Dict[str, Any]], token_budget: int) -> List[Dict[str, Any]]:
+        """
+        Giữ các tin nhắn gần nhất vừa với ngân sách token.
+
+        Args:
+            chat_history: Danh sách tin nhắn chat.
+            token_budget: Số token tối đa dành cho lịch sử.
+
+        Returns:
+            Các tin nhắn gần nhất (theo đúng thứ tự) có tổng số token không vượt quá ngân sách.
+        """
+        used = 0
+        start = len(chat_history)
+        for index in range(len(chat_history) - 1, -1, -1):
+            tokens = message_tokens(chat_history[index])
+            if start < len(chat_history) and used + tokens > token_budget:
+                break
+            used += tokens
+            start = index
+        return chat_history[start:]
@@ -0,0 +1,87 @@
+import hashlib
+import json
+import threading
+from typing import Any, Dict, List, Optional, Set
+
+from app.utils.cache import TTLCache
+from app.utils.text import normalize_text
+
+
+class ResponseCache:
+    """
+    Cache phản hồi của LLM theo khóa băm của (template, bài học, cửa sổ hội thoại đã chuẩn hóa,
+    model, max_tokens). Chỉ dùng cho các hội thoại ngắn, hội thoại dài hơn sẽ tự động bỏ qua cache.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: Optional[float], max_user_turns: int):
+        """
+        Args:
+            max_entries: Số phản hồi tối đa được cache.
+            ttl_seconds: Thời gian sống của mỗi phản hồi.
+            max_user_turns: Số lượt hỏi tối đa của người dùng trong cửa sổ hội thoại để còn dùng cache.
+        """
+        self.cache = TTLCache(max_entries, ttl_seconds)
+        self.max_user_turns = max_user_turns
+        self.bypasses = 0
+        self.invalidations = 0
+        # Khóa cache theo bài học, để xóa phản hồi của bài học khi bài học được cập nhật
+        self._lesson_keys: Dict[int, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def make_key(self, template_id: str, lesson_id: Optional[int], history: List[Dict[str, Any]],
+                 model: str, max_tokens: int, lesson_revision: Optional[str] = None) -> Optional[str]:
+        """
+        Tạo khóa cache cho một lượt hỏi.
+
+        Args:
+            template_id: Tên template prompt.
+            lesson_id: ID bài học (nếu có).
+            history: Cửa sổ hội thoại đưa vào prompt (đã gồm câu hỏi hiện tại).
+            model: Model LLM.
+            max_tokens: Số token tối đa.
+            lesson_revision: Mốc cập nhật của bài học (nội dung bài học nằm trong prompt).
+
+        Returns:
+            Khóa cache, hoặc None nếu hội thoại đã quá dài để dùng cache.
+        """
+        user_turns = sum(1 for entry in history if entry["role"] == "user")
+        if user_turns > self.max_user_turns:
+            self.bypasses += 1
+            return None
+
+        window = [(entry["role"].lower(), normalize_text(entry["content"])) for entry in history]
+        payload = json.dumps([template_id, lesson_id, lesson_revision, window, model, max_tokens],
+                             ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: Optional[str]) -> Optional[str]:
+        """Lấy phản hồi đã cache"""
+        if key is None:
+            return None
+        return self.cache.get(key)
+
+    def set(self, key: Optional[str], response: str, lesson_id: Optional[int] = None):
+        """Lưu phản hồi vào cache (bỏ qua phản hồi rỗng)"""
+        if key is None or not response:
+            return
+        self.cache.set(key, response)
+        if lesson_id is not None:
+            with self._lock:
+                keys = self._lesson_keys.setdefault(lesson_id, set())
+                keys.add(key)
+                # Bỏ các khóa đã bị loại khỏi cache (hết hạn hoặc LRU) để tập khóa không tăng mãi
+                if len(keys) > self.cache.max_entries:
+                    keys.intersection_update([k for k in keys if k in self.cache])
+
+    def invalidate_lesson(self, lesson_id: int):
+        """Xóa mọi phản hồi đã cache của một bài học (gọi khi bài học được cập nhật hoặc xóa)"""
+        with self._lock:
+            keys = self._lesson_keys.pop(lesson_id, ())
+        for key in keys:
+            self.cache.pop(key)
+        if keys:
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Số liệu hoạt động của cache"""
+        return {**self.cache.stats(), "bypasses": self.bypasses, "invalidations": self.invalidations}
@@ -0,0 +1,229 @@
+import math
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Dict, Optional, Set, Tuple
+
+from app.utils.text import fold_text, normalize_text
+
+# Toán tử C và đặc tả định dạng printf/scanf ("5/2" và "5%2", "%d" và "%f" chỉ khác nhau ở đây)
+_CODE_TOKEN = re.compile(r"%[-+ #0]*\d*(?:\.\d+)?(?:hh|h|ll|l|z|j|t)?[diouxefgacsp]|[-+*/%=<>!&|^~]+")
+
+
+def code_tokens(text: str) -> Tuple[str, ...]:
+    """
+    Các toán tử và đặc tả định dạng trong câu hỏi, theo thứ tự xuất hiện.
+
+    fold_text bỏ hết ký hiệu nên hai câu hỏi chỉ khác nhau ở toán tử (vd: "i++" và "i--")
+    có cùng vector n-gram; hai câu hỏi chỉ được coi là gần giống khi các ký hiệu này trùng nhau.
+    """
+    # "!" đứng riêng thường là dấu câu, không phải toán tử phủ định
+    return tuple(token for token in _CODE_TOKEN.findall(normalize_text(text)) if token != "!")
+
+
+# Từ phủ định: câu hỏi có và không có "không" gần như trùng n-gram nhưng hỏi điều ngược lại.
+# Dạng gõ không dấu chỉ tính khi cả từ không dấu ("dung" có thể là "dùng" nên không có trong danh sách)
+_NEGATIONS = {"không": "khong", "chưa": "chua", "chẳng": "chang", "chả": "cha", "đừng": "dung", "chớ": "cho",
+              "hổng": "khong", "not": "not"}
+_NEGATIONS_UNACCENTED = {"khong": "khong", "ko": "khong", "kg": "khong", "khg": "khong", "hok": "khong",
+                         "chua": "chua", "chang": "chang"}
+_WORD = re.compile(r"\w+")
+
+
+def negation_tokens(text: str) -> Tuple[str, ...]:
+    """Các từ phủ định trong câu hỏi (dạng không dấu), theo thứ tự xuất hiện"""
+    tokens = []
+    for word in _WORD.findall(normalize_text(text)):
+        token = _NEGATIONS.get(word) or (_NEGATIONS_UNACCENTED.get(word) if word.isascii() else None)
+        if token is not None:
+            tokens.append(token)
+    return tuple(tokens)
+
+
+def match_guard(text: str) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    """Các ký hiệu code và từ phủ định phải trùng nhau để hai câu hỏi được coi là gần giống"""
+    return code_tokens(text), negation_tokens(text)
+
+
+def ngram_vector(text: str, n: int = 3) -> Dict[str, float]:
+    """
+    Vector n-gram ký tự (theo từng từ) đã chuẩn hóa độ dài về 1.
+
+    Args:
+        text: Câu hỏi.
+        n: Độ dài n-gram.
+
+    Returns:
+        Vector thưa dạng {n-gram: trọng số}.
+    """
+    counts: Counter = Counter()
+    for word in fold_text(text).split():
+        padded = f" {word} "
+        for i in range(max(1, len(padded) - n + 1)):
+            counts[padded[i:i + n]] += 1
+    norm = math.sqrt(sum(c * c for c in counts.values()))
+    return {gram: c / norm for gram, c in counts.items()} if norm else {}
+
+
+class _Entry:
+    __slots__ = ("vector", "guard", "response", "expires_at")
+
+    def __init__(self, vector: Dict[str, float], guard: Tuple, response: str, expires_at: Optional[float]):
+        self.vector = vector
+        self.guard = guard
+        self.response = response
+        self.expires_at = expires_at
+
+
+class _LessonIndex:
+    """Chỉ mục ngược n-gram -> câu hỏi đã cache của một bài học"""
+
+    def __init__(self, revision: Optional[str]):
+        self.revision = revision
+        self.entries: "OrderedDict[int, _Entry]" = OrderedDict()
+        self.postings: Dict[str, Set[int]] = {}
+
+    def add(self, entry_id: int, entry: _Entry):
+        self.entries[entry_id] = entry
+        for gram in entry.vector:
+            self.postings.setdefault(gram, set()).add(entry_id)
+
+    def remove_oldest(self):
+        entry_id, entry = self.entries.popitem(last=False)
+        for gram in entry.vector:
+            ids = self.postings[gram]
+            ids.discard(entry_id)
+            if not ids:
+                del self.postings[gram]
+
+    def remove_expired(self, now: float) -> int:
+        """Xóa các câu hỏi đã hết hạn (TTL như nhau nên câu cũ nhất hết hạn trước)"""
+        removed = 0
+        while self.entries:
+            expires_at = next(iter(self.entries.values())).expires_at
+            if expires_at is None or expires_at > now:
+                break
+            self.remove_oldest()
+            removed += 1
+        return removed
+
+    def best_match(self, vector: Dict[str, float], guard: Tuple) -> Tuple[float, Optional[str]]:
+        """Câu hỏi gần nhất theo cosine, chỉ tính trên các câu có chung n-gram, cùng ký hiệu code và từ phủ định"""
+        scores: Dict[int, float] = {}
+        for gram, weight in vector.items():
+            for entry_id in self.postings.get(gram, ()):
+                entry = self.entries[entry_id]
+                if entry.guard == guard:
+                    scores[entry_id] = scores.get(entry_id, 0.0) + weight * entry.vector[gram]
+        if not scores:
+            return 0.0, None
+        entry_id = max(scores, key=scores.get)
+        return scores[entry_id], self.entries[entry_id].response
+
+
+class SemanticCache:
+    """
+    Cache phản hồi cho câu hỏi mở đầu gần giống nhau trong cùng một bài học
+    (cosine trên n-gram ký tự, chạy hoàn toàn trong tiến trình).
+    """
+
+    def __init__(self, threshold: float, max_entries_per_lesson: int, max_lessons: int,
+                 ttl_seconds: Optional[float] = None):
+        """
+        Args:
+            threshold: Độ tương đồng cosine tối thiểu để dùng lại phản hồi.
+            max_entries_per_lesson: Số câu hỏi tối đa được cache cho mỗi bài học.
+            max_lessons: Số bài học tối đa giữ chỉ mục.
+            ttl_seconds: Thời gian sống của mỗi phản hồi (None: không hết hạn).
+        """
+        self.threshold = threshold
+        self.max_entries_per_lesson = max_entries_per_lesson
+        self.max_lessons = max_lessons
+        self.ttl_seconds = ttl_seconds
+        self._lessons: "OrderedDict[int, _LessonIndex]" = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.total_lookup_seconds = 0.0
+        self.max_lookup_seconds = 0.0
+
+    def lookup(self, lesson_id: int, question: str, revision: Optional[str] = None) -> Optional[str]:
+        """
+        Tìm phản hồi đã cache cho câu hỏi gần giống.
+
+        Args:
+            lesson_id: ID bài học.
+            question: Câu hỏi của học viên.
+            revision: Mốc cập nhật của bài học; phản hồi cache theo mốc khác bị bỏ qua.
+
+        Returns:
+            Phản hồi đã cache nếu độ tương đồng đạt ngưỡng, ngược lại None.
+        """
+        start = time.perf_counter()
+        with self._lock:
+            index = self._lessons.get(lesson_id)
+            score, response = (0.0, None)
+            if index is not None and index.revision != revision:
+                # Bài học đã được cập nhật (có thể ở worker khác): bỏ các phản hồi theo nội dung cũ
+                del self._lessons[lesson_id]
+                self.invalidations += 1
+            elif index is not None:
+                self._lessons.move_to_end(lesson_id)
+                self.expirations += index.remove_expired(time.monotonic())
+                score, response = index.best_match(ngram_vector(question), match_guard(question))
+
+            elapsed = time.perf_counter() - start
+            self.total_lookup_seconds += elapsed
+            self.max_lookup_seconds = max(self.max_lookup_seconds, elapsed)
+            if response is not None and score >= self.threshold:
+                self.hits += 1
+                return response
+            self.misses += 1
+            return None
+
+    def add(self, lesson_id: int, question: str, response: str, revision: Optional[str] = None):
+        """Lưu phản hồi cho câu hỏi mở đầu của một bài học (revision: mốc cập nhật của bài học)"""
+        vector = ngram_vector(question)
+        if not vector or not response:
+            return
+        now = time.monotonic()
+        entry = _Entry(vector, match_guard(question), response,
+                       now + self.ttl_seconds if self.ttl_seconds is not None else None)
+        with self._lock:
+            index = self._lessons.get(lesson_id)
+            if index is None or index.revision != revision:
+                index = self._lessons[lesson_id] = _LessonIndex(revision)
+                while len(self._lessons) > self.max_lessons:
+                    self._lessons.popitem(last=False)
+            self._lessons.move_to_end(lesson_id)
+
+            self.expirations += index.remove_expired(now)
+            self._next_id += 1
+            index.add(self._next_id, entry)
+            while len(index.entries) > self.max_entries_per_lesson:
+                index.remove_oldest()
+
+    def invalidate_lesson(self, lesson_id: int):
+        """Xóa mọi phản hồi đã cache của một bài học (gọi khi bài học được cập nhật hoặc xóa)"""
+        with self._lock:
+            if self._lessons.pop(lesson_id, None) is not None:
+                self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Số liệu hoạt động của cache"""
+        lookups = self.hits + self.misses
+        return {
+            "lessons": len(self._lessons),
+            "entries": sum(len(index.entries) for index in self._lessons.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "avg_lookup_ms": self.total_lookup_seconds / lookups * 1000 if lookups else 0.0,
+            "max_lookup_ms": self.max_lookup_seconds * 1000,
+        }
@@ -0,0 +1,131 @@
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, List, Optional
+
+
+class _Flight:
+    """Một lời gọi stream đang chạy, giữ các đoạn đã nhận để phát lại cho người đăng ký sau"""
+
+    def __init__(self):
+        self.chunks: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    def notify(self):
+        """Đánh thức mọi người đăng ký đang chờ đoạn mới"""
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def wait(self):
+        await self._changed.wait()
+
+
+class SingleFlight:
+    """
+    Gộp các lời gọi đồng thời có cùng khóa thành một lời gọi duy nhất và chia sẻ kết quả
+    (kể cả từng đoạn của kết quả dạng stream).
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self._streams: Dict[Hashable, _Flight] = {}
+        self.leaders = 0
+        self.shared = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Chạy fn() một lần cho mọi lời gọi đồng thời cùng khóa.
+
+        Args:
+            key: Khóa xác định lời gọi (vd: prompt + model).
+            fn: Hàm tạo coroutine thực hiện lời gọi.
+
+        Returns:
+            Kết quả dùng chung của lời gọi.
+        """
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._forget_call(key, task))
+            self.leaders += 1
+        else:
+            self.shared += 1
+        # shield: một người gọi bị hủy (client ngắt kết nối) không làm hủy lời gọi chung
+        return await asyncio.shield(task)
+
+    def _forget_call(self, key: Hashable, task: asyncio.Future):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+
+    async def stream(self, key: Hashable, fn: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        """
+        Đăng ký vào lời gọi stream cùng khóa, khởi chạy mới nếu chưa có.
+
+        Người đăng ký sau nhận lại các đoạn đã phát trước đó rồi tiếp tục nhận đoạn mới.
+        Lời gọi bị hủy khi không còn người đăng ký nào.
+
+        Args:
+            key: Khóa xác định lời gọi.
+            fn: Hàm tạo async iterator thực hiện lời gọi stream.
+
+        Yields:
+            Từng đoạn văn bản.
+        """
+        flight = self._streams.get(key)
+        if flight is None:
+            flight = _Flight()
+            self._streams[key] = flight
+            flight.task = asyncio.ensure_future(self._produce(key, flight, fn))
+            self.leaders += 1
+        else:
+            self.shared += 1
+
+        flight.subscribers += 1
+        index = 0
+        try:
+            while True:
+                if index < len(flight.chunks):
+                    yield flight.chunks[index]
+                    index += 1
+                elif flight.done:
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+                else:
+                    await flight.wait()
+        finally:
+            flight.subscribers -= 1
+            if flight.subscribers == 0 and not flight.done:
+                flight.task.cancel()
+                self._forget_stream(key, flight)
+
+    async def _produce(self, key: Hashable, flight: _Flight, fn: Callable[[], AsyncIterator[str]]):
+        try:
+            async for chunk in fn():
+                flight.chunks.append(chunk)
+                flight.notify()
+        except asyncio.CancelledError:
+            flight.error = asyncio.CancelledError()
+        except Exception as e:
+            flight.error = e
+        finally:
+            flight.done = True
+            self._forget_stream(key, flight)
+            flight.notify()
+
+    def _forget_stream(self, key: Hashable, flight: _Flight):
+        if self._streams.get(key) is flight:
+            del self._streams[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """Số liệu hoạt động: số lời gọi thực sự và số lời gọi được gộp"""
+        total = self.leaders + self.shared
+        return {
+            "in_flight": len(self._calls) + len(self._streams),
+            "upstream_calls": self.leaders,
+            "coalesced_calls": self.shared,
+            "coalesce_rate": self.shared / total if total else 0.0,
+        }
@@ -0,0 +1,13 @@
+import unicodedata
+
+
+def normalize_text(text: str) -> str:
+    """Chuẩn hóa văn bản để so khớp: Unicode NFC, chữ thường, gộp khoảng trắng"""
+    return " ".join(unicodedata.normalize("NFC", text).lower().split())
+
+
+def fold_text(text: str) -> str:
+    """Chuẩn hóa và bỏ dấu tiếng Việt, chỉ giữ chữ và số (học viên hay gõ không dấu)"""
+    text = unicodedata.normalize("NFD", normalize_text(text)).replace("đ", "d")
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join("".join(c if c.isalnum() else " " for c in text).split())
@@ -0,0 +1,153 @@
+import asyncio
+import hashlib
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.models import SessionLocal, Token
+from app.utils.auth_cache import auth_cache
+from app.utils.metrics import register_metrics
+
+
+def hash_token(token: str) -> str:
+    """Mã băm SHA-256 (hex, 64 ký tự) của access token, dùng làm khóa lưu trong CSDL và cache"""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class TokenDenylist:
+    """
+    Danh sách token đã bị thu hồi nhưng chưa hết hạn, giữ trong bộ nhớ.
+
+    Token thu hồi trên worker hiện tại được thêm ngay; token thu hồi ở worker khác được
+    đồng bộ định kỳ từ CSDL (theo cột revoked_at). Token hết hạn tự bị loại khỏi danh sách.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, datetime] = {}  # token_hash -> expires_at
+        self._lock = threading.Lock()
+        self._synced_until: Optional[datetime] = None
+        self.syncs = 0
+        self.rejections = 0
+
+    def add(self, token_hash: str, expires_at: datetime):
+        with self._lock:
+            self._entries[token_hash] = expires_at
+
+    def contains(self, token_hash: str) -> bool:
+        expires_at = self._entries.get(token_hash)
+        if expires_at is None:
+            return False
+        if expires_at <= datetime.utcnow():
+            with self._lock:
+                self._entries.pop(token_hash, None)
+            return False
+        self.rejections += 1
+        return True
+
+    async def sync(self, db: AsyncSession):
+        """Nạp các token bị thu hồi kể từ lần đồng bộ trước (lần đầu: mọi token thu hồi chưa hết hạn)"""
+        now = datetime.utcnow()
+        query = select(Token.token_hash, Token.expires_at).where(
+            Token.is_revoked == True,
+            Token.expires_at > now
+        )
+        if self._synced_until is not None:
+            # Đọc chồng lên một khoảng để không bỏ sót transaction commit chậm hoặc lệch đồng hồ giữa các máy
+            query = query.where(Token.revoked_at >= self._synced_until - timedelta(seconds=60))
+        rows = (await db.execute(query)).all()
+
+        with self._lock:
+            new_hashes = [token_hash for token_hash, _ in rows if token_hash not in self._entries]
+            for token_hash, expires_at in rows:
+                self._entries[token_hash] = expires_at
+            for token_hash in [h for h, expires_at in self._entries.items() if expires_at <= now]:
+                del self._entries[token_hash]
+            self._synced_until = now
+            self.syncs += 1
+        for token_hash in new_hashes:
+            auth_cache.invalidate_token(token_hash)
+
+    def stats(self) -> Dict[str, Any]:
+        """Số liệu hoạt động của danh sách thu hồi"""
+        return {"size": len(self._entries), "syncs": self.syncs, "rejections": self.rejections}
+
+
+async def reap_expired_tokens(db: AsyncSession, batch_size: int) -> int:
+    """
+    Xóa các token đã hết hạn theo từng lô, mỗi lô một transaction để không khóa bảng lâu.
+
+    Returns:
+        Số token đã xóa.
+    """
+    total = 0
+    while True:
+        expired_ids = select(Token.id).where(Token.expires_at <= datetime.utcnow()).limit(batch_size)
+        deleted = (await db.execute(
+            delete(Token).where(Token.id.in_(expired_ids.scalar_subquery())),
+            execution_options={"synchronize_session": False}
+        )).rowcount
+        await db.commit()
+        total += deleted
+        if deleted < batch_size:
+            return total
+
+
+class TokenMaintenance:
+    """Tác vụ nền: đồng bộ danh sách thu hồi định kỳ và dọn token hết hạn"""
+
+    def __init__(self, sync_interval: float, reap_interval: float, reap_batch_size: int):
+        self.sync_interval = sync_interval
+        self.reap_interval = reap_interval
+        self.reap_batch_size = reap_batch_size
+        self.reaped = 0
+        self.last_reap_at: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def run(self):
+        next_reap = time.monotonic()
+        while True:
+            try:
+                async with SessionLocal() as db:
+                    await token_denylist.sync(db)
+                    if time.monotonic() >= next_reap:
+                        self.reaped += await reap_expired_tokens(db, self.reap_batch_size)
+                        self.last_reap_at = datetime.utcnow()
+                        next_reap = time.monotonic() + self.reap_interval
+            except Exception as e:
+                print(f"Lỗi khi bảo trì token: {e}")
+            await asyncio.sleep(self.sync_interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Số liệu hoạt động của tác vụ dọn token"""
+        return {
+            "reaped": self.reaped,
+            "last_reap_at": self.last_reap_at.isoformat() if self.last_reap_at else None,
+        }
+
+
+token_denylist = TokenDenylist()
+token_maintenance = TokenMaintenance(
+    settings.TOKEN_DENYLIST_SYNC_SECONDS,
+    settings.TOKEN_REAPER_INTERVAL_SECONDS,
+    settings.TOKEN_REAPER_BATCH_SIZE
+)
+register_metrics("token_denylist", token_denylist.stats)
+register_metrics("token_reaper", token_maintenance.stats)
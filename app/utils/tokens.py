@@ -0,0 +1,51 @@
+import math
+from typing import Dict, Any
+
+# Số ký tự trung bình cho một token (ước tính thận trọng cho tiếng Việt có dấu và mã nguồn C)
+CHARS_PER_TOKEN = 3
+
+# Số token phụ cho mỗi dòng lịch sử ("role: " và ký tự xuống dòng)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def count_tokens(text: str) -> int:
+    """
+    Ước tính số token của một đoạn văn bản.
+
+    Args:
+        text: Văn bản cần đếm.
+
+    Returns:
+        Số token ước tính.
+    """
+    return math.ceil(len(text) / CHARS_PER_TOKEN) if text else 0
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """
+    Cắt văn bản để số token ước tính không vượt quá max_tokens.
+
+    Args:
+        text: Văn bản cần cắt.
+        max_tokens: Số token tối đa.
+
+    Returns:
+        Văn bản đã cắt (giữ nguyên nếu đã đủ ngắn).
+    """
+    return text[:max(max_tokens, 0) * CHARS_PER_TOKEN]
+
+
+def message_tokens(message: Dict[str, Any]) -> int:
+    """
+    Số token của một tin nhắn trong lịch sử, dùng giá trị đã tính sẵn khi thêm tin nhắn nếu có.
+
+    Args:
+        message: Tin nhắn dạng {"role", "content", "tokens"?}.
+
+    Returns:
+        Số token ước tính của tin nhắn khi đưa vào prompt.
+    """
+    tokens = message.get("tokens")
+    if tokens is None:
+        tokens = count_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+    return tokens
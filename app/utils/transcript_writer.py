@@ -0,0 +1,166 @@
+import asyncio
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import insert, select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from app.config import settings
+from app.models.models import Qa_Message, Qa_Session, SessionLocal
+from app.utils.metrics import register_metrics
+
+# Câu lệnh INSERT ... ON CONFLICT theo loại CSDL
+_UPSERT_INSERTS = {"postgresql": postgresql_insert, "sqlite": sqlite_insert}
+
+
+class TranscriptWriter:
+    """
+    Ghi lịch sử hỏi đáp vào CSDL theo kiểu write-behind.
+
+    Tin nhắn được đưa vào hàng đợi trong tiến trình (không chờ CSDL khi trả lời), tác vụ nền gom
+    và ghi theo lô khi đủ batch_size tin nhắn hoặc sau flush_interval giây. Khi tắt ứng dụng,
+    hàng đợi được ghi hết trước khi dừng.
+    """
+
+    def __init__(self, max_queue_size: int, batch_size: int, flush_interval: float):
+        """
+        Args:
+            max_queue_size: Số tin nhắn tối đa chờ ghi; khi đầy, tin nhắn mới bị bỏ qua.
+            batch_size: Số tin nhắn tối đa ghi trong một transaction.
+            flush_interval: Thời gian chờ tối đa (giây) trước khi ghi một lô chưa đầy.
+        """
+        self.queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue(maxsize=max_queue_size)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self.enqueued = 0
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+        self.flushes = 0
+        self.flush_seconds_total = 0.0
+        self.flush_seconds_max = 0.0
+
+    def record(self, session_id: str, role: str, content: str, lesson_id: Optional[int] = None):
+        """Đưa một tin nhắn vào hàng đợi ghi (không chặn)"""
+        try:
+            self.queue.put_nowait({
+                "session_id": session_id,
+                "lesson_id": lesson_id,
+                "role": role,
+                "content": content,
+                "created_at": datetime.utcnow(),
+            })
+            self.enqueued += 1
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    async def _next_batch(self) -> List[Dict[str, Any]]:
+        # Gom tin nhắn tới khi đủ lô hoặc hết flush_interval kể từ tin nhắn đầu tiên;
+        # khi đang dừng, lấy ngay các tin nhắn còn lại mà không chờ
+        batch: List[Dict[str, Any]] = []
+        deadline = None
+        while len(batch) < self.batch_size:
+            if self._closing:
+                while len(batch) < self.batch_size and not self.queue.empty():
+                    batch.append(self.queue.get_nowait())
+                break
+            timeout = self.flush_interval if deadline is None else deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                if batch:
+                    break
+                continue
+            if deadline is None:
+                deadline = time.monotonic() + self.flush_interval
+        return batch
+
+    async def flush(self, batch: List[Dict[str, Any]]):
+        """Ghi một lô tin nhắn: tạo/cập nhật các session liên quan và thêm tin nhắn bằng một câu lệnh nhiều dòng"""
+        if not batch:
+            return
+        start = time.perf_counter()
+        sessions: Dict[str, Dict[str, Any]] = {}
+        for item in batch:
+            session = sessions.setdefault(item["session_id"], {
+                "id": item["session_id"], "lesson_id": item["lesson_id"],
+                "created_at": item["created_at"], "updated_at": item["created_at"],
+            })
+            session["updated_at"] = item["created_at"]
+            if item["lesson_id"] is not None:
+                session["lesson_id"] = item["lesson_id"]
+
+        try:
+            async with SessionLocal() as db:
+                upsert = _UPSERT_INSERTS.get(db.get_bind().dialect.name)
+                if upsert is not None:
+                    statement = upsert(Qa_Session).values(list(sessions.values()))
+                    statement = statement.on_conflict_do_update(
+                        index_elements=[Qa_Session.id],
+                        set_={"updated_at": statement.excluded.updated_at}
+                    )
+                    await db.execute(statement)
+                else:
+                    existing = set((await db.scalars(
+                        select(Qa_Session.id).where(Qa_Session.id.in_(list(sessions)))
+                    )).all())
+                    new_sessions = [values for id, values in sessions.items() if id not in existing]
+                    if new_sessions:
+                        await db.execute(insert(Qa_Session), new_sessions)
+                await db.execute(insert(Qa_Message), [
+                    {key: item[key] for key in ("session_id", "role", "content", "created_at")}
+                    for item in batch
+                ])
+                await db.commit()
+            self.written += len(batch)
+        except Exception as e:
+            self.failed += len(batch)
+            print(f"Lỗi khi ghi lịch sử hỏi đáp: {e}")
+        finally:
+            elapsed = time.perf_counter() - start
+            self.flushes += 1
+            self.flush_seconds_total += elapsed
+            self.flush_seconds_max = max(self.flush_seconds_max, elapsed)
+
+    async def run(self):
+        while not (self._closing and self.queue.empty()):
+            await self.flush(await self._next_batch())
+
+    def start(self):
+        if self._task is None:
+            self._closing = False
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        """Dừng tác vụ nền sau khi ghi hết các tin nhắn còn trong hàng đợi"""
+        self._closing = True
+        if self._task is not None:
+            await self._task
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Số liệu hoạt động của hàng đợi ghi"""
+        return {
+            "queue_depth": self.queue.qsize(),
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "written": self.written,
+            "failed": self.failed,
+            "flushes": self.flushes,
+            "avg_flush_ms": self.flush_seconds_total * 1000 / self.flushes if self.flushes else 0.0,
+            "max_flush_ms": self.flush_seconds_max * 1000,
+        }
+
+
+transcript_writer = TranscriptWriter(
+    settings.TRANSCRIPT_QUEUE_MAX_SIZE,
+    settings.TRANSCRIPT_BATCH_SIZE,
+    settings.TRANSCRIPT_FLUSH_INTERVAL_SECONDS
+)
+register_metrics("transcript_writer", transcript_writer.stats)
@@ -0,0 +1,124 @@
+"""
+So sánh thời gian phản hồi và kích thước dữ liệu khi đọc tin nhắn của một cuộc hội thoại dài
+(10.000 tin nhắn): đọc toàn bộ như trước đây và phân trang theo khóa (before/after, limit).
+
+Dùng SQLite trong bộ nhớ; thời gian gồm truy vấn CSDL và tuần tự hóa JSON qua schema của route.
+CSDL có thêm các cuộc hội thoại khác để index (conversation_id, created_at, id) phải lọc thật sự.
+
+Chạy từ thư mục gốc của repo:
+    python -m benchmarks.bench_conversation_messages
+"""
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.controllers.conversation_controller import ConversationController
+from app.models.models import Base, Conversation, Lesson, Message, User
+from app.schemas.message import MessagePage, MessageResponse
+
+MESSAGES = 10_000
+OTHER_CONVERSATIONS = 50
+OTHER_MESSAGES = 200
+CONTENT_CHARS = 600
+PAGE_SIZE = 50
+REPEAT = 5
+
+
+async def setup_db():
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all, tables=[
+            User.__table__, Lesson.__table__, Conversation.__table__, Message.__table__
+        ])
+    session = async_sessionmaker(engine, expire_on_commit=False)()
+    await session.execute(insert(User), [{"id": 1, "username": "bench", "email": "bench@example.com",
+                                          "password_hash": "x"}])
+    await session.execute(insert(Conversation), [
+        {"id": i, "user_id": 1, "title": f"Hội thoại {i}"} for i in range(1, OTHER_CONVERSATIONS + 2)
+    ])
+
+    sentence = "Vòng lặp while chạy cho tới khi điều kiện sai. "
+    content = (sentence * (CONTENT_CHARS // len(sentence) + 1))[:CONTENT_CHARS]
+    start = datetime(2025, 1, 1)
+    rows = [
+        {"conversation_id": 1, "role": "user" if i % 2 == 0 else "assistant", "content": content,
+         "created_at": start + timedelta(seconds=i)}
+        for i in range(MESSAGES)
+    ]
+    rows += [
+        {"conversation_id": c, "role": "user", "content": content, "created_at": start + timedelta(seconds=i)}
+        for c in range(2, OTHER_CONVERSATIONS + 2) for i in range(OTHER_MESSAGES)
+    ]
+    await session.execute(insert(Message), rows)
+    await session.commit()
+    return session
+
+
+async def measure(fn):
+    best, size = float("inf"), 0
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        size = len(await fn())
+        best = min(best, time.perf_counter() - start)
+    return best, size
+
+
+async def main():
+    db = await setup_db()
+    controller = ConversationController(db)
+    ids = (await db.scalars(
+        select(Message.id).where(Message.conversation_id == 1).order_by(Message.created_at, Message.id)
+    )).all()
+    middle_id = ids[len(ids) // 2]
+
+    async def get_all():
+        messages = (await db.scalars(
+            select(Message).where(Message.conversation_id == 1).order_by(Message.created_at)
+        )).all()
+        body = "[" + ",".join(MessageResponse.model_validate(m).model_dump_json() for m in messages) + "]"
+        db.expunge_all()
+        return body
+
+    async def page(**kwargs):
+        messages, prev_cursor, next_cursor = await controller.get_messages(1, limit=PAGE_SIZE, **kwargs)
+        body = MessagePage(messages=messages, prev_cursor=prev_cursor, next_cursor=next_cursor).model_dump_json()
+        db.expunge_all()
+        return body
+
+    async def latest_page():
+        return await page()
+
+    async def middle_page():
+        return await page(before=middle_id)
+
+    async def oldest_page():
+        return await page(after=ids[0])
+
+    async def walk_back():
+        body, cursor = [], None
+        while True:
+            messages, cursor, _ = await controller.get_messages(1, before=cursor, limit=200)
+            body.append(MessagePage(messages=messages, prev_cursor=cursor).model_dump_json())
+            db.expunge_all()
+            if cursor is None:
+                return "".join(body)
+
+    print(f"{MESSAGES} tin nhắn trong một hội thoại, mỗi tin {CONTENT_CHARS} ký tự, tốt nhất trong {REPEAT} lần")
+    print(f"{'cách lấy':<36}{'thời gian (ms)':>16}{'dữ liệu (KB)':>16}")
+    for name, fn in [
+        ("toàn bộ tin nhắn (.all())", get_all),
+        (f"trang mới nhất (limit={PAGE_SIZE})", latest_page),
+        (f"trang giữa (before, limit={PAGE_SIZE})", middle_page),
+        (f"trang cũ nhất (after, limit={PAGE_SIZE})", oldest_page),
+        ("duyệt lùi hết (limit=200)", walk_back),
+    ]:
+        seconds, size = await measure(fn)
+        print(f"{name:<36}{seconds * 1000:>16.1f}{size / 1024:>16.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,88 @@
+"""
+So sánh thời gian phản hồi và kích thước dữ liệu giữa get_all_lessons (toàn bộ nội dung bài học)
+và /api/lessons/list (phân trang theo khóa, chỉ lấy các cột cần thiết) với 10.000 bài học.
+
+Dùng SQLite trong bộ nhớ; thời gian gồm truy vấn CSDL và tuần tự hóa JSON qua schema của route.
+
+Chạy từ thư mục gốc của repo:
+    python -m benchmarks.bench_lesson_list
+"""
+import asyncio
+import time
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.controllers.lesson_controller import LessonController
+from app.models.models import Base, Lesson, LessonSection
+from app.schemas.lesson import LessonListResponse, LessonResponse
+
+LESSONS = 10_000
+CONTENT_CHARS = 8_000
+PAGE_SIZE = 50
+REPEAT = 5
+
+
+async def setup_db():
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all, tables=[Lesson.__table__, LessonSection.__table__])
+    session = async_sessionmaker(engine, expire_on_commit=False)()
+    paragraph = "Vòng lặp for gồm khởi tạo, điều kiện và bước nhảy. "
+    content = (paragraph * (CONTENT_CHARS // len(paragraph) + 1))[:CONTENT_CHARS]
+    await session.execute(insert(Lesson), [
+        {"id": i, "title": f"Bài {i}: Vòng lặp", "content": content} for i in range(1, LESSONS + 1)
+    ])
+    await session.commit()
+    return session
+
+
+async def measure(fn):
+    best, size = float("inf"), 0
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        size = len(await fn())
+        best = min(best, time.perf_counter() - start)
+    return best, size
+
+
+async def main():
+    db = await setup_db()
+    controller = LessonController(db)
+
+    async def get_all():
+        lessons = await controller.get_all_lessons()
+        body = "[" + ",".join(LessonResponse.model_validate(lesson).model_dump_json() for lesson in lessons) + "]"
+        db.expunge_all()
+        return body
+
+    async def list_page(cursor=None):
+        items, next_cursor = await controller.list_lessons(cursor, PAGE_SIZE)
+        return LessonListResponse(items=items, next_cursor=next_cursor).model_dump_json(exclude_unset=True)
+
+    async def list_last_page():
+        return await list_page(LESSONS - PAGE_SIZE)
+
+    async def list_all_pages():
+        body, cursor = [], None
+        while True:
+            items, cursor = await controller.list_lessons(cursor, 200)
+            body.append(LessonListResponse(items=items, next_cursor=cursor).model_dump_json(exclude_unset=True))
+            if cursor is None:
+                return "".join(body)
+
+    print(f"{LESSONS} bài học, mỗi bài {CONTENT_CHARS} ký tự, tốt nhất trong {REPEAT} lần")
+    print(f"{'cách lấy':<36}{'thời gian (ms)':>16}{'dữ liệu (KB)':>16}")
+    for name, fn in [
+        ("get_all_lessons (toàn bộ)", get_all),
+        (f"list trang đầu (limit={PAGE_SIZE})", list_page),
+        (f"list trang cuối (limit={PAGE_SIZE})", list_last_page),
+        ("list duyệt hết (limit=200)", list_all_pages),
+    ]:
+        seconds, size = await measure(fn)
+        print(f"{name:<36}{seconds * 1000:>16.1f}{size / 1024:>16.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,76 @@
+"""
+So sánh kích thước prompt và thời gian dựng prompt mỗi lượt giữa việc đưa toàn bộ bài học
+vào TheoryPrompt và chỉ đưa các phần được BM25 chọn.
+
+Chạy từ thư mục gốc của repo:
+    python -m benchmarks.bench_lesson_retrieval
+"""
+import timeit
+
+from app.config import settings
+from app.prompt.theory_prompt import TheoryPrompt
+from app.utils.lesson_retrieval import BM25Index, select_context, split_sections
+from app.utils.tokens import count_tokens
+
+TOPICS = [
+    ("Hàm printf", "printf dùng để in dữ liệu ra màn hình với chuỗi định dạng %d %f %s."),
+    ("Hàm scanf", "scanf dùng để đọc dữ liệu nhập từ bàn phím vào biến thông qua địa chỉ &x."),
+    ("Kiểu dữ liệu", "int, float, double, char là các kiểu dữ liệu cơ bản, sizeof cho biết kích thước."),
+    ("Toán tử", "Toán tử số học + - * / %, toán tử so sánh == != < >, toán tử logic && || !."),
+    ("Câu lệnh if", "if else dùng để rẽ nhánh chương trình theo điều kiện đúng hoặc sai."),
+    ("Câu lệnh switch", "switch case chọn nhánh theo giá trị của biểu thức, cần break sau mỗi case."),
+    ("Vòng lặp for", "for gồm khởi tạo, điều kiện và bước nhảy, dùng khi biết trước số lần lặp."),
+    ("Vòng lặp while", "while lặp khi điều kiện còn đúng, do while chạy thân vòng lặp ít nhất một lần."),
+    ("Mảng", "Mảng lưu nhiều phần tử cùng kiểu liên tiếp trong bộ nhớ, truy cập qua chỉ số a[i]."),
+    ("Chuỗi", "Chuỗi là mảng ký tự kết thúc bằng '\\0', dùng strlen, strcpy, strcmp trong string.h."),
+]
+
+
+def make_lesson(paragraphs_per_topic: int) -> str:
+    parts = []
+    for title, sentence in TOPICS:
+        parts.append(f"# {title}")
+        for i in range(paragraphs_per_topic):
+            parts.append(f"{sentence} Ví dụ {i}: đoạn giải thích chi tiết về {title.lower()} trong ngôn ngữ C.\n")
+    return "\n".join(parts)
+
+
+HISTORY = [
+    {"role": "Assistant", "content": "💻 Chào mừng bạn đến với AI Gia sư! 🚀"},
+    {"role": "user", "content": "printf dùng để làm gì?"},
+    {"role": "Assistant", "content": "printf dùng để in dữ liệu ra màn hình."},
+    {"role": "user", "content": "Vậy %f trong printf in ra kiểu gì?"},
+]
+
+
+def bench(fn) -> float:
+    """Thời gian trung bình mỗi lần gọi (micro giây)"""
+    number = 200
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e6
+
+
+def main():
+    query = "\n".join(entry["content"] for entry in HISTORY if entry["role"] == "user")
+    print(f"{'lesson tokens':>13} {'sections':>8} {'full prompt':>11} {'bm25 prompt':>11} "
+          f"{'full (us)':>9} {'bm25 (us)':>9} {'index (ms)':>10}")
+    for paragraphs in (2, 10, 50):
+        lesson = make_lesson(paragraphs)
+        start = timeit.default_timer()
+        sections = split_sections(lesson, settings.LESSON_SECTION_MAX_CHARS)
+        index = BM25Index(sections)
+        index_ms = (timeit.default_timer() - start) * 1000
+
+        def full():
+            return TheoryPrompt(context=lesson, history=HISTORY).format()
+
+        def retrieved():
+            context = select_context(sections, index, query,
+                                     settings.LESSON_CONTEXT_TOP_K, settings.LESSON_CONTEXT_MAX_TOKENS)
+            return TheoryPrompt(context=context, history=HISTORY).format()
+
+        print(f"{count_tokens(lesson):>13} {len(sections):>8} {count_tokens(full()):>11} "
+              f"{count_tokens(retrieved()):>11} {bench(full):>9.1f} {bench(retrieved):>9.1f} {index_ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
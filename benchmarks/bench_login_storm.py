@@ -0,0 +1,71 @@
+"""
+Đo ảnh hưởng của một đợt đăng nhập dồn dập tới độ trễ stream phản hồi của gia sư trên cùng worker.
+
+Một tác vụ giả lập stream phản hồi gửi một token mỗi 20ms và ghi lại độ trễ thực tế giữa các token,
+trong khi nhiều yêu cầu đăng nhập kiểm tra mật khẩu bcrypt cùng lúc:
+- "đồng bộ": gọi verify_password trực tiếp trong coroutine (như trước đây)
+- "threadpool": gọi verify_password_async (threadpool bcrypt có giới hạn)
+
+Chạy từ thư mục gốc của repo:
+    python -m benchmarks.bench_login_storm
+"""
+import asyncio
+import statistics
+import time
+
+from app.utils.auth import get_password_hash, verify_password, verify_password_async
+
+LOGINS = 40
+CONCURRENCY = 20
+TOKEN_INTERVAL = 0.02
+
+
+async def tutor_stream(stop: asyncio.Event, gaps: list):
+    last = time.perf_counter()
+    while not stop.is_set():
+        await asyncio.sleep(TOKEN_INTERVAL)
+        now = time.perf_counter()
+        gaps.append(now - last)
+        last = now
+
+
+async def login_storm(verify, hashed: str):
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def login():
+        async with semaphore:
+            result = verify("secret123", hashed)
+            if asyncio.iscoroutine(result):
+                result = await result
+            assert result
+
+    await asyncio.gather(*(login() for _ in range(LOGINS)))
+
+
+async def run(name: str, verify, hashed: str):
+    stop = asyncio.Event()
+    gaps: list = []
+    stream = asyncio.create_task(tutor_stream(stop, gaps))
+    await asyncio.sleep(0.1)
+
+    start = time.perf_counter()
+    await login_storm(verify, hashed)
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await stream
+    gaps_ms = sorted(gap * 1000 for gap in gaps)
+    p99 = gaps_ms[int(len(gaps_ms) * 0.99) - 1] if len(gaps_ms) > 1 else gaps_ms[-1]
+    print(f"{name:<12}{LOGINS / elapsed:>14.1f}{statistics.median(gaps_ms):>14.1f}{p99:>14.1f}{gaps_ms[-1]:>14.1f}")
+
+
+async def main():
+    hashed = get_password_hash("secret123")
+    print(f"{LOGINS} lần đăng nhập, tối đa {CONCURRENCY} đồng thời; khoảng cách token mong đợi {TOKEN_INTERVAL * 1000:.0f}ms")
+    print(f"{'cách chạy':<12}{'đăng nhập/s':>14}{'token p50 ms':>14}{'token p99 ms':>14}{'token max ms':>14}")
+    await run("đồng bộ", verify_password, hashed)
+    await run("threadpool", verify_password_async, hashed)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,66 @@
+"""
+Đo chi phí dựng prompt mỗi lượt cho lịch sử 10/100/1000 tin nhắn.
+
+So sánh cách cũ (join toàn bộ lịch sử + str.format trên cả template) với PromptBuilder
+(template biên dịch sẵn thành các đoạn cố định, ghép bằng một lần join). Với prompt bài học,
+nội dung bài học đổi theo từng lượt (các phần được chọn theo câu hỏi) nên mỗi lần gọi dùng
+một context khác nhau.
+
+Chạy từ thư mục gốc của repo:
+    python -m benchmarks.bench_prompt_builder
+"""
+import itertools
+import timeit
+
+from app.prompt.theory_prompt import TheoryPrompt
+from app.prompt.tutor_prompt import AITutorPrompt
+
+SIZES = (10, 100, 1000)
+LESSON = "Hàm printf dùng để in dữ liệu ra màn hình. " * 100
+CONTEXTS = [f"{LESSON}\nPhần {i}: định dạng %d và %f." for i in range(1000)]
+
+
+def make_history(n: int):
+    return [
+        {"role": "user" if i % 2 else "Assistant",
+         "content": f"Tin nhắn số {i}: printf(\"%d\", x); dùng để in giá trị của biến x ra màn hình."}
+        for i in range(n)
+    ]
+
+
+def old_tutor_format(history) -> str:
+    formatted_history = "\n".join([f"{entry['role']}: {entry['content']}" for entry in history])
+    return AITutorPrompt.template.format(history=formatted_history)
+
+
+def old_theory_format(context: str, history) -> str:
+    formatted_history = "\n".join([f"{entry['role']}: {entry['content']}" for entry in history])
+    return TheoryPrompt.template.format(context=context, history=formatted_history)
+
+
+def bench(fn, number: int) -> float:
+    """Thời gian trung bình mỗi lần gọi (micro giây)"""
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e6
+
+
+def main():
+    print(f"{'prompt':<8} {'messages':>8} {'old (us)':>10} {'builder (us)':>13} {'speedup':>8}")
+    for n in SIZES:
+        history = make_history(n)
+        number = max(10, 20000 // n)
+        contexts = itertools.cycle(CONTEXTS)
+        assert old_theory_format(CONTEXTS[0], history) == TheoryPrompt(CONTEXTS[0], history).format()
+        assert old_tutor_format(history) == AITutorPrompt(history=history).format()
+        cases = (
+            ("tutor", lambda: old_tutor_format(history), lambda: AITutorPrompt(history=history).format()),
+            ("theory", lambda: old_theory_format(next(contexts), history),
+             lambda: TheoryPrompt(next(contexts), history).format()),
+        )
+        for name, old, new in cases:
+            old_us = bench(old, number)
+            new_us = bench(new, number)
+            print(f"{name:<8} {n:>8} {old_us:>10.1f} {new_us:>13.1f} {old_us / new_us:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
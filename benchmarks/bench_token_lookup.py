@@ -0,0 +1,84 @@
+"""
+Đo thời gian tra cứu token khi xác thực theo kích thước bảng tokens:
+- "JWT gốc": lọc theo cột Text chứa toàn bộ JWT, không có chỉ mục (cách lưu trước đây)
+- "token_hash": lọc theo mã băm SHA-256 có chỉ mục unique (cách lưu hiện tại)
+
+Dùng SQLite trong bộ nhớ.
+
+Chạy từ thư mục gốc của repo:
+    python -m benchmarks.bench_token_lookup
+"""
+import asyncio
+import secrets
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, Table, Text, insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.models.models import Token, User
+from app.utils.token_store import hash_token, reap_expired_tokens
+
+SIZES = [10_000, 100_000, 500_000]
+LOOKUPS = 200
+
+legacy_metadata = MetaData()
+legacy_tokens = Table(
+    "legacy_tokens", legacy_metadata,
+    Column("id", Integer, primary_key=True),
+    Column("access_token", Text, nullable=False),
+    Column("expires_at", DateTime, nullable=False),
+)
+
+
+def fake_jwt() -> str:
+    return f"eyJhbGciOiJIUzI1NiJ9.{secrets.token_urlsafe(96)}.{secrets.token_urlsafe(32)}"
+
+
+async def time_lookups(session, statement_for, tokens) -> float:
+    start = time.perf_counter()
+    for token in tokens:
+        assert (await session.execute(statement_for(token))).first() is not None
+    return (time.perf_counter() - start) * 1000 / len(tokens)
+
+
+async def main():
+    print(f"{'số token':>10}{'JWT gốc (ms)':>16}{'token_hash (ms)':>18}")
+    for size in SIZES:
+        engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        async with engine.begin() as conn:
+            await conn.run_sync(User.__table__.create)
+            await conn.run_sync(Token.__table__.create)
+            await conn.run_sync(legacy_metadata.create_all)
+        session = async_sessionmaker(engine)()
+
+        await session.execute(insert(User), [{"id": 1, "username": "u", "email": "u@x.vn", "password_hash": "x"}])
+        now = datetime.utcnow()
+        tokens = [fake_jwt() for _ in range(size)]
+        expires = [now + timedelta(minutes=i % 2000 - 1000) for i in range(size)]
+        await session.execute(insert(legacy_tokens), [
+            {"access_token": token, "expires_at": expires_at} for token, expires_at in zip(tokens, expires)
+        ])
+        await session.execute(insert(Token), [
+            {"token_hash": hash_token(token), "expires_at": expires_at, "user_id": 1, "is_revoked": False}
+            for token, expires_at in zip(tokens, expires)
+        ])
+        await session.commit()
+
+        sample = [tokens[i] for i in range(size - 1, 0, -(size // LOOKUPS))][:LOOKUPS]
+        legacy_ms = await time_lookups(
+            session, lambda t: select(legacy_tokens.c.id).where(legacy_tokens.c.access_token == t), sample
+        )
+        hashed_ms = await time_lookups(
+            session, lambda t: select(Token.id).where(Token.token_hash == hash_token(t)), sample
+        )
+        print(f"{size:>10}{legacy_ms:>16.3f}{hashed_ms:>18.3f}")
+
+        start = time.perf_counter()
+        reaped = await reap_expired_tokens(session, 1000)
+        print(f"{'':>10}dọn {reaped} token hết hạn theo lô 1000: {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,414 @@
+"""
+Kiểm thử tải end-to-end cho các route của gia sư: đăng nhập, hỏi đáp /guide/{session_id},
+lấy lịch sử /guide/{session_id}/history và các route bài học, với nhiều session đồng thời.
+
+Mặc định script tự khởi động server LLM giả lập (benchmarks.mock_llm) và ứng dụng (uvicorn main:app)
+với CSDL SQLite tạm, tạo người dùng và bài học mẫu, rồi chạy tải trong --duration giây.
+Dùng --app-url để chạy tải lên một ứng dụng đang chạy sẵn (ứng dụng đó tự trỏ tới LLM giả lập);
+khi đó phải thêm --seed-data để xác nhận việc tạo dữ liệu mẫu (bài học đã có không bị ghi đè).
+Chạy nhiều worker (--workers > 1) cần --session-store redis, vì session "memory" không dùng chung
+giữa các worker.
+
+Kết quả theo từng route: số request, throughput, p50/p95/p99 và tỉ lệ lỗi. Có thể lưu làm baseline
+và so sánh các lần chạy sau; script thoát với mã 1 nếu có route chậm/lỗi hơn baseline quá ngưỡng.
+
+Chạy từ thư mục gốc của repo:
+    python -m benchmarks.load_test --sessions 50 --duration 60 --save-baseline benchmarks/baseline.json
+    python -m benchmarks.load_test --sessions 50 --duration 60 --baseline benchmarks/baseline.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+# Tỉ trọng các hành động của một session sau khi đăng nhập
+DEFAULT_MIX = {
+    "guide_message": 3,
+    "guide_history": 4,
+    "lesson_list": 1,
+    "lesson_get": 1,
+    "lesson_search": 1,
+}
+SEARCH_TERMS = ["vòng lặp", "biến", "hàm", "danh sách", "điều kiện", "đệ quy"]
+QUESTIONS = [
+    "Vòng lặp for khác while thế nào?",
+    "Em chưa hiểu điều kiện dừng, giải thích giúp em?",
+    "Cho em một ví dụ đơn giản",
+    "Tại sao biến i không tăng?",
+    "Làm sao để in ra từng phần tử?",
+]
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Phân vị theo nearest-rank của danh sách đã sắp xếp"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, math.ceil(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class RouteStats:
+    """Độ trễ và lỗi của các request, gom theo route"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.not_modified: Dict[str, int] = defaultdict(int)
+
+    def record(self, route: str, seconds: float, ok: bool, not_modified: bool = False):
+        self.latencies[route].append(seconds)
+        if not ok:
+            self.errors[route] += 1
+        if not_modified:
+            self.not_modified[route] += 1
+
+    def summary(self, duration: float) -> Dict[str, Dict[str, Any]]:
+        result = {}
+        for route in sorted(self.latencies):
+            values = sorted(self.latencies[route])
+            result[route] = {
+                "requests": len(values),
+                "throughput_rps": len(values) / duration if duration else 0.0,
+                "p50_ms": percentile(values, 50) * 1000,
+                "p95_ms": percentile(values, 95) * 1000,
+                "p99_ms": percentile(values, 99) * 1000,
+                "error_rate": self.errors[route] / len(values),
+                "not_modified": self.not_modified[route],
+            }
+        return result
+
+
+async def timed(stats: RouteStats, route: str, request, ok_statuses=(200, 201)):
+    """Gửi một request, ghi độ trễ và trạng thái theo route"""
+    start = time.perf_counter()
+    try:
+        response = await request
+    except httpx.HTTPError:
+        stats.record(route, time.perf_counter() - start, ok=False)
+        return None
+    stats.record(route, time.perf_counter() - start, ok=response.status_code in ok_statuses,
+                 not_modified=response.status_code == 304)
+    return response
+
+
+class VirtualSession:
+    """Một người học: đăng nhập, rồi lần lượt hỏi gia sư, lấy lịch sử và xem bài học"""
+
+    def __init__(self, client: httpx.AsyncClient, stats: RouteStats, credentials: Dict[str, str],
+                 lesson_ids: List[int], mix: Dict[str, int], think_ms: float, rng: random.Random):
+        self.client = client
+        self.stats = stats
+        self.credentials = credentials
+        self.lesson_ids = lesson_ids
+        self.actions = list(mix)
+        self.weights = [mix[action] for action in self.actions]
+        self.think_ms = think_ms
+        self.rng = rng
+        self.session_id = uuid.uuid4().hex
+        self.lesson_id = rng.choice(lesson_ids)
+        self.last_seq: Optional[int] = None
+        self.etag: Optional[str] = None
+        self.headers: Dict[str, str] = {}
+
+    async def login(self):
+        response = await timed(self.stats, "POST /api/auth/login", self.client.post(
+            "/api/auth/login", data=self.credentials
+        ))
+        if response is not None and response.status_code == 200:
+            self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    async def guide_message(self):
+        await timed(self.stats, "POST /guide/{session_id}", self.client.post(
+            f"/guide/{self.session_id}",
+            json={"content": self.rng.choice(QUESTIONS), "lesson_id": self.lesson_id}
+        ))
+        # Client web lấy lịch sử ngay sau mỗi lượt hỏi
+        await self.guide_history()
+
+    async def guide_history(self):
+        params = {"after": self.last_seq} if self.last_seq is not None else {}
+        headers = {"If-None-Match": self.etag} if self.etag else {}
+        response = await timed(self.stats, "GET /guide/{session_id}/history", self.client.get(
+            f"/guide/{self.session_id}/history", params=params, headers=headers
+        ), ok_statuses=(200, 304))
+        if response is not None and response.status_code == 200:
+            self.etag = response.headers.get("ETag")
+            self.last_seq = response.json().get("last_seq", self.last_seq)
+
+    async def lesson_list(self):
+        params = {"limit": 50}
+        if self.rng.random() < 0.5:
+            params["cursor"] = self.rng.choice(self.lesson_ids)
+        await timed(self.stats, "GET /api/lessons/list", self.client.get("/api/lessons/list", params=params))
+
+    async def lesson_get(self):
+        await timed(self.stats, "GET /api/lessons/get_lesson/{id}", self.client.get(
+            f"/api/lessons/get_lesson/{self.rng.choice(self.lesson_ids)}"
+        ))
+
+    async def lesson_search(self):
+        await timed(self.stats, "GET /api/lessons/search_lesson", self.client.get(
+            "/api/lessons/search_lesson", params={"search": self.rng.choice(SEARCH_TERMS), "limit": 10}
+        ))
+
+    async def run(self, deadline: float):
+        await self.login()
+        while time.monotonic() < deadline:
+            action = self.rng.choices(self.actions, self.weights)[0]
+            await getattr(self, action)()
+            if self.think_ms:
+                await asyncio.sleep(self.rng.expovariate(1000 / self.think_ms))
+
+
+async def seed_data(client: httpx.AsyncClient, users: int, lessons: int) -> List[Dict[str, str]]:
+    """
+    Tạo người dùng và bài học mẫu; trả về thông tin đăng nhập.
+
+    Người dùng đã tồn tại được giữ nguyên (đăng ký lỗi được bỏ qua). Bài học được nhập với
+    on_conflict=skip nên bài học đã có id 1..lessons không bị ghi đè.
+    """
+    credentials = []
+    for i in range(users):
+        user = {"username": f"loadtest{i}", "email": f"loadtest{i}@example.com", "password": "loadtest-password"}
+        await client.post("/api/auth/register", json=user)
+        credentials.append({"username": user["username"], "password": user["password"]})
+
+    response = await client.post("/api/auth/login", data=credentials[0])
+    response.raise_for_status()
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    paragraph = "Vòng lặp for và while dùng biến đếm, điều kiện dừng và hàm in danh sách. Đệ quy là hàm tự gọi. "
+    body = "\n".join(
+        json.dumps({"id": i, "title": f"Bài {i}: Vòng lặp và hàm", "content": paragraph * 40}, ensure_ascii=False)
+        for i in range(1, lessons + 1)
+    )
+    response = await client.post("/api/lessons/bulk_import", params={"on_conflict": "skip"},
+                                 content=body.encode("utf-8"), headers={
+        **headers, "Content-Type": "application/x-ndjson"
+    })
+    response.raise_for_status()
+    return credentials
+
+
+class Server:
+    """Một tiến trình server do script khởi động, kèm URL kiểm tra sẵn sàng và file log"""
+
+    def __init__(self, name: str, command: List[str], health_url: str, log_path: str,
+                 env: Optional[Dict[str, str]] = None):
+        self.name = name
+        self.health_url = health_url
+        self.log_path = log_path
+        with open(log_path, "wb") as log:
+            # Ghi log ra file thay vì PIPE để tiến trình con không bị chặn khi bộ đệm pipe đầy
+            self.process = subprocess.Popen(command, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+    def read_log(self, max_chars: int = 4000) -> str:
+        with open(self.log_path, encoding="utf-8", errors="replace") as f:
+            return f.read()[-max_chars:]
+
+
+async def wait_until_up(url: str, server: Optional[Server] = None, timeout: float = 30.0):
+    """
+    Chờ tới khi URL trả về phản hồi HTTP.
+
+    Nếu server là tiến trình do script khởi động và tiến trình đó đã thoát, báo lỗi ngay kèm log
+    của nó thay vì chờ hết timeout.
+    """
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while True:
+            if server is not None and server.process.poll() is not None:
+                raise RuntimeError(
+                    f"{server.name} đã thoát với mã {server.process.returncode}:\n{server.read_log()}"
+                )
+            try:
+                await client.get(url)
+                return
+            except httpx.HTTPError:
+                if time.monotonic() > deadline:
+                    detail = f"\n{server.read_log()}" if server is not None else ""
+                    raise RuntimeError(f"Server {url} không phản hồi sau {timeout} giây{detail}")
+                await asyncio.sleep(0.2)
+
+
+def start_servers(args: argparse.Namespace, workdir: str) -> List[Server]:
+    """Khởi động server LLM giả lập và ứng dụng với CSDL SQLite tạm"""
+    mock = Server("LLM giả lập", [
+        sys.executable, "-m", "benchmarks.mock_llm", "--port", str(args.mock_port),
+        "--ttft-ms", str(args.ttft_ms), "--tokens-per-sec", str(args.tokens_per_sec),
+        "--error-rate", str(args.llm_error_rate), "--tail-rate", str(args.llm_tail_rate),
+        "--tail-ms", str(args.llm_tail_ms), "--seed", str(args.seed),
+    ], f"http://127.0.0.1:{args.mock_port}/stats", os.path.join(workdir, "mock_llm.log"))
+
+    workers = args.workers
+    if workers > 1 and args.session_store != "redis":
+        # Session "memory" nằm trong từng worker: lấy lịch sử ở worker khác sẽ không thấy tin nhắn
+        print(f"SESSION_STORE=memory không dùng chung giữa các worker, chạy 1 worker thay vì {workers} "
+              f"(dùng --session-store redis để chạy nhiều worker)")
+        workers = 1
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'loadtest.db')}",
+        "FPT_API_URL": f"http://127.0.0.1:{args.mock_port}/v1",
+        "OPENAI_API_KEY": "mock",
+        "JWT_SECRET": "loadtest-secret",
+        "SESSION_STORE": args.session_store,
+        # Langfuse không được dùng trong kiểm thử tải, chỉ cần cấu hình hợp lệ
+        "LANGFUSE_HOST": os.environ.get("LANGFUSE_HOST", "http://127.0.0.1:3000"),
+        "LANGFUSE_PUBLIC_KEY": os.environ.get("LANGFUSE_PUBLIC_KEY", "loadtest"),
+        "LANGFUSE_SECRET_KEY": os.environ.get("LANGFUSE_SECRET_KEY", "loadtest"),
+    }
+    app = Server("Ứng dụng", [
+        sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.app_port),
+        "--workers", str(workers), "--log-level", "warning",
+    ], f"http://127.0.0.1:{args.app_port}/", os.path.join(workdir, "app.log"), env=env)
+    return [mock, app]
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]],
+            tolerance: float, error_tolerance: float) -> List[str]:
+    """So sánh với baseline; trả về danh sách route bị chậm/lỗi hơn quá ngưỡng"""
+    regressions = []
+    for route, current in results.items():
+        base = baseline.get(route)
+        if base is None:
+            continue
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            if base[key] and current[key] > base[key] * (1 + tolerance):
+                regressions.append(f"{route}: {key} {base[key]:.1f} -> {current[key]:.1f}")
+        if base["throughput_rps"] and current["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+            regressions.append(
+                f"{route}: throughput {base['throughput_rps']:.1f} -> {current['throughput_rps']:.1f} req/s"
+            )
+        if current["error_rate"] > base["error_rate"] + error_tolerance:
+            regressions.append(f"{route}: error_rate {base['error_rate']:.2%} -> {current['error_rate']:.2%}")
+    return regressions
+
+
+def print_table(results: Dict[str, Dict[str, Any]], baseline: Optional[Dict[str, Dict[str, Any]]] = None):
+    print(f"{'route':<36}{'requests':>10}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'lỗi':>8}")
+    for route, row in results.items():
+        print(f"{route:<36}{row['requests']:>10}{row['throughput_rps']:>9.1f}{row['p50_ms']:>10.1f}"
+              f"{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}{row['error_rate']:>8.1%}")
+        base = (baseline or {}).get(route)
+        if base:
+            print(f"{'  (baseline)':<36}{base['requests']:>10}{base['throughput_rps']:>9.1f}{base['p50_ms']:>10.1f}"
+                  f"{base['p95_ms']:>10.1f}{base['p99_ms']:>10.1f}{base['error_rate']:>8.1%}")
+
+
+async def run_load(args: argparse.Namespace, app_url: str, servers: List[Server]) -> Dict[str, Any]:
+    for server in servers:
+        await wait_until_up(server.health_url, server)
+    if not servers:
+        await wait_until_up(app_url)
+    limits = httpx.Limits(max_connections=args.sessions, max_keepalive_connections=args.sessions)
+    async with httpx.AsyncClient(base_url=app_url, limits=limits, timeout=args.timeout) as client:
+        credentials = await seed_data(client, args.users, args.lessons)
+        lesson_ids = list(range(1, args.lessons + 1))
+        stats = RouteStats()
+        rng = random.Random(args.seed)
+        sessions = [
+            VirtualSession(client, stats, credentials[i % len(credentials)], lesson_ids, DEFAULT_MIX,
+                           args.think_ms, random.Random(rng.random()))
+            for i in range(args.sessions)
+        ]
+        start = time.monotonic()
+        deadline = start + args.duration
+        await asyncio.gather(*(session.run(deadline) for session in sessions))
+        duration = time.monotonic() - start
+
+    return {
+        "config": {
+            "sessions": args.sessions, "duration": args.duration, "think_ms": args.think_ms,
+            "users": args.users, "lessons": args.lessons, "ttft_ms": args.ttft_ms,
+            "tokens_per_sec": args.tokens_per_sec, "seed": args.seed,
+        },
+        "routes": stats.summary(duration),
+    }
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Kiểm thử tải các route của gia sư")
+    parser.add_argument("--app-url", default=None, help="URL ứng dụng đang chạy (bỏ trống để tự khởi động)")
+    parser.add_argument("--seed-data", action="store_true",
+                        help="Cho phép tạo người dùng và bài học mẫu trên ứng dụng --app-url")
+    parser.add_argument("--app-port", type=int, default=8100)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Số worker uvicorn khi tự khởi động ứng dụng (>1 cần --session-store redis)")
+    parser.add_argument("--session-store", choices=("memory", "redis"), default="memory",
+                        help="SESSION_STORE của ứng dụng khi tự khởi động (redis dùng REDIS_HOST/REDIS_PORT)")
+    parser.add_argument("--mock-port", type=int, default=8101)
+    parser.add_argument("--sessions", type=int, default=50, help="Số session đồng thời")
+    parser.add_argument("--duration", type=float, default=60.0, help="Thời gian chạy tải (giây)")
+    parser.add_argument("--think-ms", type=float, default=500.0, help="Thời gian nghỉ trung bình giữa hai hành động")
+    parser.add_argument("--users", type=int, default=20, help="Số tài khoản mẫu")
+    parser.add_argument("--lessons", type=int, default=200, help="Số bài học mẫu")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Timeout mỗi request (giây)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--ttft-ms", type=float, default=300.0, help="TTFT của LLM giả lập")
+    parser.add_argument("--tokens-per-sec", type=float, default=40.0, help="Tốc độ sinh token của LLM giả lập")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--llm-tail-rate", type=float, default=0.0)
+    parser.add_argument("--llm-tail-ms", type=float, default=2000.0)
+    parser.add_argument("--output", default=None, help="Ghi kết quả ra file JSON")
+    parser.add_argument("--save-baseline", default=None, help="Lưu kết quả làm baseline")
+    parser.add_argument("--baseline", default=None, help="File baseline để so sánh")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Ngưỡng chậm hơn baseline cho phép (0.2 = 20%%)")
+    parser.add_argument("--error-tolerance", type=float, default=0.01, help="Mức tăng tỉ lệ lỗi cho phép")
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    if args.app_url is not None and not args.seed_data:
+        # Dữ liệu mẫu (tài khoản, bài học) sẽ được ghi vào CSDL của ứng dụng đang chạy
+        sys.exit("Kiểm thử tải với --app-url sẽ tạo người dùng và bài học mẫu trên ứng dụng đó; "
+                 "thêm --seed-data để xác nhận")
+    servers: List[Server] = []
+    with tempfile.TemporaryDirectory() as workdir:
+        try:
+            if args.app_url is None:
+                servers = start_servers(args, workdir)
+            app_url = args.app_url or f"http://127.0.0.1:{args.app_port}"
+            results = asyncio.run(run_load(args, app_url, servers))
+        finally:
+            for server in servers:
+                server.process.terminate()
+            for server in servers:
+                server.process.wait()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["routes"]
+
+    print(f"{args.sessions} session đồng thời trong {args.duration:.0f} giây")
+    print_table(results["routes"], baseline)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(results, f, ensure_ascii=False, indent=2)
+
+    if baseline is not None:
+        regressions = compare(results["routes"], baseline, args.tolerance, args.error_tolerance)
+        if regressions:
+            print("\nChậm hơn baseline:")
+            for line in regressions:
+                print(f"  - {line}")
+            sys.exit(1)
+        print("\nKhông có route nào chậm hơn baseline quá ngưỡng")
+
+
+if __name__ == "__main__":
+    main()
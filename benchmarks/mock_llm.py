@@ -0,0 +1,189 @@
+"""
+Server LLM giả lập tương thích API /completions của OpenAI (stream và không stream), dùng để đo
+overhead của chính ứng dụng và chạy kiểm thử tải mà không cần gọi OPENAI_API_URL thật.
+
+Có thể cấu hình thời gian tới token đầu (TTFT), tốc độ sinh token, tỉ lệ lỗi và độ trễ đuôi
+(một tỉ lệ request bị chậm thêm một khoảng cố định trước token đầu).
+
+Chạy từ thư mục gốc của repo:
+    python -m benchmarks.mock_llm --port 8001 --ttft-ms 300 --tokens-per-sec 40 --error-rate 0.01
+
+Sau đó trỏ ứng dụng vào server giả lập (OPENAI_API_URL đọc từ biến môi trường FPT_API_URL):
+    FPT_API_URL=http://127.0.0.1:8001/v1 OPENAI_API_KEY=mock uvicorn main:app
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+WORDS = (
+    "Vòng lặp for duyệt qua từng phần tử của danh sách . Biến đếm tăng sau mỗi lần lặp , "
+    "điều kiện dừng được kiểm tra trước khi chạy thân vòng lặp . Hãy thử in ra giá trị "
+    "của biến i để thấy thứ tự thực thi ."
+).split()
+
+
+@dataclass
+class MockLLMConfig:
+    ttft_ms: float = 300.0  # Thời gian tới token đầu
+    tokens_per_sec: float = 40.0  # Tốc độ sinh token sau token đầu (0: trả hết ngay)
+    completion_tokens: int = 120  # Số token trả về (không vượt quá max_tokens của request)
+    error_rate: float = 0.0  # Tỉ lệ request trả lỗi
+    error_status: int = 500
+    tail_rate: float = 0.0  # Tỉ lệ request bị chậm thêm tail_ms trước token đầu
+    tail_ms: float = 2000.0
+    seed: Optional[int] = None
+
+
+class MockLLMStats:
+    """Số liệu request server giả lập đã nhận"""
+
+    def __init__(self):
+        self.requests = 0
+        self.streamed = 0
+        self.errors = 0
+        self.tail_delayed = 0
+        self.tokens = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return dict(self.__dict__)
+
+
+def create_app(config: Optional[MockLLMConfig] = None) -> FastAPI:
+    """
+    Tạo ứng dụng FastAPI của server giả lập.
+
+    Args:
+        config: Cấu hình độ trễ/lỗi; mặc định MockLLMConfig().
+
+    Returns:
+        Ứng dụng có các route /completions, /v1/completions và /stats.
+    """
+    config = config or MockLLMConfig()
+    rng = random.Random(config.seed)
+    stats = MockLLMStats()
+    app = FastAPI(title="Mock LLM")
+
+    def completion_body(model: str, text: str, finish_reason: Optional[str], completion_id: str,
+                        usage: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+        body = {
+            "id": completion_id,
+            "object": "text_completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"text": text, "index": 0, "logprobs": None, "finish_reason": finish_reason}],
+        }
+        if usage is not None:
+            body["usage"] = usage
+        return body
+
+    async def completions(request: Request):
+        payload = await request.json()
+        stats.requests += 1
+        model = payload.get("model", "mock")
+        prompt = payload.get("prompt", "")
+        if isinstance(prompt, list):
+            prompt = "".join(str(part) for part in prompt)
+        max_tokens = payload.get("max_tokens") or 16
+        stream = bool(payload.get("stream"))
+
+        delay = config.ttft_ms / 1000
+        if config.tail_rate and rng.random() < config.tail_rate:
+            stats.tail_delayed += 1
+            delay += config.tail_ms / 1000
+        if config.error_rate and rng.random() < config.error_rate:
+            stats.errors += 1
+            await asyncio.sleep(delay)
+            return JSONResponse(
+                status_code=config.error_status,
+                content={"error": {"message": "Mock LLM injected error", "type": "server_error", "code": None}}
+            )
+
+        count = min(config.completion_tokens, max_tokens)
+        start = rng.randrange(len(WORDS))
+        tokens = [" " + WORDS[(start + i) % len(WORDS)] for i in range(count)]
+        finish_reason = "length" if count == max_tokens else "stop"
+        usage = {
+            "prompt_tokens": max(1, len(prompt) // 4),
+            "completion_tokens": count,
+            "total_tokens": max(1, len(prompt) // 4) + count,
+        }
+        completion_id = f"cmpl-{uuid.uuid4().hex[:24]}"
+        interval = 1 / config.tokens_per_sec if config.tokens_per_sec > 0 else 0.0
+        stats.tokens += count
+
+        if not stream:
+            await asyncio.sleep(delay + interval * max(count - 1, 0))
+            return completion_body(model, "".join(tokens), finish_reason, completion_id, usage)
+
+        stats.streamed += 1
+
+        async def events():
+            await asyncio.sleep(delay)
+            for index, token in enumerate(tokens):
+                if index and interval:
+                    await asyncio.sleep(interval)
+                chunk = completion_body(model, token, None, completion_id)
+                yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+            yield f"data: {json.dumps(completion_body(model, '', finish_reason, completion_id, usage))}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    # AsyncOpenAI ghép base_url với "/completions": hỗ trợ cả base_url có và không có /v1
+    app.add_api_route("/completions", completions, methods=["POST"])
+    app.add_api_route("/v1/completions", completions, methods=["POST"])
+
+    @app.get("/stats")
+    async def get_stats():
+        return stats.as_dict()
+
+    app.state.config = config
+    app.state.stats = stats
+    return app
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Server LLM giả lập tương thích OpenAI /completions")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--ttft-ms", type=float, default=300.0, help="Thời gian tới token đầu (ms)")
+    parser.add_argument("--tokens-per-sec", type=float, default=40.0, help="Tốc độ sinh token (0: trả hết ngay)")
+    parser.add_argument("--completion-tokens", type=int, default=120, help="Số token mỗi phản hồi")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Tỉ lệ request trả lỗi (0-1)")
+    parser.add_argument("--error-status", type=int, default=500, help="Mã HTTP của lỗi giả lập (vd: 500, 429)")
+    parser.add_argument("--tail-rate", type=float, default=0.0, help="Tỉ lệ request bị chậm thêm (0-1)")
+    parser.add_argument("--tail-ms", type=float, default=2000.0, help="Độ trễ thêm cho các request chậm (ms)")
+    parser.add_argument("--seed", type=int, default=None, help="Seed ngẫu nhiên để chạy lặp lại được")
+    return parser.parse_args(argv)
+
+
+def config_from_args(args: argparse.Namespace) -> MockLLMConfig:
+    return MockLLMConfig(
+        ttft_ms=args.ttft_ms,
+        tokens_per_sec=args.tokens_per_sec,
+        completion_tokens=args.completion_tokens,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        tail_rate=args.tail_rate,
+        tail_ms=args.tail_ms,
+        seed=args.seed,
+    )
+
+
+def main():
+    import uvicorn
+
+    args = parse_args()
+    uvicorn.run(create_app(config_from_args(args)), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
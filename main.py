@@ -1,9 +1,13 @@
 import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import conversation, prompt, auth, lesson, chat
-from app.routers import chat_controller, chat_controller_qa
+from app.routers import conversation, auth, lesson
+from app.routers import chat_controller, chat_controller_qa, metrics
 from app.models.models import init_db
+from app.controllers.llm_service import close_llm_client
+from app.utils.auth import password_hasher
+from app.utils.token_store import token_maintenance
+from app.utils.transcript_writer import transcript_writer
 from app.models.chat_model import ChatHistory
 
 
@@ -25,17 +29,29 @@ app.add_middleware(
 
 # Đăng ký routers
 app.include_router(auth.router)
-# app.include_router(chat.router)
-# app.include_router(conversation.router)
+app.include_router(conversation.router)
 
 app.include_router(chat_controller.router)
-app.include_router(chat_controller_theory.router)
+app.include_router(chat_controller_qa.router)
 app.include_router(lesson.router)
+app.include_router(metrics.router)
 
 # Khởi tạo database khi khởi động
 @app.on_event("startup")
 async def startup():
-    init_db()
+    await init_db()
+    token_maintenance.start()
+    transcript_writer.start()
+
+# Đóng connection pool của LLM client khi tắt ứng dụng
+@app.on_event("shutdown")
+async def shutdown():
+    await transcript_writer.stop()  # Ghi nốt lịch sử hỏi đáp còn trong hàng đợi
+    await token_maintenance.stop()
+    await close_llm_client()
+    await chat_controller.chat_session.store.close()
+    await chat_controller_qa.chat_Session.store.close()
+    password_hasher.executor.shutdown(wait=False)
 
 # Root endpoint
 @app.get("/")
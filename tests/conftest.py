@@ -0,0 +1,9 @@
+import os
+import sys
+
+# Cấu hình tối thiểu để import được app.config / app.models khi chạy test (CSDL SQLite trong bộ nhớ)
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+os.environ.setdefault("JWT_SECRET", "test-secret")
+os.environ.setdefault("LANGFUSE_HOST", "http://localhost:3000")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
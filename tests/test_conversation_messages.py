@@ -0,0 +1,113 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.controllers.conversation_controller import ConversationController
+from app.models.models import Base, Conversation, Lesson, Message, User
+
+START = datetime(2025, 1, 1)
+
+
+async def make_controller(timestamps):
+    """Hội thoại 1 có các tin nhắn theo timestamps (theo thứ tự id), hội thoại 2 có tin nhắn xen kẽ"""
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all, tables=[
+            User.__table__, Lesson.__table__, Conversation.__table__, Message.__table__
+        ])
+    db = async_sessionmaker(engine, expire_on_commit=False)()
+    await db.execute(insert(User), [{"id": 1, "username": "u", "email": "u@example.com", "password_hash": "x"}])
+    await db.execute(insert(Conversation), [{"id": 1, "user_id": 1, "title": "a"},
+                                            {"id": 2, "user_id": 1, "title": "b"}])
+    for i, created_at in enumerate(timestamps):
+        await db.execute(insert(Message), [
+            {"conversation_id": 1, "role": "user", "content": f"m{i}", "created_at": created_at},
+            {"conversation_id": 2, "role": "user", "content": f"x{i}", "created_at": created_at},
+        ])
+    await db.commit()
+    return ConversationController(db), engine
+
+
+def run(timestamps, scenario):
+    async def main():
+        controller, engine = await make_controller(timestamps)
+        try:
+            ids = (await controller.db.scalars(
+                select(Message.id).where(Message.conversation_id == 1).order_by(Message.created_at, Message.id)
+            )).all()
+            return await scenario(controller, list(ids))
+        finally:
+            await controller.db.close()
+            await engine.dispose()
+
+    return asyncio.run(main())
+
+
+def contents(messages):
+    return [message.content for message in messages]
+
+
+# Nhiều tin nhắn trùng created_at: thứ tự phụ thuộc vào id
+TIES = [START, START, START + timedelta(seconds=1), START + timedelta(seconds=1), START + timedelta(seconds=1),
+        START + timedelta(seconds=2), START + timedelta(seconds=2)]
+
+
+@pytest.mark.parametrize("timestamps", [
+    [START + timedelta(seconds=i) for i in range(7)],
+    TIES,
+    [START] * 7,
+])
+def test_walk_backward_and_forward_visits_every_message_once(timestamps):
+    async def scenario(controller, ids):
+        backward, cursor = [], None
+        while True:
+            messages, cursor, _ = await controller.get_messages(1, before=cursor, limit=2)
+            backward = contents(messages) + backward
+            if cursor is None:
+                break
+
+        forward, cursor = [], ids[0]
+        first, _, _ = await controller.get_messages(1, before=ids[1], limit=1)
+        forward += contents(first)
+        while cursor is not None:
+            messages, _, cursor = await controller.get_messages(1, after=cursor, limit=2)
+            forward += contents(messages)
+        return backward, forward
+
+    backward, forward = run(timestamps, scenario)
+    expected = [f"m{i}" for i in range(7)]
+    assert backward == expected
+    assert forward == expected
+
+
+def test_latest_page_and_cursors():
+    async def scenario(controller, ids):
+        latest = await controller.get_messages(1, limit=3)
+        older = await controller.get_messages(1, before=latest[1], limit=3)
+        newer = await controller.get_messages(1, after=older[2], limit=3)
+        return ids, latest, older, newer
+
+    ids, latest, older, newer = run(TIES, scenario)
+    messages, prev_cursor, next_cursor = latest
+    assert contents(messages) == ["m4", "m5", "m6"]
+    assert (prev_cursor, next_cursor) == (ids[4], None)
+
+    messages, prev_cursor, next_cursor = older
+    assert contents(messages) == ["m1", "m2", "m3"]
+    assert (prev_cursor, next_cursor) == (ids[1], ids[3])
+
+    messages, prev_cursor, next_cursor = newer
+    assert contents(messages) == ["m4", "m5", "m6"]
+    assert (prev_cursor, next_cursor) == (ids[4], None)
+
+
+def test_cursor_from_other_conversation_returns_empty_page():
+    async def scenario(controller, ids):
+        other_id = await controller.db.scalar(select(Message.id).where(Message.conversation_id == 2))
+        return await controller.get_messages(1, before=other_id), await controller.get_messages(1, after=other_id)
+
+    assert run(TIES, scenario) == (([], None, None), ([], None, None))
@@ -0,0 +1,34 @@
+import asyncio
+from contextlib import AsyncExitStack
+
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.models.db_pool import InstrumentedPool
+
+
+def checkout(count: int, pool_size: int = 2, rounds: int = 1):
+    async def main():
+        engine = create_async_engine("sqlite+aiosqlite://", poolclass=InstrumentedPool,
+                                     pool_size=pool_size, max_overflow=5)
+        try:
+            for _ in range(rounds):
+                async with AsyncExitStack() as stack:
+                    for _ in range(count):
+                        await stack.enter_async_context(engine.connect())
+            return engine.pool.stats()
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(main())
+
+
+def test_in_pool_checkouts_are_not_overflow():
+    stats = checkout(2, pool_size=2, rounds=3)
+    assert stats["checkouts"] == 6
+    assert stats["overflow_events"] == 0
+
+
+def test_checkout_past_pool_size_counts_one_event():
+    stats = checkout(3, pool_size=2)
+    assert stats["checkouts"] == 3
+    assert stats["overflow_events"] == 1
@@ -0,0 +1,96 @@
+import asyncio
+from typing import List
+
+import pytest
+
+from app.utils.json_stream import iter_json_rows
+
+
+def read_rows(data: str, chunk_size: int = 7, **kwargs) -> List[tuple]:
+    raw = data.encode("utf-8")
+
+    async def chunks():
+        for i in range(0, len(raw), chunk_size):
+            yield raw[i:i + chunk_size]
+
+    async def collect():
+        return [row async for row in iter_json_rows(chunks(), **kwargs)]
+
+    return asyncio.run(collect())
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, 1024])
+def test_ndjson_rows(chunk_size):
+    data = '{"title": "Biến"}\n\n{"title": "Con trỏ"}\n'
+    assert read_rows(data, chunk_size) == [(1, {"title": "Biến"}, None), (2, {"title": "Con trỏ"}, None)]
+
+
+def test_ndjson_bad_line_only_fails_that_row():
+    rows = read_rows('{"title": "Biến"}\n{"title": \n{"title": "Mảng"}')
+    assert [(row, data) for row, data, _ in rows] == [(1, {"title": "Biến"}), (2, None), (3, {"title": "Mảng"})]
+    assert rows[1][2].startswith("JSON không hợp lệ")
+    assert rows[0][2] is None and rows[2][2] is None
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, 1024])
+def test_array_rows(chunk_size):
+    data = ' [ {"title": "Biến"}, {"title": "Con trỏ"} ] '
+    assert read_rows(data, chunk_size) == [(1, {"title": "Biến"}, None), (2, {"title": "Con trỏ"}, None)]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1024])
+def test_array_bad_element_resyncs_at_next_element(chunk_size):
+    rows = read_rows('[{"title": "Biến"}, {"title": }, {"title" "x"} , {"title": "Mảng"}]', chunk_size)
+    assert [(row, data) for row, data, _ in rows] == [
+        (1, {"title": "Biến"}), (2, None), (3, None), (4, {"title": "Mảng"})
+    ]
+    assert rows[1][2].startswith("JSON không hợp lệ") and rows[2][2].startswith("JSON không hợp lệ")
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 5])
+def test_array_values_split_across_chunks(chunk_size):
+    data = '[{"a": true, "b": false, "c": null, "d": -1.5e-3, "e": "\\u0111"}]'
+    assert read_rows(data, chunk_size) == [(1, {"a": True, "b": False, "c": None, "d": -1.5e-3, "e": "đ"}, None)]
+
+
+def test_array_syntax_error_is_reported_without_buffering_the_rest():
+    consumed = []
+
+    async def chunks():
+        yield b'[{"title": "a"}, {"title" 1}, '
+        for i in range(1000):
+            consumed.append(i)
+            yield b'{"title": "b"}, '
+        yield b"]"
+
+    async def first_error():
+        async for row, _, error in iter_json_rows(chunks()):
+            if error:
+                return row, len(consumed)
+
+    row, chunks_read = asyncio.run(first_error())
+    assert row == 2
+    assert chunks_read <= 1
+
+
+def test_array_oversized_element_is_rejected():
+    big = "x" * 500
+    rows = read_rows(f'[{{"title": "{big}"}}, {{"title": "ngắn"}}]', chunk_size=16, max_row_chars=100)
+    assert rows == [(1, None, "Bản ghi vượt quá 100 ký tự"), (2, {"title": "ngắn"}, None)]
+
+
+def test_ndjson_oversized_line_is_rejected():
+    big = "x" * 500
+    rows = read_rows(f'{{"title": "{big}"}}\n{{"title": "ngắn"}}\n', chunk_size=16, max_row_chars=100)
+    assert rows == [(1, None, "Bản ghi vượt quá 100 ký tự"), (2, {"title": "ngắn"}, None)]
+
+
+def test_array_missing_closing_bracket():
+    rows = read_rows('[{"title": "Biến"}, {"title": "Mảng"}')
+    assert rows[:2] == [(1, {"title": "Biến"}, None), (2, {"title": "Mảng"}, None)]
+    assert rows[2] == (3, None, "JSON không hợp lệ: thiếu ']' kết thúc mảng")
+
+
+def test_empty_body():
+    assert read_rows("") == []
+    assert read_rows("[]") == []
@@ -0,0 +1,55 @@
+import asyncio
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.controllers.lesson_controller import LessonController
+from app.models.models import Base, Lesson, LessonSection
+
+
+async def rows(records):
+    for row, record in enumerate(records, start=1):
+        yield row, record, None
+
+
+def run_import(records, overwrite):
+    async def main():
+        engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all, tables=[Lesson.__table__, LessonSection.__table__])
+        db = async_sessionmaker(engine, expire_on_commit=False)()
+        try:
+            await db.execute(insert(Lesson), [{"id": 1, "title": "Bài gốc", "content": "Nội dung gốc"}])
+            await db.commit()
+            result = await LessonController(db).import_lessons(rows(records), batch_size=10, overwrite=overwrite)
+            lessons = {lesson.id: lesson.content for lesson in (await db.scalars(select(Lesson))).all()}
+            section_ids = set((await db.scalars(select(LessonSection.lesson_id))).all())
+            return result, lessons, section_ids
+        finally:
+            await db.close()
+            await engine.dispose()
+
+    return asyncio.run(main())
+
+
+RECORDS = [
+    {"id": 1, "title": "Bài mẫu 1", "content": "Nội dung mẫu 1"},
+    {"id": 2, "title": "Bài mẫu 2", "content": "Nội dung mẫu 2"},
+    {"title": "Bài không id", "content": "Nội dung mới"},
+]
+
+
+def test_skip_keeps_existing_lessons():
+    result, lessons, section_ids = run_import(RECORDS, overwrite=False)
+    assert (result["imported"], result["skipped"], result["failed"]) == (2, 1, 0)
+    assert lessons[1] == "Nội dung gốc"
+    assert lessons[2] == "Nội dung mẫu 2"
+    assert "Nội dung mới" in lessons.values()
+    assert 1 not in section_ids and 2 in section_ids
+
+
+def test_update_overwrites_existing_lessons():
+    result, lessons, _ = run_import(RECORDS, overwrite=True)
+    assert (result["imported"], result["skipped"], result["failed"]) == (3, 0, 0)
+    assert lessons[1] == "Nội dung mẫu 1"
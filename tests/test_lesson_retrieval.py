@@ -0,0 +1,50 @@
+from app.utils.lesson_retrieval import BM25Index, select_context, split_sections
+from app.utils.tokens import count_tokens
+
+PARAGRAPH = "Con trỏ lưu địa chỉ của một biến trong bộ nhớ và cho phép truy cập gián tiếp. "
+
+
+def test_single_long_line_is_split():
+    content = PARAGRAPH * 160  # một đoạn văn ~12.6K ký tự trên một dòng
+    sections = split_sections(content, max_chars=1200)
+    assert len(sections) > 1
+    assert all(len(section) <= 1200 for section in sections)
+    assert " ".join(sections).split() == content.split()
+
+
+def test_line_without_spaces_is_split():
+    sections = split_sections("x" * 3000, max_chars=1200)
+    assert [len(section) for section in sections] == [1200, 1200, 600]
+
+
+def test_heading_only_section_is_merged_into_next():
+    content = "# Con trỏ\n\nCon trỏ lưu địa chỉ.\n\n## Mảng\n\nMảng gồm các phần tử liên tiếp."
+    assert split_sections(content) == [
+        "# Con trỏ\nCon trỏ lưu địa chỉ.",
+        "## Mảng\nMảng gồm các phần tử liên tiếp.",
+    ]
+
+
+def test_consecutive_headings_are_merged():
+    content = "# Chương 1\n## Con trỏ\n\nCon trỏ lưu địa chỉ."
+    assert split_sections(content) == ["# Chương 1\n## Con trỏ\nCon trỏ lưu địa chỉ."]
+
+
+def test_first_section_is_truncated_to_max_tokens():
+    sections = [PARAGRAPH * 160, "Mảng gồm các phần tử."]
+    context = select_context(sections, BM25Index(sections), "con trỏ", top_k=4, max_tokens=1500)
+    assert count_tokens(context) <= 1500
+    assert context.startswith("Con trỏ lưu địa chỉ")
+
+
+def test_context_respects_max_tokens_with_many_sections():
+    sections = split_sections("\n\n".join(f"## Phần {i}\n{PARAGRAPH * 10}" for i in range(20)), 1200)
+    for max_tokens in (50, 300, 1000, 1500):
+        context = select_context(sections, BM25Index(sections), "con trỏ địa chỉ", top_k=4, max_tokens=max_tokens)
+        assert 0 < count_tokens(context) <= max_tokens
+
+
+def test_sections_keep_lesson_order():
+    sections = ["Biến lưu giá trị.", "Con trỏ lưu địa chỉ.", "Mảng và con trỏ liên quan chặt chẽ."]
+    context = select_context(sections, BM25Index(sections), "con trỏ", top_k=2, max_tokens=1500)
+    assert context == "Con trỏ lưu địa chỉ.\n\nMảng và con trỏ liên quan chặt chẽ."
@@ -0,0 +1,13 @@
+from app.utils.lesson_search import make_snippet
+
+
+def test_snippet_marks_matching_words():
+    assert make_snippet("Vòng lặp for dùng biến đếm", {"lap"}) == "Vòng <mark>lặp</mark> for dùng biến đếm"
+
+
+def test_snippet_escapes_lesson_html():
+    content = 'Dùng <script>alert("x")</script> & <b>vòng lặp</b> trong C'
+    snippet = make_snippet(content, {"lap"})
+    assert "<script>" not in snippet and "<b>" not in snippet
+    assert snippet == ("Dùng &lt;script&gt;alert(&quot;x&quot;)&lt;/script&gt; &amp; &lt;b&gt;vòng "
+                       "<mark>lặp</mark>&lt;/b&gt; trong C")
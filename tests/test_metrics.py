@@ -0,0 +1,11 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routers.metrics import router
+
+
+def test_metrics_require_authentication():
+    app = FastAPI()
+    app.include_router(router)
+    response = TestClient(app).get("/api/metrics")
+    assert response.status_code == 401
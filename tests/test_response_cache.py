@@ -0,0 +1,42 @@
+from app.utils.lesson_cache import LessonCache
+from app.utils.response_cache import ResponseCache
+
+HISTORY = [{"role": "user", "content": "Con trỏ là gì?"}]
+
+
+def make_cache() -> ResponseCache:
+    return ResponseCache(max_entries=100, ttl_seconds=None, max_user_turns=1)
+
+
+def test_key_changes_with_lesson_revision():
+    cache = make_cache()
+    old = cache.make_key("theory", 1, HISTORY, "model", 256, "2025-01-01T00:00:00")
+    new = cache.make_key("theory", 1, HISTORY, "model", 256, "2025-01-02T00:00:00")
+    assert old != new
+    cache.set(old, "phản hồi theo nội dung cũ", 1)
+    assert cache.get(new) is None
+
+
+def test_invalidate_lesson_drops_only_that_lesson():
+    cache = make_cache()
+    key_1 = cache.make_key("theory", 1, HISTORY, "model", 256)
+    key_2 = cache.make_key("theory", 2, HISTORY, "model", 256)
+    cache.set(key_1, "bài 1", 1)
+    cache.set(key_2, "bài 2", 2)
+
+    cache.invalidate_lesson(1)
+    assert cache.get(key_1) is None
+    assert cache.get(key_2) == "bài 2"
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_lesson_cache_invalidation_notifies_listeners():
+    lessons = LessonCache(max_entries=10, ttl_seconds=None)
+    cache = make_cache()
+    key = cache.make_key("theory", 7, HISTORY, "model", 256)
+    cache.set(key, "phản hồi", 7)
+    lessons.add_invalidation_listener(cache.invalidate_lesson)
+
+    lessons.invalidate(7)
+    assert cache.get(key) is None
+    assert lessons.version(7) == 1
@@ -0,0 +1,90 @@
+import pytest
+
+from app.utils.semantic_cache import SemanticCache, code_tokens, negation_tokens
+
+
+def make_cache(**kwargs) -> SemanticCache:
+    options = dict(threshold=0.85, max_entries_per_lesson=16, max_lessons=4)
+    options.update(kwargs)
+    return SemanticCache(**options)
+
+
+def test_similar_questions_hit():
+    cache = make_cache()
+    cache.add(1, "Vòng lặp for là gì?", "for lặp theo biến đếm")
+    assert cache.lookup(1, "vong lap for la gi") == "for lặp theo biến đếm"
+    assert cache.lookup(2, "vong lap for la gi") is None
+
+
+@pytest.mark.parametrize("cached, asked", [
+    ("5/2 bằng bao nhiêu", "5%2 bằng bao nhiêu"),
+    ("i++ và ++i khác gì nhau", "i-- và --i khác gì nhau"),
+    ("== và = khác gì nhau", "!= và = khác gì nhau"),
+    ("%d nghĩa là gì", "%f nghĩa là gì"),
+    ("a && b trả về gì", "a || b trả về gì"),
+    ("x << 1 là gì", "x >> 1 là gì"),
+])
+def test_questions_differing_only_in_code_symbols_miss(cached, asked):
+    cache = make_cache()
+    cache.add(1, cached, "phản hồi cho câu đã cache")
+    assert cache.lookup(1, asked) is None
+    assert cache.lookup(1, cached) == "phản hồi cho câu đã cache"
+
+
+def test_code_tokens():
+    assert code_tokens("5/2 bằng bao nhiêu?") == ("/",)
+    assert code_tokens("%d và %.2f") == ("%d", "%.2f")
+    assert code_tokens("i++ và ++i") == ("++", "++")
+    assert code_tokens("Giúp em với!") == ()
+
+
+@pytest.mark.parametrize("asked", [
+    "Vòng lặp while không chạy khi điều kiện sai",
+    "vong lap while khong chay khi dieu kien sai",
+    "Vòng lặp while chưa chạy khi điều kiện sai",
+    "vong lap while ko chay khi dieu kien sai",
+])
+def test_negated_questions_miss(asked):
+    cache = make_cache()
+    cache.add(1, "Vòng lặp while có chạy khi điều kiện sai", "có")
+    assert cache.lookup(1, asked) is None
+    assert cache.lookup(1, "vong lap while co chay khi dieu kien sai") == "có"
+
+
+def test_negation_tokens():
+    assert negation_tokens("Biến không được khởi tạo thì sao") == ("khong",)
+    assert negation_tokens("bien ko duoc khoi tao thi sao") == ("khong",)
+    assert negation_tokens("Tại sao chưa in ra?") == ("chua",)
+    # "dung" không dấu có thể là "dùng", chỉ "đừng" có dấu mới là phủ định
+    assert negation_tokens("Khi nào dùng con trỏ") == ()
+    assert negation_tokens("khi nao dung con tro") == ()
+
+
+def test_entries_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("app.utils.semantic_cache.time.monotonic", lambda: now[0])
+    cache = make_cache(ttl_seconds=60)
+    cache.add(1, "Hàm printf dùng để làm gì", "in ra màn hình")
+    assert cache.lookup(1, "Hàm printf dùng để làm gì") == "in ra màn hình"
+
+    now[0] += 61
+    assert cache.lookup(1, "Hàm printf dùng để làm gì") is None
+    assert cache.stats()["entries"] == 0
+    assert cache.stats()["expirations"] == 1
+
+
+def test_invalidate_lesson():
+    cache = make_cache()
+    cache.add(1, "Hàm printf dùng để làm gì", "in ra màn hình")
+    cache.add(2, "Hàm printf dùng để làm gì", "bài khác")
+    cache.invalidate_lesson(1)
+    assert cache.lookup(1, "Hàm printf dùng để làm gì") is None
+    assert cache.lookup(2, "Hàm printf dùng để làm gì") == "bài khác"
+
+
+def test_entries_from_older_lesson_revision_are_dropped():
+    cache = make_cache()
+    cache.add(1, "Hàm printf dùng để làm gì", "theo nội dung cũ", "2025-01-01T00:00:00")
+    assert cache.lookup(1, "Hàm printf dùng để làm gì", "2025-01-01T00:00:00") == "theo nội dung cũ"
+    assert cache.lookup(1, "Hàm printf dùng để làm gì", "2025-01-02T00:00:00") is None
+    assert cache.stats()["lessons"] == 0
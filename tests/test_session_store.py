@@ -0,0 +1,132 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("redis")
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("pydantic_settings")
+
+from fakeredis import aioredis  # noqa: E402
+
+from app.models.session_store import InMemorySessionStore, RedisSessionStore  # noqa: E402
+
+
+def make_redis_store(**kwargs) -> RedisSessionStore:
+    client = aioredis.FakeRedis(server=fakeredis.FakeServer(), decode_responses=True)
+    return RedisSessionStore(client=client, namespace="test", **kwargs)
+
+
+def message(i: int):
+    return {"role": "user", "content": f"câu hỏi {i}"}
+
+
+@pytest.mark.parametrize("make_store", [
+    lambda: InMemorySessionStore(max_messages=100),
+    lambda: make_redis_store(ttl_seconds=60, max_messages=100),
+], ids=["memory", "redis"])
+def test_append_assigns_increasing_seq(make_store):
+    async def scenario():
+        store = make_store()
+        assert not await store.exists("s")
+        for i in range(3):
+            await store.append_message("s", message(i))
+        return await store.exists("s"), await store.get_messages("s"), await store.last_seq("s")
+
+    exists, messages, last_seq = asyncio.run(scenario())
+    assert exists
+    assert [m["content"] for m in messages] == ["câu hỏi 0", "câu hỏi 1", "câu hỏi 2"]
+    assert [m["seq"] for m in messages] == [1, 2, 3]
+    assert last_seq == 3
+
+
+@pytest.mark.parametrize("make_store", [
+    lambda: InMemorySessionStore(max_messages=3),
+    lambda: make_redis_store(ttl_seconds=60, max_messages=3),
+], ids=["memory", "redis"])
+def test_trim_keeps_latest_messages_and_their_seq(make_store):
+    async def scenario():
+        store = make_store()
+        for i in range(5):
+            await store.append_message("s", message(i))
+        return (await store.get_messages("s"), await store.get_messages("s", last_n=2),
+                await store.get_messages_after("s", 3), await store.get_messages_after("s", 5))
+
+    messages, last_two, after_three, after_last = asyncio.run(scenario())
+    assert [m["seq"] for m in messages] == [3, 4, 5]
+    assert [m["content"] for m in messages] == ["câu hỏi 2", "câu hỏi 3", "câu hỏi 4"]
+    assert [m["seq"] for m in last_two] == [4, 5]
+    assert [m["seq"] for m in after_three] == [4, 5]
+    assert after_last == []
+
+
+@pytest.mark.parametrize("make_store", [
+    lambda: InMemorySessionStore(),
+    lambda: make_redis_store(ttl_seconds=60),
+], ids=["memory", "redis"])
+def test_seq_is_not_reused_after_delete(make_store):
+    async def scenario():
+        store = make_store()
+        await store.append_message("s", message(0))
+        await store.append_message("s", message(1))
+        await store.delete("s")
+        deleted = await store.get_messages("s")
+        await store.append_message("s", message(2))
+        return deleted, await store.get_messages("s")
+
+    deleted, messages = asyncio.run(scenario())
+    assert deleted == []
+    assert [m["seq"] for m in messages] == [3]
+
+
+@pytest.mark.parametrize("make_store", [
+    lambda: InMemorySessionStore(),
+    lambda: make_redis_store(ttl_seconds=60),
+], ids=["memory", "redis"])
+def test_after_beyond_last_seq_returns_full_history(make_store):
+    async def scenario():
+        store = make_store()
+        await store.append_message("s", message(0))
+        return await store.get_messages_after("s", 99)
+
+    assert [m["content"] for m in asyncio.run(scenario())] == ["câu hỏi 0"]
+
+
+def test_redis_ttl_applies_to_history_and_seq_counter():
+    async def scenario():
+        store = make_redis_store(ttl_seconds=120)
+        await store.append_message("s", message(0))
+        return await store.client.ttl(store._key("s")), await store.client.ttl(store._seq_key("s"))
+
+    history_ttl, seq_ttl = asyncio.run(scenario())
+    assert 0 < history_ttl <= 120
+    assert 0 < seq_ttl <= 120
+
+
+def test_redis_without_ttl_keeps_keys():
+    async def scenario():
+        store = make_redis_store(ttl_seconds=None)
+        await store.append_message("s", message(0))
+        return await store.client.ttl(store._key("s"))
+
+    assert asyncio.run(scenario()) == -1
+
+
+def test_redis_concurrent_appends_get_contiguous_seq_in_list_order():
+    async def scenario():
+        store = make_redis_store(ttl_seconds=60, max_messages=100)
+        await asyncio.gather(*(store.append_message("s", message(i)) for i in range(20)))
+        return await store.get_messages("s")
+
+    messages = asyncio.run(scenario())
+    assert [m["seq"] for m in messages] == list(range(1, 21))
+    assert sorted(m["content"] for m in messages) == sorted(f"câu hỏi {i}" for i in range(20))
+
+
+def test_redis_message_json_does_not_store_seq():
+    async def scenario():
+        store = make_redis_store(ttl_seconds=60)
+        await store.append_message("s", message(0))
+        return await store.client.lrange(store._key("s"), 0, -1)
+
+    (raw,) = asyncio.run(scenario())
+    assert '"seq"' not in raw
@@ -0,0 +1,157 @@
+import asyncio
+
+from app.utils.single_flight import SingleFlight
+
+
+def test_do_runs_once_for_concurrent_callers():
+    async def scenario():
+        flight = SingleFlight()
+        calls = 0
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "kết quả"
+
+        results = await asyncio.gather(*(flight.do("k", fetch) for _ in range(5)))
+        return calls, results, flight.stats()
+
+    calls, results, stats = asyncio.run(scenario())
+    assert calls == 1
+    assert results == ["kết quả"] * 5
+    assert stats["upstream_calls"] == 1
+    assert stats["coalesced_calls"] == 4
+    assert stats["in_flight"] == 0
+
+
+def test_do_cancelled_caller_does_not_cancel_shared_call():
+    async def scenario():
+        flight = SingleFlight()
+
+        async def fetch():
+            await asyncio.sleep(0.02)
+            return 42
+
+        first = asyncio.ensure_future(flight.do("k", fetch))
+        second = asyncio.ensure_future(flight.do("k", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second, first.cancelled()
+
+    result, cancelled = asyncio.run(scenario())
+    assert result == 42
+    assert cancelled
+
+
+def test_do_different_keys_are_not_coalesced():
+    async def scenario():
+        flight = SingleFlight()
+        calls = []
+
+        async def fetch(key):
+            calls.append(key)
+            await asyncio.sleep(0)
+            return key
+
+        results = await asyncio.gather(flight.do("a", lambda: fetch("a")), flight.do("b", lambda: fetch("b")))
+        return calls, results
+
+    calls, results = asyncio.run(scenario())
+    assert sorted(calls) == ["a", "b"]
+    assert results == ["a", "b"]
+
+
+def test_stream_fans_out_and_replays_to_late_subscriber():
+    async def scenario():
+        flight = SingleFlight()
+        calls = 0
+        second_ready = asyncio.Event()
+
+        async def produce():
+            nonlocal calls
+            calls += 1
+            yield "a"
+            await second_ready.wait()
+            yield "b"
+            yield "c"
+
+        async def consume():
+            chunks = []
+            async for chunk in flight.stream("k", produce):
+                chunks.append(chunk)
+            return chunks
+
+        first = asyncio.ensure_future(consume())
+        await asyncio.sleep(0.01)
+        # Người đăng ký sau khi "a" đã phát vẫn nhận đủ từ đầu
+        second = asyncio.ensure_future(consume())
+        await asyncio.sleep(0.01)
+        second_ready.set()
+        return calls, await first, await second, flight.stats()
+
+    calls, first, second, stats = asyncio.run(scenario())
+    assert calls == 1
+    assert first == second == ["a", "b", "c"]
+    assert stats["coalesced_calls"] == 1
+    assert stats["in_flight"] == 0
+
+
+def test_stream_cancels_upstream_when_last_subscriber_leaves():
+    async def scenario():
+        flight = SingleFlight()
+        cancelled = asyncio.Event()
+        calls = 0
+
+        async def produce():
+            nonlocal calls
+            calls += 1
+            try:
+                yield "a"
+                await asyncio.sleep(10)
+                yield "b"
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        stream = flight.stream("k", produce)
+        assert await stream.__anext__() == "a"
+        await stream.aclose()
+        await asyncio.wait_for(cancelled.wait(), 1)
+        in_flight = flight.stats()["in_flight"]
+
+        # Lời gọi sau bắt đầu một stream mới thay vì dùng lại stream đã hủy
+        restarted = flight.stream("k", produce)
+        first_chunk = await restarted.__anext__()
+        await restarted.aclose()
+        return in_flight, calls, first_chunk
+
+    in_flight, calls, first_chunk = asyncio.run(scenario())
+    assert in_flight == 0
+    assert calls == 2
+    assert first_chunk == "a"
+
+
+def test_stream_error_reaches_every_subscriber():
+    async def scenario():
+        flight = SingleFlight()
+
+        async def produce():
+            yield "a"
+            await asyncio.sleep(0.01)
+            raise RuntimeError("LLM lỗi")
+
+        async def consume():
+            chunks = []
+            try:
+                async for chunk in flight.stream("k", produce):
+                    chunks.append(chunk)
+            except RuntimeError as e:
+                return chunks, str(e)
+            return chunks, None
+
+        return await asyncio.gather(consume(), consume())
+
+    for chunks, error in asyncio.run(scenario()):
+        assert chunks == ["a"]
+        assert error == "LLM lỗi"